@@ -0,0 +1,61 @@
+"""Measures the memory used per AST node and the end-to-end compile time.
+
+Usage: PYTHONPATH=src python benchmarks/ast_benchmark.py [size ...]
+Sizes are given in bytes and may use the suffixes K and M (default: 1M).
+"""
+import dataclasses
+import sys
+import time
+import tracemalloc
+
+from compiler import ast
+from compiler.ir_generator import generate_ir
+from compiler.parser1 import parse
+from compiler.tokenizer import tokenize_compact
+from compiler.type_checker import typecheck
+from programs import generate_program
+from tokenizer_benchmark import parse_size
+
+
+def count_nodes(root: ast.Expression) -> int:
+    count = 0
+    stack: list[object] = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, ast.Expression):
+            count += 1
+            stack.extend(getattr(node, f.name) for f in dataclasses.fields(node))
+    return count
+
+
+def main() -> None:
+    sizes = sys.argv[1:] or ['1M']
+    for size in sizes:
+        source_code = generate_program(parse_size(size))
+        tokens = tokenize_compact(source_code)
+        print(f'{len(source_code)} bytes of source code')
+
+        tracemalloc.start()
+        root = parse(tokens)
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        nodes = count_nodes(root)
+        print(f'{"AST":>12}: {nodes:>10} nodes  {retained / nodes:8.1f} bytes/node')
+
+        start = time.perf_counter()
+        root = parse(tokens)
+        parsed = time.perf_counter()
+        typecheck(root)
+        checked = time.perf_counter()
+        generate_ir(root)
+        finished = time.perf_counter()
+        print(f'{"parse":>12}: {parsed - start:8.3f} s')
+        print(f'{"typecheck":>12}: {checked - parsed:8.3f} s')
+        print(f'{"IR":>12}: {finished - checked:8.3f} s')
+        print(f'{"total":>12}: {finished - start:8.3f} s')
+
+
+if __name__ == '__main__':
+    main()
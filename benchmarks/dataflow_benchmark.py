@@ -0,0 +1,49 @@
+"""Measures the time of building the CFG and of the dataflow analyses on the IR of large programs.
+
+Usage: PYTHONPATH=src python benchmarks/dataflow_benchmark.py [size ...]
+Sizes are given in bytes and may use the suffixes K and M (default: 100K 1M).
+"""
+import gc
+import sys
+import time
+from typing import Callable, TypeVar
+
+from compiler.cfg import build_cfg, dominators
+from compiler.dataflow import index_vars, liveness, reaching_definitions
+from compiler.ir_generator import generate_ir
+from compiler.parser1 import parse
+from compiler.tokenizer import tokenize_compact
+from compiler.type_checker import typecheck
+from programs import generate_program
+from tokenizer_benchmark import parse_size
+
+T = TypeVar('T')
+
+
+def measure(name: str, function: Callable[[], T]) -> T:
+    start = time.perf_counter()
+    result = function()
+    print(f'{name:>20}: {time.perf_counter() - start:8.3f} s')
+    return result
+
+
+def main() -> None:
+    sizes = sys.argv[1:] or ['100K', '1M']
+    for size in sizes:
+        root = parse(tokenize_compact(generate_program(parse_size(size))))
+        typecheck(root)
+        instructions = generate_ir(root)
+        # Otherwise full collections walking the AST and IR would be counted against the analyses.
+        gc.freeze()
+        cfg = measure('build_cfg', lambda: build_cfg(instructions))
+        index = measure('index_vars', lambda: index_vars(cfg))
+        print(f'{len(instructions):>10} instructions  {len(cfg.blocks):>8} blocks  {len(index.vars):>8} variables  '
+              f'{index.exposed_count:>8} read in other blocks')
+        measure('dominators', lambda: dominators(cfg))
+        measure('liveness', lambda: liveness(cfg, index))
+        definitions = measure('reaching definitions', lambda: reaching_definitions(cfg, index))
+        print(f'{len(definitions.definitions):>10} definitions')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Compares the interpreter engines on loop-heavy and call-heavy programs.
+
+Usage: PYTHONPATH=src python benchmarks/interpreter_benchmark.py [--budget] [engine ...]
+Besides the engines of 'interpret', the engine 'pyexec' runs the program as
+Python code generated by 'compiler.pyexec', including the translation. With --budget, programs run under a step, time and call depth budget that they
+never exhaust, which shows the cost of budget checks.
+"""
+import sys
+import time
+
+from compiler.budget import ExecutionBudget
+from compiler.interpreter import engines, interpret
+from compiler.parser1 import parse
+from compiler.pyexec import compile_python, run, transpile
+from compiler.tokenizer import tokenize
+
+programs = {
+    'nested loops': """
+        var total = 0;
+        var i = 0;
+        while i < 400 do {
+            var j = 0;
+            while j < 400 do {
+                if (i + j) % 3 == 0 then total = total + i * j / 7 else total = total - 1;
+                j = j + 1;
+            }
+            i = i + 1;
+        }
+        total
+    """,
+    'function calls': """
+        fun square(x: Int): Int { return x * x; }
+        fun add_squares(x: Int, y: Int): Int { return square(x) + square(y); }
+        var total = 0;
+        var i = 0;
+        while i < 300 do {
+            var j = 0;
+            while j < 100 do {
+                total = total + add_squares(i, j) - i * j;
+                j = j + 1;
+            }
+            i = i + 1;
+        }
+        total
+    """,
+    'continue-heavy loops': """
+        var total = 0;
+        var i = 0;
+        while i < 300 do {
+            var j = 0;
+            while j < 300 do {
+                j = j + 1;
+                if j % 3 != 0 then continue;
+                total = total + 1;
+            }
+            i = i + 1;
+        }
+        total
+    """,
+    'break-heavy loops': """
+        var total = 0;
+        var i = 0;
+        while i < 500 do {
+            var k = 0;
+            while k < 100 do {
+                var j = 0;
+                while true do {
+                    j = j + 1;
+                    if j == 2 then break;
+                }
+                total = total + j;
+                k = k + 1;
+            }
+            i = i + 1;
+        }
+        total
+    """,
+    'fib(20)': """
+        fun fib(n: Int): Int { if n < 2 then n else fib(n - 1) + fib(n - 2) }
+        fib(20)
+    """,
+    'ackermann(2, 200)': """
+        fun ack(m: Int, n: Int): Int {
+            if m == 0 then n + 1 else if n == 0 then ack(m - 1, 1) else ack(m - 1, ack(m, n - 1))
+        }
+        ack(2, 200)
+    """,
+}
+
+
+def main() -> None:
+    sys.setrecursionlimit(100_000)
+    arguments = sys.argv[1:]
+    budget = None
+    if '--budget' in arguments:
+        arguments.remove('--budget')
+        budget = ExecutionBudget(max_steps=10**12, timeout=3600.0, max_call_depth=10**6)
+    selected = arguments or engines + ['pyexec']
+    for name, source_code in programs.items():
+        print(name)
+        for engine in selected:
+            node = parse(tokenize(source_code))
+            start = time.perf_counter()
+            if engine == 'pyexec':
+                result = run(compile_python(transpile(node)))
+            else:
+                result = interpret(node, engine=engine, budget=budget)
+            elapsed = time.perf_counter() - start
+            print(f'{engine:>10}: {elapsed:8.3f} s  (result {result})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Measures the memory used per IR instruction and the throughput of the passes over IR.
+
+Usage: PYTHONPATH=src python benchmarks/ir_benchmark.py [size ...]
+Sizes are given in bytes and may use the suffixes K and M (default: 1M).
+"""
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from compiler import ir
+from compiler.assembly_generator import generate_assembly, get_all_ir_variables
+from compiler.ir_generator import generate_ir
+from compiler.ir_vm import load
+from compiler.parser1 import parse
+from compiler.tokenizer import tokenize_compact
+from compiler.type_checker import typecheck
+from programs import generate_program
+from tokenizer_benchmark import parse_size
+
+
+def measure(name: str, function: Callable[[list[ir.Instruction]], Any], instructions: list[ir.Instruction]) -> None:
+    start = time.perf_counter()
+    function(instructions)
+    elapsed = time.perf_counter() - start
+    print(f'{name:>16}: {elapsed:8.3f} s  {len(instructions) / elapsed:>12,.0f} instructions/s')
+
+
+def main() -> None:
+    sizes = sys.argv[1:] or ['1M']
+    for size in sizes:
+        root = parse(tokenize_compact(generate_program(parse_size(size))))
+        typecheck(root)
+
+        tracemalloc.start()
+        instructions = generate_ir(root)
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f'{"IR":>16}: {len(instructions):>10} instructions  {retained / len(instructions):8.1f} bytes/instruction')
+
+        measure('generate_ir', lambda _: generate_ir(root), instructions)
+        measure('variables', get_all_ir_variables, instructions)
+        measure('text', lambda instructions: '\n'.join(str(insn) for insn in instructions), instructions)
+        measure('ir_vm.load', load, instructions)
+        measure('assembly', generate_assembly, instructions)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Compares the IR, the assembly and the run time of the test programs with and without IR optimization.
+
+Usage: PYTHONPATH=src python benchmarks/optimizer_benchmark.py [pass ...]
+Runs the default passes if none are given. Run times are of the IR virtual machine.
+"""
+import io
+import os
+import sys
+import time
+
+from compiler import ir
+from compiler.assembly_generator import generate_assembly, get_all_ir_variables
+from compiler.ir_generator import generate_ir
+from compiler.ir_vm import execute, load
+from compiler.optimizer import PassRun, default_passes, optimize
+from compiler.parser1 import parse
+from compiler.tokenizer import tokenize
+from compiler.type_checker import typecheck
+
+test_programs = os.path.join(os.path.dirname(__file__), '../test_programs/test.txt')
+repeats = 200
+
+
+def read_test_programs() -> list[tuple[str, str]]:
+    """Returns the source code and the input of each test program."""
+    with open(test_programs) as f:
+        cases = f.read().split('\n**********\n')
+    programs = []
+    for case in cases:
+        code = ''
+        inputs = ''
+        for line in case.split('\n'):
+            if line.startswith('input'):
+                inputs += line[len('input '):] + '\n'
+            elif not line.startswith(('expect', '# describe: ')):
+                code += line + '\n'
+        programs.append((code, inputs))
+    return programs
+
+
+def run_time(instructions: list[ir.Instruction], inputs: str) -> float:
+    """Returns the best time of a run, out of a few batches of runs."""
+    program, register_count = load(instructions)
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            execute(program, register_count, io.StringIO(inputs), io.StringIO())
+        best = min(best, (time.perf_counter() - start) / repeats)
+    return best
+
+
+def main() -> None:
+    pass_names = sys.argv[1:] or default_passes
+    totals: dict[str, list[float]] = {
+        'IR instructions': [0, 0], 'stack slots': [0, 0], 'assembly lines': [0, 0], 'run time (us)': [0, 0],
+    }
+    optimize_time = 0.0
+    runs: list[PassRun] = []
+    for code, inputs in read_test_programs():
+        ast_node = parse(tokenize(code))
+        typecheck(ast_node)
+        instructions = generate_ir(ast_node)
+        start = time.perf_counter()
+        optimized = optimize(instructions, pass_names, runs)
+        optimize_time += time.perf_counter() - start
+        for i, version in enumerate((instructions, optimized)):
+            totals['IR instructions'][i] += len(version)
+            totals['stack slots'][i] += len(get_all_ir_variables(version))
+            totals['assembly lines'][i] += len(generate_assembly(version).splitlines())
+            totals['run time (us)'][i] += run_time(version, inputs) * 1e6
+
+    print(f'passes: {" ".join(pass_names)}  ({optimize_time * 1000:.1f} ms to optimize)')
+    print(f'{"":>16} {"unoptimized":>12} {"optimized":>12}')
+    for name, (before, after) in totals.items():
+        print(f'{name:>16} {before:12.0f} {after:12.0f}  {(after - before) / before:+7.1%}')
+    print('instructions removed by each pass (over all programs):')
+    for i, name in enumerate(pass_names):
+        # Every program gets one run of each pass, in order.
+        removed = sum(run.removed for run in runs[i::len(pass_names)])
+        print(f'{i + 1:>4}. {name:<8} {removed:6}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Compares the throughput of the iterative parser with the recursive one.
+
+Usage: PYTHONPATH=src python benchmarks/parser_benchmark.py [size ...]
+Sizes are given in bytes and may use the suffixes K and M (default: 1M).
+"""
+import sys
+import time
+from typing import Callable
+
+from compiler import ast
+from compiler.parser1 import parse
+from compiler.tokenizer import Token, tokenize
+from programs import generate_program
+from recursive_parser import parse_recursive
+from tokenizer_benchmark import parse_size
+
+
+def measure(name: str, parser: Callable[[list[Token]], ast.Expression], tokens: list[Token]) -> None:
+    start = time.perf_counter()
+    try:
+        parser(tokens)
+    except RecursionError:
+        print(f'{name:>10}: RecursionError')
+        return
+    elapsed = time.perf_counter() - start
+    print(f'{name:>10}: {elapsed:8.3f} s  {len(tokens) / elapsed:>12,.0f} tokens/s')
+
+
+def main() -> None:
+    sizes = sys.argv[1:] or ['1M']
+    for size in sizes:
+        tokens = tokenize(generate_program(parse_size(size)))
+        print(f'generated program, {len(tokens)} tokens')
+        measure('recursive', parse_recursive, tokens)
+        measure('iterative', parse, tokens)
+
+    for operator in ['+', 'and']:
+        tokens = tokenize(f' {operator} '.join(['a'] * 100_000))
+        print(f"100000 terms joined by '{operator}'")
+        measure('recursive', parse_recursive, tokens)
+        measure('iterative', parse, tokens)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""Generators for large synthetic source programs used by the benchmarks."""
+
+_chunk_template = """var a{i} = {i};
+var b{i}: Int = a{i} * 2 + 3; // single-line comment
+/* multi-line
+   comment */
+if a{i} < b{i} then {{ a{i} = a{i} + 1; }} else {{ b{i} = b{i} - 1; }}
+while a{i} < {i} + 3 do {{ a{i} = a{i} + 1; }}
+print_int(a{i} + b{i});
+"""
+
+
+def generate_program(num_bytes: int) -> str:
+    """Returns a valid program of roughly `num_bytes` characters."""
+    chunks: list[str] = []
+    size = 0
+    i = 0
+    while size < num_bytes:
+        chunk = _chunk_template.format(i=i)
+        chunks.append(chunk)
+        size += len(chunk)
+        i += 1
+    return ''.join(chunks)
@@ -0,0 +1,41 @@
+"""Measures the latency of re-tokenizing after a one-character edit.
+
+Usage: PYTHONPATH=src python benchmarks/retokenize_benchmark.py [size ...]
+Sizes are given in bytes and may use the suffixes K and M (default: 1K 1M 10M).
+"""
+import sys
+import time
+
+from compiler.tokenizer import retokenize, tokenize_compact
+from programs import generate_program
+from tokenizer_benchmark import parse_size
+
+
+def benchmark(num_bytes: int) -> None:
+    source_code = generate_program(num_bytes)
+    buffer = tokenize_compact(source_code)
+    # Type one character into an identifier in the middle of the program.
+    offset = source_code.index('var a', len(source_code) // 2) + len('var a')
+    repeats = 20
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        retokenize(buffer, offset, 0, 'x')
+    incremental = (time.perf_counter() - start) / repeats
+
+    edited = source_code[:offset] + 'x' + source_code[offset:]
+    start = time.perf_counter()
+    tokenize_compact(edited)
+    full = time.perf_counter() - start
+
+    print(f'{len(source_code):>12} bytes  incremental {incremental * 1000:9.3f} ms  full {full * 1000:10.3f} ms')
+
+
+def main() -> None:
+    sizes = sys.argv[1:] or ['1K', '1M', '10M']
+    for size in sizes:
+        benchmark(parse_size(size))
+
+
+if __name__ == '__main__':
+    main()
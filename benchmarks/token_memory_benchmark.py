@@ -0,0 +1,36 @@
+"""Compares the memory used per token by a token list and by a TokenBuffer.
+
+Usage: PYTHONPATH=src python benchmarks/token_memory_benchmark.py [size ...]
+Sizes are given in bytes and may use the suffixes K and M (default: 1M).
+"""
+import sys
+import time
+import tracemalloc
+from typing import Callable, Sized
+
+from compiler.tokenizer import tokenize, tokenize_compact
+from programs import generate_program
+from tokenizer_benchmark import parse_size
+
+
+def measure(name: str, source_code: str, make_tokens: Callable[[str], Sized]) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    tokens = make_tokens(source_code)
+    elapsed = time.perf_counter() - start
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f'{name:>12}: {len(tokens):>10} tokens  {retained / len(tokens):8.1f} bytes/token  {elapsed:8.3f} s')
+
+
+def main() -> None:
+    sizes = sys.argv[1:] or ['1M']
+    for size in sizes:
+        source_code = generate_program(parse_size(size))
+        print(f'{len(source_code)} bytes of source code')
+        measure('list[Token]', source_code, tokenize)
+        measure('TokenBuffer', source_code, tokenize_compact)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Measures tokenizer throughput in tokens per second.
+
+Usage: PYTHONPATH=src python benchmarks/tokenizer_benchmark.py [size ...]
+Sizes are given in bytes and may use the suffixes K and M (default: 1K 1M 50M).
+"""
+import sys
+import time
+
+from compiler.tokenizer import tokenize
+from programs import generate_program
+
+
+def parse_size(text: str) -> int:
+    multipliers = {'K': 1024, 'M': 1024 * 1024}
+    if text[-1].upper() in multipliers:
+        return int(text[:-1]) * multipliers[text[-1].upper()]
+    return int(text)
+
+
+def benchmark(num_bytes: int) -> None:
+    source_code = generate_program(num_bytes)
+    repeats = max(1, (1024 * 1024) // len(source_code))
+    start = time.perf_counter()
+    for _ in range(repeats):
+        token_count = len(tokenize(source_code))
+    elapsed = (time.perf_counter() - start) / repeats
+    print(f'{len(source_code):>12} bytes  {token_count:>10} tokens  '
+          f'{elapsed:10.4f} s  {token_count / elapsed:>12,.0f} tokens/s')
+
+
+def main() -> None:
+    sizes = sys.argv[1:] or ['1K', '1M', '50M']
+    for size in sizes:
+        benchmark(parse_size(size))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,20 @@
+import os
 import sys
-from compiler import ast
+from compiler import ast, ir
 from compiler.assembler import assemble
 from compiler.assembly_generator import generate_assembly
+from compiler.budget import ExecutionBudget
+from compiler.cache import CompilationCache, max_source_bytes
+from compiler.cfg import build_cfg, to_dot
 from compiler.ir_generator import generate_ir
 from compiler.parser1 import parse
 from compiler.interpreter import interpret
-from compiler.tokenizer import tokenize
+from compiler.ir_vm import run_ir
+from compiler.memo import Memoizer
+from compiler.optimizer import PassRun, optimize
+from compiler.profiler import Profile
+from compiler.pyexec import compile_python, run, transpile
+from compiler.tokenizer import tokenize_iter
 from compiler.type_checker import typecheck
 
 # TODO(student): add more commands as needed
@@ -14,19 +23,116 @@ Usage: {sys.argv[0]} <command> [source_code_file]
 
 Command 'interpret':
     Runs the interpreter on source code.
+    --engine=ENGINE         'tree' (default) walks the AST directly,
+                            'closure' compiles it into Python closures first.
+    --max-steps=N           Stops the program after N loop iterations and function calls.
+    --timeout=SECONDS       Stops the program after it has run for SECONDS.
+    --max-call-depth=N      Stops the program when function calls nest deeper than N.
+                            By default, programs run without limits.
+    --memoize               Remembers the results of calls of pure functions, which
+                            depend on nothing but their arguments. Uses the 'closure'
+                            engine by default.
+    --memoize-max-entries=N Number of results remembered per function.
+    --profile               Prints the loops, calls and functions that took the most
+                            time to standard error. Uses the 'closure' engine by default.
+                            With --memoize, also prints the hits and misses of each
+                            memoized function.
+    --profile-stacks=FILE   Writes the time spent in each call stack to FILE, in the
+                            collapsed format of flame graph tools. Implies --profile.
+    --batch-inputs=FILE     Runs the program once per line of FILE, on all lines at once.
+                            The numbers on a line are what read_int returns. Every line
+                            of output starts with the number of its input line, from 0.
+                            Needs NumPy, which the 'batch' extra installs.
+
+Command 'pyexec':
+    Translates the program into Python code and runs it with Python's own interpreter.
+
+Command 'run-ir':
+    Generates IR and executes it on a virtual machine, without assembling.
+
+Command 'ir':
+    Prints the IR of the program.
+    --dump-cfg              Prints the control-flow graph of the IR instead, in the
+                            DOT language of Graphviz.
 
 Common arguments:
     source_code_file        Optional. Defaults to standard input if missing.
+    --cache                 Reuses typed ASTs and IR from an on-disk compilation cache.
+                            The source is then read whole to hash it. Without the cache,
+                            it is streamed into the parser. Files over {max_source_bytes // 2**20} MiB are never cached.
+    --cache-dir=DIR         Directory of the compilation cache. Implies --cache.
+                            Defaults to $XDG_CACHE_HOME/compilers-project.
+                            Entries are pickles, and loading a pickle can run code. They
+                            are signed with a key kept in $XDG_CONFIG_HOME/compilers-project,
+                            and unsigned entries are ignored, but the directory should still
+                            only be writable by you.
+    --cache-max-bytes=N     Size limit of the compilation cache.
+    --cache-stats           Prints the cache hit/miss statistics to standard error.
+    --optimize              Optimizes the IR before the commands 'ir', 'run-ir', 'asm'
+                            and 'compile' use it.
+    --optimize-stats        Prints how many instructions each optimization pass removed
+                            to standard error. Implies --optimize.
  """.strip() + "\n"
 
 
 def main() -> int:
     command: str | None = None
     input_file: str | None = None
+    use_cache = False
+    cache_dir: str | None = None
+    cache_max_bytes: int | None = None
+    show_cache_stats = False
+    engine: str | None = None
+    profile: Profile | None = None
+    profile_stacks_file: str | None = None
+    memo: Memoizer | None = None
+    memo_max_entries: int | None = None
+    batch_inputs_file: str | None = None
+    dump_cfg = False
+    optimize_ir = False
+    pass_runs: list[PassRun] | None = None
+    max_steps: int | None = None
+    timeout: float | None = None
+    max_call_depth: int | None = None
     for arg in sys.argv[1:]:
         if arg in ['-h', '--help']:
             print(usage)
             return 0
+        elif arg == '--cache':
+            use_cache = True
+        elif arg.startswith('--cache-dir='):
+            cache_dir = arg[len('--cache-dir='):]
+            use_cache = True
+        elif arg.startswith('--cache-max-bytes='):
+            cache_max_bytes = int(arg[len('--cache-max-bytes='):])
+        elif arg == '--cache-stats':
+            show_cache_stats = True
+        elif arg.startswith('--engine='):
+            engine = arg[len('--engine='):]
+        elif arg.startswith('--max-steps='):
+            max_steps = int(arg[len('--max-steps='):])
+        elif arg.startswith('--timeout='):
+            timeout = float(arg[len('--timeout='):])
+        elif arg.startswith('--max-call-depth='):
+            max_call_depth = int(arg[len('--max-call-depth='):])
+        elif arg == '--memoize':
+            memo = Memoizer()
+        elif arg.startswith('--memoize-max-entries='):
+            memo_max_entries = int(arg[len('--memoize-max-entries='):])
+        elif arg == '--profile':
+            profile = Profile()
+        elif arg.startswith('--profile-stacks='):
+            profile = Profile()
+            profile_stacks_file = arg[len('--profile-stacks='):]
+        elif arg.startswith('--batch-inputs='):
+            batch_inputs_file = arg[len('--batch-inputs='):]
+        elif arg == '--dump-cfg':
+            dump_cfg = True
+        elif arg == '--optimize':
+            optimize_ir = True
+        elif arg == '--optimize-stats':
+            optimize_ir = True
+            pass_runs = []
         elif arg.startswith('-'):
             raise Exception(f"Unknown argument: {arg}")
         elif command is None:
@@ -36,49 +142,122 @@ def main() -> int:
         else:
             raise Exception("Multiple input files not supported")
 
-    def read_source_code() -> str:
+    def parse_source_code() -> ast.Expression:
+        # Tokens are streamed from the input into the parser,
+        # so the whole token list is never held in memory.
         if input_file is not None:
             with open(input_file) as f:
-                return f.read()
+                return parse(tokenize_iter(f))
         else:
-            return sys.stdin.read()
+            return parse(tokenize_iter(sys.stdin))
 
     if command is None:
         print(f"Error: command argument missing\n\n{usage}", file=sys.stderr)
         return 1
 
-    if command == 'interpret':
-        source_code = read_source_code()
-        tokens = tokenize(source_code)
-        ast_node = parse(tokens)
+    # Typed ASTs, IR and Python code are cached under a hash of the source code and the compiler version.
+    cache: CompilationCache | None = None
+    cache_key = ''
+    source_code = ''
+    if use_cache and (input_file is None or os.path.getsize(input_file) <= max_source_bytes):
+        cache = CompilationCache(cache_dir) if cache_max_bytes is None else CompilationCache(cache_dir, cache_max_bytes)
+        if input_file is not None:
+            with open(input_file) as f:
+                source_code = f.read()
+        else:
+            source_code = sys.stdin.read()
+        cache_key = cache.key(source_code)
+
+    def typed_ast() -> ast.Expression:
+        if cache is None:
+            ast_node = parse_source_code()
+            typecheck(ast_node)
+            return ast_node
+        cached = cache.load(cache_key, 'ast')
+        if cached is not None:
+            return cached
+        ast_node = parse(tokenize_iter(source_code))
         typecheck(ast_node)
-        interpret(ast_node)
+        cache.store(cache_key, 'ast', ast_node)
+        return ast_node
+
+    def generated_ir() -> list[ir.Instruction]:
+        if cache is not None:
+            cached = cache.load(cache_key, 'ir')
+            if cached is not None:
+                return cached
+        instructions = generate_ir(typed_ast())
+        if cache is not None:
+            cache.store(cache_key, 'ir', instructions)
+        return instructions
+
+    def ir_instructions() -> list[ir.Instruction]:
+        if optimize_ir:
+            return optimize(generated_ir(), runs=pass_runs)
+        return generated_ir()
+
+    def python_source() -> str:
+        if cache is not None:
+            cached = cache.load(cache_key, 'py')
+            if cached is not None:
+                return cached
+        python_code = transpile(typed_ast())
+        if cache is not None:
+            cache.store(cache_key, 'py', python_code)
+        return python_code
+
+    if command == 'interpret' and batch_inputs_file is not None:
+        # The batched engine loads NumPy, so it is only imported when it is used.
+        from compiler.batch_interpreter import interpret_batch
+        with open(batch_inputs_file) as f:
+            inputs = [[int(word) for word in line.split()] for line in f if line.strip()]
+        result = interpret_batch(typed_ast(), inputs)
+        for lane, lines in enumerate(result.outputs):
+            for line in lines:
+                print(f'{lane}: {line}')
+    elif command == 'interpret':
+        budget = None
+        if max_steps is not None or timeout is not None or max_call_depth is not None:
+            budget = ExecutionBudget(max_steps, timeout, max_call_depth)
+        if memo is not None and memo_max_entries is not None:
+            memo.max_entries = memo_max_entries
+        if engine is None:
+            engine = 'closure' if profile is not None or memo is not None else 'tree'
+        interpret(typed_ast(), engine=engine, budget=budget, profile=profile, memo=memo)
+        if profile is not None:
+            print(profile.report(), file=sys.stderr, end='')
+            if memo is not None:
+                print(memo.report(), file=sys.stderr, end='')
+            if profile_stacks_file is not None:
+                with open(profile_stacks_file, 'w') as f:
+                    profile.write_collapsed_stacks(f)
+    elif command == 'pyexec':
+        run(compile_python(python_source()))
+    elif command == 'run-ir':
+        run_ir(ir_instructions())
+    elif command == 'ir' and dump_cfg:
+        print(to_dot(build_cfg(ir_instructions())), end='')
     elif command == 'ir':
-        source_code = read_source_code()
-        tokens = tokenize(source_code)
-        ast_node = parse(tokens)
-        typecheck(ast_node)
-        ir_instructions = generate_ir(ast_node)
-        print("\n".join([str(ins) for ins in ir_instructions]))
+        print("\n".join([str(ins) for ins in ir_instructions()]))
     elif command == 'asm':
-        source_code = read_source_code()
-        tokens = tokenize(source_code)
-        ast_node = parse(tokens)
-        typecheck(ast_node)
-        ir_instructions = generate_ir(ast_node)
-        asm_code = generate_assembly(ir_instructions)
+        asm_code = generate_assembly(ir_instructions())
         print(asm_code)
     elif command == 'compile':
-        source_code = read_source_code()
-        tokens = tokenize(source_code)
-        ast_node = parse(tokens)
-        typecheck(ast_node)
-        ir_instructions = generate_ir(ast_node)
-        asm_code = generate_assembly(ir_instructions)
+        asm_code = generate_assembly(ir_instructions())
         assemble(asm_code, 'compiled_program')
     else:
         print(f"Error: unknown command: {command}\n\n{usage}", file=sys.stderr)
         return 1
+    if pass_runs is not None:
+        for pass_run in pass_runs:
+            print(f'{pass_run.name}: removed {pass_run.removed} of {pass_run.before} instructions', file=sys.stderr)
+    if cache is not None:
+        cache.save_stats()
+        if show_cache_stats:
+            total = cache.total_stats()
+            print(f'cache: {cache.stats.hits} hits, {cache.stats.misses} misses '
+                  f'(total: {total.hits} hits, {total.misses} misses, {total.evictions} evictions, '
+                  f'{cache.size()} bytes)', file=sys.stderr)
     return 0
 
 
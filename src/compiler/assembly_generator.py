@@ -1,4 +1,3 @@
-import dataclasses
 from compiler import ir
 from compiler.intrinsics import IntrinsicArgs, all_intrinsics
 
@@ -51,8 +50,14 @@ def generate_assembly(instructions: list[ir.Instruction]) -> str:
                 emit(f'movq ${value}, {locals.get_ref(insn.dest)}')
 
             case ir.Copy():
-                emit(f'movq {locals.get_ref(insn.source)}, %rax')
-                emit(f'movq %rax, {locals.get_ref(insn.dest)}')
+                # A copy from None stores 0, the unit value, as the IR VM does, and a copy to None does nothing.
+                if insn.dest is None:
+                    pass
+                elif insn.source is None:
+                    emit(f'movq $0, {locals.get_ref(insn.dest)}')
+                else:
+                    emit(f'movq {locals.get_ref(insn.source)}, %rax')
+                    emit(f'movq %rax, {locals.get_ref(insn.dest)}')
 
             case ir.Call():
                 if (intrinsic := all_intrinsics.get(insn.fun.name)) is not None:
@@ -135,12 +140,6 @@ def get_all_ir_variables(instructions: list[ir.Instruction]) -> list[ir.IRVar]:
             result_set.add(v)
 
     for insn in instructions:
-        for field in dataclasses.fields(insn):
-            value = getattr(insn, field.name)
-            if isinstance(value, ir.IRVar):
-                add(value)
-            elif isinstance(value, list):
-                for v in value:
-                    if isinstance(v, ir.IRVar):
-                        add(v)
+        for v in insn.operands():
+            add(v)
     return result_list
\ No newline at end of file
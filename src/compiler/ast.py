@@ -1,13 +1,16 @@
 
 from dataclasses import dataclass, field
+from compiler.tokenizer import Location
 
 
 
-@dataclass
+# Nodes are slotted so that they carry no per-instance '__dict__'.
+# Types are frozen so that the 'Unit' singleton can be a plain field default.
+@dataclass(frozen=True, slots=True)
 class Type:
     "basic class"
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FunType(Type):
     name:str
 
@@ -15,109 +18,125 @@ Int = FunType('Int')
 Bool = FunType('Bool')
 Unit = FunType('Unit')
 
-@dataclass
+@dataclass(slots=True)
 class Expression:
     "Base class for expression AST nodes"
-    type: Type = field(kw_only=True, default_factory=lambda: Unit)
+    type: Type = field(kw_only=True, default=Unit)
 
-@dataclass
+# Nodes that refer to names also record where they appear. 'scope_depth' and 'slot'
+# are filled in by 'resolver.resolve': the name lives 'scope_depth' function frames
+# up from the current one, at index 'slot' of that frame.
+@dataclass(slots=True)
 class Identifier(Expression):
     name: str
+    location: Location | None = field(default=None, kw_only=True, compare=False)
+    scope_depth: int | None = field(default=None, kw_only=True, compare=False)
+    slot: int | None = field(default=None, kw_only=True, compare=False)
 
-@dataclass
+@dataclass(slots=True)
 class Literal(Expression):
     value: int | bool
 
-@dataclass
+@dataclass(slots=True)
 class BinaryOp(Expression):
     left:Expression
     operation: str
     right: Expression
     arg_variables: Expression = None
 
-@dataclass
+@dataclass(slots=True)
 class IfExpression(Expression):
     condition: Expression
     then_branch: Expression
     else_branch: Expression = None  
+    location: Location | None = field(default=None, kw_only=True, compare=False)
 
 
 
 
 
-@dataclass
+@dataclass(slots=True)
 class UnaryOp(Expression):
     operation: str
     right: Expression
 
-@dataclass
+@dataclass(slots=True)
 class Block(Expression):
     expressions: list[Expression]
 
     def ends_with_block(self) -> bool:
         return True
     
-@dataclass
+@dataclass(slots=True)
 class VariableDeclaration(Expression):
     name: str
     assignment: Expression = None
     variable_type: Type = None
+    location: Location | None = field(default=None, kw_only=True, compare=False)
+    slot: int | None = field(default=None, kw_only=True, compare=False)
 
-@dataclass
+@dataclass(slots=True)
 class Function(Expression):
     name: str
     args: list[VariableDeclaration]
     return_type: Type = None
     body: Block = None
+    location: Location | None = field(default=None, kw_only=True, compare=False)
+    scope_depth: int | None = field(default=None, kw_only=True, compare=False)
+    slot: int | None = field(default=None, kw_only=True, compare=False)
+    # Number of slots in the frame of a call to this function, for function definitions.
+    frame_size: int | None = field(default=None, kw_only=True, compare=False)
 
-@dataclass
+@dataclass(slots=True)
 class LibraryFunctionCalled(Expression):
     name: str
     args: list[VariableDeclaration]
     return_type: Type = None
     # operation: Expression = None
 
-@dataclass
+@dataclass(slots=True)
 class FunctionCalled(Expression):
     name: str
     return_type: Type = None
     body: Block = None
     arg_variables: list[VariableDeclaration] = None
     
-@dataclass
+@dataclass(slots=True)
 class WhileExpression(Expression):
     condition: Expression
     do: Expression
+    location: Location | None = field(default=None, kw_only=True, compare=False)
 
-@dataclass
+@dataclass(slots=True)
 class SymTab():
     variables: dict
 
-@dataclass
+@dataclass(slots=True)
 class HierarchicalSymTab(SymTab):
     parent: SymTab
 
-@dataclass
+@dataclass(slots=True)
 class Break(Expression):
     "break"
     test: str=None
 
-@dataclass
+@dataclass(slots=True)
 class Continue(Expression):
     "continue"
 
-@dataclass
+@dataclass(slots=True)
 class Return(Expression):
     value: Expression
+    location: Location | None = field(default=None, kw_only=True, compare=False)
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PointerType(Type):
     base_type: Type
-@dataclass
+@dataclass(slots=True)
 class AddressOf(Expression):
     operand: Expression
 
-@dataclass
+@dataclass(slots=True)
 class Dereference(Expression):
     operand: Expression
 
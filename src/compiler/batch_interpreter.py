@@ -0,0 +1,291 @@
+from dataclasses import dataclass
+from typing import Any
+from compiler import ast
+from compiler.interpreter import FunctionValue
+from compiler.resolver import resolve, resolved_depth, resolved_frame_size, resolved_slot
+
+# NumPy is optional, in the 'batch' extra. Only batched interpretation needs it.
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+# Values are Python or NumPy scalars, which are the same on every lane, or NumPy
+# arrays with one entry per lane. Entries of lanes that are not active are undefined.
+Value = Any
+# A boolean NumPy array with one entry per lane.
+Mask = Any
+Frame = list[Any]
+
+
+@dataclass
+class BatchResult:
+    """The results of running a program on every lane of a batch."""
+    # The value of the program on each lane, or None if the program has no value.
+    values: Any
+    # The lines printed on each lane.
+    outputs: list[list[str]]
+
+
+def interpret_batch(node: ast.Expression, inputs: Any) -> BatchResult:
+    """Runs a program once per row of 'inputs', on all rows at once.
+
+    Row i holds the numbers that 'read_int' returns on lane i, in order. Every lane has
+    its own variables, but the lanes run in lockstep on NumPy arrays: both branches of
+    an 'if' run, each on the lanes that chose it, and a loop runs until it has ended
+    on every lane. An error on any lane stops the whole batch. Unlike in the other
+    engines, integers are 64 bits wide.
+    """
+    if np is None:
+        raise Exception("Batched interpretation needs NumPy, which is not installed (it is in the 'batch' extra)")
+    inputs = np.asarray(inputs, dtype=np.int64)
+    if inputs.ndim != 2:
+        raise Exception('Expected a two-dimensional array of inputs, with one row per lane')
+    frame: Frame = [None] * resolve(node)
+    evaluator = _BatchEvaluator(inputs)
+    value = evaluator.evaluate(node, frame, np.ones(len(inputs), dtype=bool))
+    if evaluator.returned is not None:
+        value = _merge(evaluator.returned, evaluator.return_value, value)
+    values = None if value is None else np.broadcast_to(value, (len(inputs),)).copy()
+    return BatchResult(values, evaluator.outputs())
+
+
+def _merge(mask: Mask, new: Value, old: Value) -> Value:
+    """Takes the new value on the lanes in 'mask', and keeps the old one elsewhere."""
+    if old is None or new is None:
+        return old if new is None else new
+    if mask.all():
+        return new
+    return np.where(mask, new, old)
+
+
+def _frame_at(frame: Frame, depth: int) -> Frame:
+    for _ in range(depth):
+        frame = frame[0]
+    return frame
+
+
+def _is_bool(value: Value) -> bool:
+    return isinstance(value, bool | np.bool_) or (isinstance(value, np.ndarray) and value.dtype == bool)
+
+
+_operators = {
+    '+': lambda x, y: x + y,
+    '-': lambda x, y: x - y,
+    '*': lambda x, y: x * y,
+    '/': lambda x, y: x // y,
+    '%': lambda x, y: x % y,
+    '<': lambda x, y: x < y,
+    '<=': lambda x, y: x <= y,
+    '>': lambda x, y: x > y,
+    '>=': lambda x, y: x >= y,
+    '==': lambda x, y: x == y,
+    '!=': lambda x, y: x != y,
+    '+=': lambda x, y: x + y,
+    '-=': lambda x, y: x - y,
+}
+
+
+class _BatchEvaluator:
+    def __init__(self, inputs: Any) -> None:
+        self.inputs = inputs
+        self.lanes = len(inputs)
+        self.read_positions = np.zeros(self.lanes, dtype=np.int64)
+        # Lanes that left the current function call with 'return', and what they returned.
+        self.returned: Mask | None = None
+        self.return_value: Value = None
+        # Lanes that left the current iteration of the innermost loop.
+        self.broken: Mask | None = None
+        self.continued: Mask | None = None
+        self.loop_depth = 0
+        # Every call of a print function, with the lanes it printed on.
+        self.printed: list[tuple[Mask, Value]] = []
+
+    def live(self, mask: Mask) -> Mask:
+        """Removes the lanes that returned, or left the current loop iteration, from a mask."""
+        for exited in (self.returned, self.broken, self.continued):
+            if exited is not None:
+                mask = mask & ~exited
+        return mask
+
+    def outputs(self) -> list[list[str]]:
+        outputs: list[list[str]] = [[] for _ in range(self.lanes)]
+        for mask, value in self.printed:
+            values = np.broadcast_to(value, (self.lanes,))
+            for lane in np.flatnonzero(mask):
+                outputs[lane].append(str(values[lane].item()))
+        return outputs
+
+    def evaluate(self, node: ast.Expression, frame: Frame, mask: Mask) -> Value:
+        """Evaluates a node on the lanes in 'mask', none of which have left the current flow of control."""
+        match node:
+            case ast.Literal():
+                return node.value
+
+            case ast.Identifier():
+                return _frame_at(frame, resolved_depth(node))[resolved_slot(node)]
+
+            case ast.BinaryOp():
+                operation = node.operation
+                if operation == '=' and isinstance(node.left, ast.Identifier):
+                    value = self.evaluate(node.right, frame, mask)
+                    target = _frame_at(frame, resolved_depth(node.left))
+                    slot = resolved_slot(node.left)
+                    target[slot] = _merge(self.live(mask), value, target[slot])
+                    return None
+                left = self.evaluate(node.left, frame, mask)
+                mask = self.live(mask)
+                if operation in ('and', 'or'):
+                    # The right operand only runs on the lanes that need it.
+                    needed = mask & left if operation == 'and' else mask & ~np.asarray(left)
+                    right = self.evaluate(node.right, frame, needed) if needed.any() else False
+                    if not _is_bool(right):
+                        right = False
+                    return np.logical_and(left, right) if operation == 'and' else np.logical_or(left, right)
+                if operation not in _operators:
+                    raise Exception(f'operation {operation} does not exist')
+                right = self.evaluate(node.right, frame, mask)
+                if operation in ('/', '%'):
+                    zero = right == 0
+                    if np.any(mask & zero):
+                        raise ZeroDivisionError('integer division or modulo by zero')
+                    # Lanes that are not active may divide by anything.
+                    right = np.where(zero, 1, right)
+                return _operators[operation](left, right)
+
+            case ast.UnaryOp():
+                value = self.evaluate(node.right, frame, mask)
+                return np.logical_not(value) if _is_bool(value) else -value
+
+            case ast.VariableDeclaration():
+                value = self.evaluate(node.assignment, frame, mask)
+                slot = resolved_slot(node)
+                frame[slot] = _merge(self.live(mask), value, frame[slot])
+                return value
+
+            case ast.Block():
+                expressions = node.expressions
+                last = len(expressions) - 1
+                # A block that ends with ';' evaluates to its last expression before it.
+                last_expression = expressions[last] if expressions else None
+                if isinstance(last_expression, ast.Literal) and last_expression.value is None:
+                    last -= 1
+                result = None
+                for expression in expressions[:last + 1]:
+                    mask = self.live(mask)
+                    if not mask.any():
+                        break
+                    result = self.evaluate(expression, frame, mask)
+                return result
+
+            case ast.IfExpression():
+                condition = self.evaluate(node.condition, frame, mask)
+                mask = self.live(mask)
+                then_mask = np.logical_and(mask, condition)
+                else_mask = mask & ~then_mask
+                then_value = self.evaluate(node.then_branch, frame, then_mask) if then_mask.any() else None
+                if node.else_branch is None:
+                    return None
+                else_value = self.evaluate(node.else_branch, frame, else_mask) if else_mask.any() else None
+                # A branch without a value either has no lanes or left the flow of control.
+                if then_value is None or else_value is None:
+                    return else_value if then_value is None else then_value
+                return np.where(then_mask, then_value, else_value)
+
+            case ast.WhileExpression():
+                self.while_loop(node, frame, mask)
+                return None
+
+            case ast.Break() | ast.Continue():
+                if self.loop_depth == 0:
+                    raise Exception(f'{"break" if isinstance(node, ast.Break) else "continue"} outside of a loop')
+                if isinstance(node, ast.Break):
+                    self.broken = mask if self.broken is None else self.broken | mask
+                else:
+                    self.continued = mask if self.continued is None else self.continued | mask
+                return None
+
+            case ast.Return():
+                value = self.evaluate(node.value, frame, mask)
+                mask = self.live(mask)
+                self.return_value = _merge(mask, value, self.return_value)
+                self.returned = mask if self.returned is None else self.returned | mask
+                return None
+
+            case ast.Function():
+                if node.body is not None:
+                    frame[resolved_slot(node)] = FunctionValue(node, frame)
+                    return None
+                args = []
+                for arg in node.args:
+                    args.append(self.evaluate(arg, frame, mask))
+                    mask = self.live(mask)
+                if node.slot is None:
+                    return self.call_library_function(node.name, args, mask)
+                return self.call(node, args, frame, mask)
+
+            case _:
+                raise Exception(f'{node} is not supported')
+
+    def while_loop(self, node: ast.WhileExpression, frame: Frame, mask: Mask) -> None:
+        running = mask
+        while True:
+            # 'break' and 'continue' in the condition belong to the enclosing loop.
+            condition = self.evaluate(node.condition, frame, running)
+            running = np.logical_and(self.live(running), condition)
+            if not running.any():
+                return
+            outer_broken, outer_continued = self.broken, self.continued
+            self.broken = self.continued = None
+            self.loop_depth += 1
+            self.evaluate(node.do, frame, running)
+            self.loop_depth -= 1
+            broken = self.broken
+            self.broken, self.continued = outer_broken, outer_continued
+            # Lanes that continued simply run the next iteration.
+            running = self.live(running if broken is None else running & ~broken)
+            if not running.any():
+                return
+
+    def call(self, node: ast.Function, args: list[Value], frame: Frame, mask: Mask) -> Value:
+        function = _frame_at(frame, resolved_depth(node))[resolved_slot(node)]
+        if not isinstance(function, FunctionValue):
+            raise Exception(f'{node.name} is not a function')
+        definition = function.definition
+        if len(definition.args) != len(args):
+            raise Exception(f'Expected {len(definition.args)} arguments')
+        if not mask.any():
+            return None
+        callee_frame: Frame = [None] * resolved_frame_size(definition)
+        callee_frame[0] = function.frame
+        for parameter, value in zip(definition.args, args):
+            callee_frame[resolved_slot(parameter)] = value
+        saved = self.returned, self.return_value, self.broken, self.continued, self.loop_depth
+        self.returned, self.return_value, self.broken, self.continued, self.loop_depth = None, None, None, None, 0
+        result = self.evaluate(definition.body, callee_frame, mask)
+        if self.returned is not None:
+            result = _merge(self.returned, self.return_value, result)
+        self.returned, self.return_value, self.broken, self.continued, self.loop_depth = saved
+        return result
+
+    def call_library_function(self, name: str, args: list[Value], mask: Mask) -> Value:
+        match name:
+            case 'print_int' | 'print_bool':
+                for arg in args:
+                    if name == 'print_int' and (_is_bool(arg) or not np.issubdtype(np.asarray(arg).dtype, np.integer)):
+                        raise Exception(f'Expected an integer, but get {arg}')
+                    if name == 'print_bool' and not _is_bool(arg):
+                        raise Exception(f'Expected an boolean value, but get {arg}')
+                    self.printed.append((mask, arg))
+                return None
+            case 'read_int':
+                width = self.inputs.shape[1]
+                exhausted = mask & (self.read_positions >= width)
+                if exhausted.any():
+                    raise Exception(f'read_int: no more inputs on lane {np.flatnonzero(exhausted)[0]}')
+                positions = np.minimum(self.read_positions, width - 1)
+                self.read_positions += mask
+                if width == 0:
+                    return 0
+                return self.inputs[np.arange(self.lanes), positions]
+        raise Exception(f'{name} is not defined')
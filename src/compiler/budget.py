@@ -0,0 +1,69 @@
+import time
+from dataclasses import dataclass, field
+from compiler.tokenizer import Location
+
+
+class BudgetExceeded(Exception):
+    """Raised when a program runs out of its execution budget. 'limit' is 'steps', 'time' or 'call depth'."""
+
+    def __init__(self, limit: str, message: str) -> None:
+        super().__init__(message)
+        self.limit = limit
+
+
+@dataclass
+class ExecutionBudget:
+    """Limits on how long a program may run. None means unlimited.
+
+    A step is one loop iteration or one function call. The interpreters only
+    check the budget at loop back-edges and calls, and the clock is only read
+    every 'check_interval' steps.
+    """
+    max_steps: int | None = None
+    timeout: float | None = None
+    max_call_depth: int | None = None
+    check_interval: int = 1024
+
+    steps: int = field(default=0, init=False)
+    call_depth: int = field(default=0, init=False)
+    _deadline: float | None = field(default=None, init=False)
+    _next_check: int | float = field(default=0, init=False)
+
+    def start(self) -> None:
+        self.steps = 0
+        self.call_depth = 0
+        self._deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        self._schedule_check()
+
+    def _schedule_check(self) -> None:
+        next_check: int | float = float('inf')
+        if self._deadline is not None:
+            next_check = self.steps + self.check_interval
+        if self.max_steps is not None:
+            next_check = min(next_check, self.max_steps + 1)
+        self._next_check = next_check
+
+    def tick(self, location: Location | None) -> None:
+        """Counts a step."""
+        self.steps += 1
+        if self.steps >= self._next_check:
+            self._check(location)
+
+    def _check(self, location: Location | None) -> None:
+        where = f'{location} : ' if location is not None else ''
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise BudgetExceeded('steps', f'{where}Execution budget exceeded: more than {self.max_steps} steps')
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            raise BudgetExceeded('time', f'{where}Execution budget exceeded: time limit of {self.timeout} s')
+        self._schedule_check()
+
+    def enter_call(self, location: Location | None) -> None:
+        """Counts a step for a function call and checks the call depth. Must be paired with 'leave_call'."""
+        self.tick(location)
+        if self.max_call_depth is not None and self.call_depth >= self.max_call_depth:
+            where = f'{location} : ' if location is not None else ''
+            raise BudgetExceeded('call depth', f'{where}Execution budget exceeded: call depth of {self.max_call_depth}')
+        self.call_depth += 1
+
+    def leave_call(self) -> None:
+        self.call_depth -= 1
@@ -0,0 +1,202 @@
+import hashlib
+import hmac
+import json
+import os
+import pickle
+import tempfile
+import zlib
+from dataclasses import asdict, dataclass
+from typing import Any
+
+# Kinds of compilation results that can be cached for a source file.
+cache_kinds = ('ast', 'ir', 'py')
+
+default_max_bytes = 256 * 1024 * 1024
+
+# Larger source files are not cached: hashing them means reading them whole,
+# so they are streamed into the parser instead.
+max_source_bytes = 16 * 1024 * 1024
+
+_stats_file_name = 'stats.json'
+
+_signature_bytes = hashlib.sha256().digest_size
+
+_compiler_version: str | None = None
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'compilers-project')
+
+
+def default_key_file() -> str:
+    base = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(base, 'compilers-project', 'cache-key')
+
+
+def load_key(path: str) -> bytes:
+    """Returns the secret key that signs cache entries, creating it if it does not exist yet.
+
+    Only the user can read the key, and it is kept outside the cache directory,
+    so that whoever can write to the cache cannot sign entries.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    key = os.urandom(32)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another process created the key first.
+        with open(path, 'rb') as f:
+            return f.read()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    return key
+
+
+def compiler_version() -> str:
+    """Returns a hash of the compiler's own source files.
+
+    Any change to the compiler gives a new version, so stale results are never loaded.
+    """
+    global _compiler_version
+    if _compiler_version is None:
+        digest = hashlib.sha256()
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(package_dir)):
+            if name.endswith('.py'):
+                digest.update(name.encode())
+                with open(os.path.join(package_dir, name), 'rb') as f:
+                    digest.update(f.read())
+        _compiler_version = digest.hexdigest()
+    return _compiler_version
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+
+class CompilationCache:
+    """A content-addressed on-disk cache of typed ASTs, IR instruction lists and the
+    Python code generated by 'pyexec'.
+
+    Entries are stored as zlib-compressed pickles named '<key>.<kind>', where the key
+    is a hash of the source code and the compiler version. Loading an entry refreshes
+    its modification time, and the least recently used entries are evicted once the
+    cache grows beyond 'max_bytes'.
+
+    Unpickling can run arbitrary code, so each entry starts with an HMAC of its name
+    and contents under the secret key in 'key_file'. Entries with a wrong signature
+    are never unpickled.
+    """
+
+    def __init__(self, directory: str | None = None, max_bytes: int = default_max_bytes,
+                 key_file: str | None = None) -> None:
+        self.directory = directory if directory is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._secret = load_key(key_file if key_file is not None else default_key_file())
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, source_code: str) -> str:
+        digest = hashlib.sha256(compiler_version().encode())
+        digest.update(source_code.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str, kind: str) -> str:
+        if kind not in cache_kinds:
+            raise Exception(f'Unknown cache entry kind: {kind}')
+        return os.path.join(self.directory, f'{key}.{kind}')
+
+    def _signature(self, key: str, kind: str, data: bytes) -> bytes:
+        return hmac.new(self._secret, f'{key}.{kind}'.encode() + data, hashlib.sha256).digest()
+
+    def load(self, key: str, kind: str) -> Any | None:
+        """Returns the cached value, or None if there is no usable entry."""
+        path = self._path(key, kind)
+        try:
+            with open(path, 'rb') as f:
+                signature = f.read(_signature_bytes)
+                data = f.read()
+            if not hmac.compare_digest(signature, self._signature(key, kind, data)):
+                raise Exception(f'Cache entry {path} is not signed with the cache key')
+            value = pickle.loads(zlib.decompress(data))
+            os.utime(path)
+        except Exception:
+            # Missing, truncated, unsigned or otherwise unreadable entries are treated as misses.
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return value
+
+    def store(self, key: str, kind: str, value: Any) -> bool:
+        """Stores a value, returning False if it could not be serialized."""
+        try:
+            data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except RecursionError:
+            # Extremely deep trees cannot be pickled. They are simply not cached.
+            return False
+        self._write(self._path(key, kind), self._signature(key, kind, data) + data)
+        self.stats.stores += 1
+        self.evict()
+        return True
+
+    def _write(self, path: str, data: bytes) -> None:
+        """Replaces the file at 'path' in one step, so that readers never see it half written."""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        finally:
+            # The temporary file is only left if writing or renaming it failed.
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def entries(self) -> list[os.DirEntry[str]]:
+        return [entry for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.rsplit('.', 1)[-1] in cache_kinds]
+
+    def size(self) -> int:
+        return sum(entry.stat().st_size for entry in self.entries())
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits in 'max_bytes'."""
+        entries = [(entry.stat().st_mtime_ns, entry.stat().st_size, entry.path) for entry in self.entries()]
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        for entry in self.entries():
+            os.remove(entry.path)
+
+    def total_stats(self) -> CacheStats:
+        """Returns the statistics accumulated over all runs that called 'save_stats'."""
+        try:
+            with open(os.path.join(self.directory, _stats_file_name)) as f:
+                return CacheStats(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return CacheStats()
+
+    def save_stats(self) -> None:
+        """Adds the statistics of this run to the totals stored in the cache directory."""
+        total = self.total_stats()
+        for name, value in asdict(self.stats).items():
+            setattr(total, name, getattr(total, name) + value)
+        self._write(os.path.join(self.directory, _stats_file_name), json.dumps(asdict(total)).encode())
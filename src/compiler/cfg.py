@@ -0,0 +1,411 @@
+from dataclasses import dataclass, field
+from compiler import ir
+
+
+@dataclass(eq=False, slots=True)
+class BasicBlock:
+    """A sequence of instructions that is only entered at the top and only left at the bottom.
+
+    The leading label is kept apart from the instructions. A block whose last instruction
+    is not a Jump or CondJump falls through to its only successor, or ends the program
+    if it has none.
+    """
+    index: int
+    label: ir.Label | None
+    instructions: list[ir.Instruction] = field(default_factory=list)
+    succs: list['BasicBlock'] = field(default_factory=list)
+    preds: list['BasicBlock'] = field(default_factory=list)
+
+    def terminator(self) -> ir.Jump | ir.CondJump | None:
+        if self.instructions and isinstance(last := self.instructions[-1], (ir.Jump, ir.CondJump)):
+            return last
+        return None
+
+    def __repr__(self) -> str:
+        return f'B{self.index}'
+
+
+@dataclass
+class CFG:
+    """The basic blocks of an IR instruction list, in their original order.
+
+    The first entry is the start of the program. Every FunctionDefinition starts a
+    block that is another entry.
+    """
+    blocks: list[BasicBlock]
+    entries: list[BasicBlock]
+    next_label_num: int = 1
+    # Found on the first call of 'new_var', since few passes need new variables.
+    next_var_num: int | None = None
+
+    def new_label(self) -> ir.Label:
+        label = ir.Label(f'L{self.next_label_num}')
+        self.next_label_num += 1
+        return label
+
+    def new_var(self) -> ir.IRVar:
+        """Returns a variable named like the ones of the IR generator, that the blocks do not use yet.
+
+        The versions of a variable in SSA form (see 'ssa.py') count as uses of the variable.
+        """
+        if self.next_var_num is None:
+            self.next_var_num = 1
+            for block in self.blocks:
+                for insn in block.instructions:
+                    for var in insn.operands():
+                        number = var.name[1:].partition('.')[0]
+                        if var.name[0] == 'x' and number.isdigit():
+                            self.next_var_num = max(self.next_var_num, int(number) + 1)
+        var = ir.IRVar(f'x{self.next_var_num}')
+        self.next_var_num += 1
+        return var
+
+    def add_edge(self, source: BasicBlock, target: BasicBlock) -> None:
+        if target not in source.succs:
+            source.succs.append(target)
+            target.preds.append(source)
+
+    def remove_edge(self, source: BasicBlock, target: BasicBlock) -> None:
+        source.succs.remove(target)
+        target.preds.remove(source)
+
+    def renumber(self) -> None:
+        """Gives the blocks consecutive indices again after blocks have been added or removed."""
+        for index, block in enumerate(self.blocks):
+            block.index = index
+
+
+def label_of(cfg: CFG, block: BasicBlock) -> ir.Label:
+    """Returns the label of a block, giving it a new one if it has none."""
+    if block.label is None:
+        block.label = cfg.new_label()
+    return block.label
+
+
+def redirect_edge(cfg: CFG, source: BasicBlock, old: BasicBlock, new: BasicBlock) -> None:
+    """Makes the edge from 'source' to 'old' lead to 'new' instead, along with the jump that takes it."""
+    match source.terminator():
+        case ir.Jump():
+            source.instructions[-1] = ir.Jump(label_of(cfg, new))
+        case ir.CondJump() as cond_jump:
+            label = label_of(cfg, new)
+            source.instructions[-1] = ir.CondJump(
+                cond_jump.condition,
+                label if cond_jump.then_label == old.label else cond_jump.then_label,
+                label if cond_jump.else_label == old.label else cond_jump.else_label,
+            )
+    # The edge keeps its place among the successors, since the first one is where a block falls through to.
+    i = source.succs.index(old)
+    old.preds.remove(source)
+    if new in source.succs:
+        del source.succs[i]
+    else:
+        source.succs[i] = new
+        new.preds.append(source)
+
+
+def build_cfg(instructions: list[ir.Instruction]) -> CFG:
+    """Splits IR instructions into basic blocks and connects them."""
+    blocks: list[BasicBlock] = []
+    entries: list[BasicBlock] = []
+    by_label: dict[str, BasicBlock] = {}
+    next_label_num = 1
+    current: BasicBlock | None = None
+
+    def start(label: ir.Label | None) -> BasicBlock:
+        block = BasicBlock(len(blocks), label)
+        blocks.append(block)
+        if label is not None:
+            by_label[label.name] = block
+        return block
+
+    for insn in instructions:
+        if isinstance(insn, ir.Label):
+            current = start(insn)
+            if insn.name[1:].isdigit():
+                next_label_num = max(next_label_num, int(insn.name[1:]) + 1)
+            continue
+        if current is None or isinstance(insn, ir.FunctionDefinition) and current.instructions:
+            current = start(None)
+        if isinstance(insn, ir.FunctionDefinition):
+            entries.append(current)
+        current.instructions.append(insn)
+        if isinstance(insn, (ir.Jump, ir.CondJump)):
+            current = None
+
+    if not blocks:
+        start(None)
+    if not entries or entries[0] is not blocks[0]:
+        entries.insert(0, blocks[0])
+
+    cfg = CFG(blocks, entries, next_label_num)
+
+    def block_at(label: ir.Label) -> BasicBlock:
+        if label.name not in by_label:
+            raise Exception(f'Undefined label: {label.name}')
+        return by_label[label.name]
+
+    for block in blocks:
+        match block.terminator():
+            case ir.Jump() as jump:
+                cfg.add_edge(block, block_at(jump.label))
+            case ir.CondJump() as cond_jump:
+                cfg.add_edge(block, block_at(cond_jump.then_label))
+                cfg.add_edge(block, block_at(cond_jump.else_label))
+            case None if block.index + 1 < len(blocks):
+                cfg.add_edge(block, blocks[block.index + 1])
+    return cfg
+
+
+def linearize(cfg: CFG) -> list[ir.Instruction]:
+    """Turns the blocks back into an instruction list, in the order of 'cfg.blocks'.
+
+    Jumps are added where a block no longer falls through to the block after it.
+    """
+    instructions: list[ir.Instruction] = []
+    end_label: ir.Label | None = None
+
+    # Blocks that are jumped to need their labels before they are emitted.
+    for i, block in enumerate(cfg.blocks):
+        following = cfg.blocks[i + 1] if i + 1 < len(cfg.blocks) else None
+        if block.terminator() is None and block.succs and block.succs[0] is not following:
+            label_of(cfg, block.succs[0])
+
+    for i, block in enumerate(cfg.blocks):
+        following = cfg.blocks[i + 1] if i + 1 < len(cfg.blocks) else None
+        if block.label is not None:
+            instructions.append(block.label)
+        instructions.extend(block.instructions)
+        if block.terminator() is not None:
+            continue
+        if block.succs:
+            if block.succs[0] is not following:
+                instructions.append(ir.Jump(label_of(cfg, block.succs[0])))
+        elif following is not None:
+            if end_label is None:
+                end_label = cfg.new_label()
+            instructions.append(ir.Jump(end_label))
+    if end_label is not None:
+        instructions.append(end_label)
+    return instructions
+
+
+def remove_unreachable_blocks(cfg: CFG) -> int:
+    """Removes the blocks that cannot be reached from an entry and returns how many instructions they had.
+
+    Not for SSA form: the phis of the remaining blocks are not updated.
+    """
+    reachable = {block.index for block in reverse_postorder(cfg)}
+    removed = 0
+    for block in cfg.blocks:
+        if block.index not in reachable:
+            removed += len(block.instructions)
+            for succ in list(block.succs):
+                cfg.remove_edge(block, succ)
+    cfg.blocks = [block for block in cfg.blocks if block.index in reachable]
+    cfg.renumber()
+    return removed
+
+
+def reverse_postorder(cfg: CFG) -> list[BasicBlock]:
+    """Returns the blocks that can be reached from an entry, each before its successors except along back edges.
+
+    Successors are visited last to first, so that a loop body comes right after its
+    header instead of after all the code that follows the loop.
+    """
+    visited = [False] * len(cfg.blocks)
+    postorder: list[BasicBlock] = []
+    for entry in cfg.entries:
+        if visited[entry.index]:
+            continue
+        visited[entry.index] = True
+        stack = [(entry, len(entry.succs))]
+        while stack:
+            block, i = stack.pop()
+            if i > 0:
+                stack.append((block, i - 1))
+                succ = block.succs[i - 1]
+                if not visited[succ.index]:
+                    visited[succ.index] = True
+                    stack.append((succ, len(succ.succs)))
+            else:
+                postorder.append(block)
+    postorder.reverse()
+    return postorder
+
+
+@dataclass
+class Dominators:
+    """The dominator tree of a CFG.
+
+    A block dominates another if every path from an entry to the other block goes
+    through it. 'idom' holds the immediate dominator of each block by index; it is
+    None for entries and for blocks that cannot be reached.
+    """
+    idom: list[BasicBlock | None]
+    children: list[list[BasicBlock]]
+    roots: list[BasicBlock]
+    # Preorder and postorder numbers in the tree, or -1 for unreachable blocks.
+    _pre: list[int] = field(repr=False)
+    _post: list[int] = field(repr=False)
+
+    def dominates(self, a: BasicBlock, b: BasicBlock) -> bool:
+        return 0 <= self._pre[a.index] <= self._pre[b.index] and self._post[b.index] <= self._post[a.index]
+
+    def reachable(self, block: BasicBlock) -> bool:
+        return self._pre[block.index] >= 0
+
+    def preorder(self) -> list[BasicBlock]:
+        """Returns the reachable blocks, each after its dominators."""
+        order: list[BasicBlock] = []
+        stack = list(reversed(self.roots))
+        while stack:
+            block = stack.pop()
+            order.append(block)
+            stack.extend(reversed(self.children[block.index]))
+        return order
+
+
+def dominators(cfg: CFG) -> Dominators:
+    """Computes the dominator tree with the iterative algorithm of Cooper, Harvey and Kennedy."""
+    order = reverse_postorder(cfg)
+    # Position in reverse postorder, counting from 1; position 0 is a virtual root above all entries.
+    number = [-1] * len(cfg.blocks)
+    for i, block in enumerate(order):
+        number[block.index] = i + 1
+    idom_number = [-1] * (len(order) + 1)
+    idom_number[0] = 0
+    is_entry = [False] * len(cfg.blocks)
+    for entry in cfg.entries:
+        is_entry[entry.index] = True
+        idom_number[number[entry.index]] = 0
+
+    def intersect(a: int, b: int) -> int:
+        while a != b:
+            while a > b:
+                a = idom_number[a]
+            while b > a:
+                b = idom_number[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+        for i, block in enumerate(order):
+            if is_entry[block.index]:
+                continue
+            new_idom = -1
+            for pred in block.preds:
+                p = number[pred.index]
+                if p < 0 or idom_number[p] < 0:
+                    continue
+                new_idom = p if new_idom < 0 else intersect(p, new_idom)
+            if new_idom != idom_number[i + 1]:
+                idom_number[i + 1] = new_idom
+                changed = True
+
+    idom: list[BasicBlock | None] = [None] * len(cfg.blocks)
+    children: list[list[BasicBlock]] = [[] for _ in cfg.blocks]
+    roots: list[BasicBlock] = []
+    for i, block in enumerate(order):
+        parent = idom_number[i + 1]
+        if parent > 0:
+            idom[block.index] = order[parent - 1]
+            children[order[parent - 1].index].append(block)
+        else:
+            roots.append(block)
+
+    pre = [-1] * len(cfg.blocks)
+    post = [-1] * len(cfg.blocks)
+    counter = 0
+    for root in roots:
+        stack = [(root, False)]
+        while stack:
+            block, done = stack.pop()
+            if done:
+                post[block.index] = counter
+                counter += 1
+                continue
+            pre[block.index] = counter
+            counter += 1
+            stack.append((block, True))
+            stack.extend((child, False) for child in reversed(children[block.index]))
+    return Dominators(idom, children, roots, pre, post)
+
+
+@dataclass(eq=False)
+class Loop:
+    """A natural loop: the blocks from which a back edge to 'header' can be reached without passing the header."""
+    header: BasicBlock
+    blocks: set[BasicBlock]
+    latches: list[BasicBlock]
+    parent: 'Loop | None' = None
+
+    def depth(self) -> int:
+        depth = 1
+        loop = self.parent
+        while loop is not None:
+            depth += 1
+            loop = loop.parent
+        return depth
+
+    def exits(self) -> list[tuple[BasicBlock, BasicBlock]]:
+        """Returns the edges that leave the loop."""
+        blocks = sorted(self.blocks, key=lambda block: block.index)
+        return [(block, succ) for block in blocks for succ in block.succs if succ not in self.blocks]
+
+
+def find_loops(cfg: CFG, doms: Dominators) -> list[Loop]:
+    """Finds the natural loops, innermost loops first.
+
+    Back edges that share a header make up one loop. Cycles that are entered at
+    more than one block are not natural loops and are not reported.
+    """
+    latches: dict[BasicBlock, list[BasicBlock]] = {}
+    for block in cfg.blocks:
+        for succ in block.succs:
+            if doms.reachable(block) and doms.dominates(succ, block):
+                latches.setdefault(succ, []).append(block)
+
+    loops: list[Loop] = []
+    for header, header_latches in latches.items():
+        blocks = {header}
+        stack = [latch for latch in header_latches if latch is not header]
+        blocks.update(stack)
+        while stack:
+            block = stack.pop()
+            for pred in block.preds:
+                if pred not in blocks and doms.reachable(pred):
+                    blocks.add(pred)
+                    stack.append(pred)
+        loops.append(Loop(header, blocks, header_latches))
+
+    loops.sort(key=lambda loop: len(loop.blocks))
+    # Going from the outermost loops in, the last loop seen to contain a header is the one just around it.
+    innermost: dict[BasicBlock, Loop] = {}
+    for loop in reversed(loops):
+        loop.parent = innermost.get(loop.header)
+        for block in loop.blocks:
+            innermost[block] = loop
+    return loops
+
+
+def to_dot(cfg: CFG, name: str = 'cfg') -> str:
+    """Renders the CFG in the DOT language of Graphviz. Entries have a double border and back edges are dashed."""
+    doms = dominators(cfg)
+
+    def escape(text: str) -> str:
+        return text.replace('\\', '\\\\').replace('"', '\\"')
+
+    lines = [f'digraph {name} {{', '    node [shape=box, fontname="monospace"];']
+    entries = set(cfg.entries)
+    for block in cfg.blocks:
+        text = ''.join(escape(str(insn)) + '\\l' for insn in ([block.label] if block.label else []) + block.instructions)
+        style = ', peripheries=2' if block in entries else ''
+        lines.append(f'    {block!r} [label="{block!r}\\n{text}"{style}];')
+    for block in cfg.blocks:
+        for succ in block.succs:
+            style = ' [style=dashed]' if doms.reachable(block) and doms.dominates(succ, block) else ''
+            lines.append(f'    {block!r} -> {succ!r}{style};')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,420 @@
+import operator
+import sys
+from typing import Any, Callable
+from compiler import ast
+from compiler.budget import ExecutionBudget
+from compiler.completion import BREAK, CONTINUE, Completion
+from compiler.memo import Memoizer
+from compiler.profiler import Profile
+from compiler.resolver import resolve, resolved_depth, resolved_frame_size, resolved_slot
+
+Value = Any
+# A frame holds the local variables of one function call (or of the top level).
+# Slot 0 refers to the frame the function was defined in.
+Frame = list[Any]
+Code = Callable[[Frame], Value]
+
+_binary_operators: dict[str, Callable[[Any, Any], Any]] = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.floordiv,
+    '%': operator.mod,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '+=': operator.add,
+    '-=': operator.sub,
+}
+
+
+def _unary(x: Any) -> Any:
+    return not x if isinstance(x, bool) else -x
+
+
+def _may_complete(node: ast.Expression | None, completes: dict[int, bool]) -> bool:
+    """Whether evaluating the node can produce a Completion, i.e. whether it contains
+    'break', 'continue' or 'return' outside of a nested function definition.
+
+    'completes' holds the results by node id for one compilation. Without it,
+    deeply nested expressions would take quadratic time to compile.
+    """
+    cached = completes.get(id(node))
+    if cached is not None:
+        return cached
+    match node:
+        case ast.Break() | ast.Continue() | ast.Return():
+            result = True
+        case ast.BinaryOp():
+            result = _may_complete(node.left, completes) or _may_complete(node.right, completes)
+        case ast.UnaryOp():
+            result = _may_complete(node.right, completes)
+        case ast.VariableDeclaration():
+            result = _may_complete(node.assignment, completes)
+        case ast.Block():
+            result = any(_may_complete(expression, completes) for expression in node.expressions)
+        case ast.IfExpression():
+            result = (_may_complete(node.condition, completes) or _may_complete(node.then_branch, completes)
+                      or _may_complete(node.else_branch, completes))
+        case ast.WhileExpression():
+            result = _may_complete(node.condition, completes) or _may_complete(node.do, completes)
+        case ast.Function():
+            result = node.body is None and any(_may_complete(arg, completes) for arg in node.args)
+        case _:
+            result = False
+    completes[id(node)] = result
+    return result
+
+
+def _frame_getter(depth: int) -> Callable[[Frame], Frame]:
+    if depth == 0:
+        return lambda frame: frame
+    if depth == 1:
+        return lambda frame: frame[0]
+    def get(frame: Frame) -> Frame:
+        for _ in range(depth):
+            frame = frame[0]
+        return frame
+    return get
+
+
+def _raise(message: str) -> Code:
+    def fail(frame: Frame) -> Value:
+        raise Exception(message)
+    return fail
+
+
+def compile_program(node: ast.Expression, budget: ExecutionBudget | None = None,
+                    profile: Profile | None = None, memo: Memoizer | None = None) -> Callable[[], Value]:
+    """Compiles an AST once into a tree of Python closures and returns a function that runs it.
+
+    Names are resolved to frame slots by 'resolver.resolve' first, and operators are
+    bound to their Python implementations, so running the program does no name lookups.
+    Loops and calls only count against the budget if one is given, and the
+    program is only instrumented for profiling if it is given a profile.
+    Calls of pure functions are only memoized if a memoizer is given.
+    """
+    frame_size = resolve(node)
+    if memo is not None:
+        memo.find_pure_functions(node)
+    code = _compile(node, budget, profile, memo, {})
+
+    def run() -> Value:
+        result = code([None] * frame_size)
+        if isinstance(result, Completion):
+            return result.value
+        return result
+    return run if profile is None else profile.instrument_program(run)
+
+
+def _compile(node: ast.Expression, budget: ExecutionBudget | None, profile: Profile | None,
+             memo: Memoizer | None, completes: dict[int, bool]) -> Code:
+    code = _compile_node(node, budget, profile, memo, completes)
+    return code if profile is None else profile.instrument_node(node, code)
+
+
+def _compile_node(node: ast.Expression, budget: ExecutionBudget | None, profile: Profile | None,
+                  memo: Memoizer | None, completes: dict[int, bool]) -> Code:
+    match node:
+        case ast.Literal():
+            value = node.value
+            return lambda frame: value
+
+        case ast.Identifier():
+            return _compile_load(resolved_depth(node), resolved_slot(node))
+
+        case ast.BinaryOp():
+            return _compile_binary_op(node, budget, profile, memo, completes)
+
+        case ast.UnaryOp():
+            right = _compile(node.right, budget, profile, memo, completes)
+            if _may_complete(node.right, completes):
+                def checked_unary(frame: Frame) -> Value:
+                    value = right(frame)
+                    return value if value.__class__ is Completion else _unary(value)
+                return checked_unary
+            return lambda frame: _unary(right(frame))
+
+        case ast.VariableDeclaration():
+            assignment = _compile(node.assignment, budget, profile, memo, completes)
+            slot = resolved_slot(node)
+            if _may_complete(node.assignment, completes):
+                def checked_declare(frame: Frame) -> Value:
+                    value = assignment(frame)
+                    if value.__class__ is not Completion:
+                        frame[slot] = value
+                    return value
+                return checked_declare
+            def declare(frame: Frame) -> Value:
+                value = frame[slot] = assignment(frame)
+                return value
+            return declare
+
+        case ast.Block():
+            return _compile_block(node, budget, profile, memo, completes)
+
+        case ast.IfExpression():
+            condition = _compile(node.condition, budget, profile, memo, completes)
+            then_branch = _compile(node.then_branch, budget, profile, memo, completes)
+            else_branch = _compile(node.else_branch, budget, profile, memo, completes) if node.else_branch is not None else lambda frame: None
+            if _may_complete(node.condition, completes):
+                def checked_if(frame: Frame) -> Value:
+                    value = condition(frame)
+                    if value.__class__ is Completion:
+                        return value
+                    return then_branch(frame) if value else else_branch(frame)
+                return checked_if
+            if node.else_branch is None:
+                def if_then(frame: Frame) -> Value:
+                    if condition(frame):
+                        return then_branch(frame)
+                    return None
+                return if_then
+            return lambda frame: then_branch(frame) if condition(frame) else else_branch(frame)
+
+        case ast.WhileExpression():
+            return _compile_while(node, budget, profile, memo, completes)
+
+        case ast.Break():
+            return lambda frame: BREAK
+
+        case ast.Continue():
+            return lambda frame: CONTINUE
+
+        case ast.Return():
+            return_value = _compile(node.value, budget, profile, memo, completes)
+            def return_completion(frame: Frame) -> Value:
+                value = return_value(frame)
+                return value if value.__class__ is Completion else Completion('return', value)
+            return return_completion
+
+        case ast.Function():
+            if node.body is not None:
+                return _compile_function_definition(node, budget, profile, memo, completes)
+            return _compile_call(node, budget, profile, memo, completes)
+
+        case _:
+            return _raise(f'{node} is not supported')
+
+
+def _compile_load(depth: int, slot: int) -> Code:
+    if depth == 0:
+        return lambda frame: frame[slot]
+    if depth == 1:
+        return lambda frame: frame[0][slot]
+    get_frame = _frame_getter(depth)
+    return lambda frame: get_frame(frame)[slot]
+
+
+def _compile_binary_op(node: ast.BinaryOp, budget: ExecutionBudget | None, profile: Profile | None,
+                       memo: Memoizer | None, completes: dict[int, bool]) -> Code:
+    if node.operation == '=' and isinstance(node.left, ast.Identifier):
+        right = _compile(node.right, budget, profile, memo, completes)
+        get_frame = _frame_getter(resolved_depth(node.left))
+        slot = resolved_slot(node.left)
+        if _may_complete(node.right, completes):
+            def checked_assign(frame: Frame) -> Value:
+                value = right(frame)
+                if value.__class__ is Completion:
+                    return value
+                get_frame(frame)[slot] = value
+                return None
+            return checked_assign
+        def assign(frame: Frame) -> Value:
+            get_frame(frame)[slot] = right(frame)
+            return None
+        return assign
+
+    left = _compile(node.left, budget, profile, memo, completes)
+    right = _compile(node.right, budget, profile, memo, completes)
+    if node.operation == 'and':
+        def and_operation(frame: Frame) -> Value:
+            value = left(frame)
+            if value == True:
+                value = right(frame)
+                if value.__class__ is Completion:
+                    return value
+                return value if isinstance(value, bool) else False
+            return value if value.__class__ is Completion else False
+        return and_operation
+    if node.operation == 'or':
+        def or_operation(frame: Frame) -> Value:
+            value = left(frame)
+            if value == False:
+                value = right(frame)
+                if value.__class__ is Completion:
+                    return value
+                return value if isinstance(value, bool) else False
+            return value if value.__class__ is Completion else True
+        return or_operation
+
+    operation = _binary_operators.get(node.operation)
+    if operation is None:
+        return _raise(f'operation {node.operation} does not exist')
+    if _may_complete(node.left, completes) or _may_complete(node.right, completes):
+        def checked_operation(frame: Frame) -> Value:
+            a = left(frame)
+            if a.__class__ is Completion:
+                return a
+            b = right(frame)
+            if b.__class__ is Completion:
+                return b
+            return operation(a, b)
+        return checked_operation
+    return lambda frame: operation(left(frame), right(frame))
+
+
+def _compile_block(node: ast.Block, budget: ExecutionBudget | None, profile: Profile | None,
+                   memo: Memoizer | None, completes: dict[int, bool]) -> Code:
+    expressions = node.expressions
+    last = expressions[-1]
+    if isinstance(last, ast.Literal) and last.value is None:
+        # A block that ends with ';' evaluates to its last expression before it.
+        expressions = expressions[:-1]
+    codes = [_compile(expression, budget, profile, memo, completes) for expression in expressions]
+
+    if not codes:
+        return lambda frame: None
+    if len(codes) == 1:
+        return codes[0]
+    body, result = tuple(codes[:-1]), codes[-1]
+    def block(frame: Frame) -> Value:
+        for code in body:
+            value = code(frame)
+            if value.__class__ is Completion:
+                return value
+        return result(frame)
+    return block
+
+
+def _compile_while(node: ast.WhileExpression, budget: ExecutionBudget | None, profile: Profile | None,
+                   memo: Memoizer | None, completes: dict[int, bool]) -> Code:
+    condition = _compile(node.condition, budget, profile, memo, completes)
+    do = _compile(node.do, budget, profile, memo, completes)
+    if budget is not None:
+        # Every iteration is a step, counted before the body runs.
+        tick, location, body = budget.tick, node.location, do
+        def counted_do(frame: Frame) -> Value:
+            tick(location)
+            return body(frame)
+        do = counted_do
+    if _may_complete(node.condition, completes):
+        def checked_while_loop(frame: Frame) -> Value:
+            while True:
+                value = condition(frame)
+                if value != True:
+                    # A completion from the condition belongs to an enclosing loop or call.
+                    return value if value.__class__ is Completion else None
+                result = do(frame)
+                if result.__class__ is Completion:
+                    if result is BREAK:
+                        return None
+                    if result is not CONTINUE:
+                        return result
+        return checked_while_loop
+    def while_loop(frame: Frame) -> Value:
+        while condition(frame) == True:
+            result = do(frame)
+            if result.__class__ is Completion:
+                if result is BREAK:
+                    break
+                if result is not CONTINUE:
+                    return result
+        return None
+    return while_loop
+
+
+def _compile_function_definition(node: ast.Function, budget: ExecutionBudget | None, profile: Profile | None,
+                                 memo: Memoizer | None, completes: dict[int, bool]) -> Code:
+    parameter_slots = [resolved_slot(parameter) for parameter in node.args]
+    body = _compile(node.body, budget, profile, memo, completes)
+    frame_size = resolved_frame_size(node)
+    slot = resolved_slot(node)
+    name = node.name
+    arity = len(parameter_slots)
+    stats = profile.function_stats(node) if profile is not None else None
+    table = memo.table(node) if memo is not None else None
+
+    def define(frame: Frame) -> Value:
+        def function(*args: Value) -> Value:
+            if len(args) != arity:
+                raise Exception(f'Expected {arity} arguments')
+            callee_frame: Frame = [None] * frame_size
+            callee_frame[0] = frame
+            for parameter_slot, arg in zip(parameter_slots, args):
+                callee_frame[parameter_slot] = arg
+            result = body(callee_frame)
+            if result.__class__ is Completion:
+                return result.value
+            return result
+        function.__name__ = name
+        if profile is not None and stats is not None:
+            function = profile.instrument_function(stats, function)
+        # Calls answered from the table do not run the function, so the profile does not count them.
+        frame[slot] = table.memoize(function) if table is not None else function
+        return None
+    return define
+
+
+def _compile_call(node: ast.Function, budget: ExecutionBudget | None, profile: Profile | None,
+                  memo: Memoizer | None, completes: dict[int, bool]) -> Code:
+    args = [_compile(arg, budget, profile, memo, completes) for arg in node.args]
+    if node.slot is None:
+        return _compile_library_call(node.name, args)
+
+    load = _compile_load(resolved_depth(node), resolved_slot(node))
+    if budget is not None:
+        enter_call, leave_call = budget.enter_call, budget.leave_call
+        location = node.location
+        def budgeted_call(frame: Frame) -> Value:
+            function = load(frame)
+            values = []
+            for arg in args:
+                value = arg(frame)
+                if value.__class__ is Completion:
+                    return value
+                values.append(value)
+            enter_call(location)
+            try:
+                return function(*values)
+            finally:
+                leave_call()
+        return budgeted_call
+    if any(_may_complete(arg, completes) for arg in node.args):
+        def checked_call(frame: Frame) -> Value:
+            function = load(frame)
+            values = []
+            for arg in args:
+                value = arg(frame)
+                if value.__class__ is Completion:
+                    return value
+                values.append(value)
+            return function(*values)
+        return checked_call
+    if len(args) == 1:
+        arg, = args
+        return lambda frame: load(frame)(arg(frame))
+    if len(args) == 2:
+        first, second = args
+        return lambda frame: load(frame)(first(frame), second(frame))
+    return lambda frame: load(frame)(*[arg(frame) for arg in args])
+
+
+def _compile_library_call(name: str, args: list[Code]) -> Code:
+    if name == 'read_int':
+        return lambda frame: int(sys.stdin.readline())
+
+    expected_type = int if name == 'print_int' else bool
+    def print_values(frame: Frame) -> Value:
+        for arg in args:
+            value = arg(frame)
+            if value.__class__ is Completion:
+                return value
+            if type(value) is not expected_type:
+                raise Exception(f'Expected {"an integer" if expected_type is int else "a boolean value"}, but get {value}')
+            print(value)
+        return None
+    return print_values
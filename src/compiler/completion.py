@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(slots=True)
+class Completion:
+    """Signals that 'break', 'continue' or 'return' ended an evaluation early.
+
+    It is returned instead of a value, and every expression passes it on until
+    a loop (or, for 'return', a function call) handles it. Both engines use it.
+    """
+    kind: str
+    value: Any = None
+
+
+BREAK = Completion('break')
+CONTINUE = Completion('continue')
@@ -0,0 +1,171 @@
+from compiler import ir
+from compiler.cfg import CFG, BasicBlock, remove_unreachable_blocks
+from compiler.dataflow import bitset, index_vars, liveness, solve
+from compiler.dce import remove_dead_instructions
+
+
+class _Copies:
+    """The copies known to hold at a point of a block: each destination has the value of its source."""
+
+    def __init__(self) -> None:
+        self.source_of: dict[ir.IRVar, ir.IRVar] = {}
+        self.dests_of: dict[ir.IRVar, list[ir.IRVar]] = {}
+
+    def add(self, dest: ir.IRVar, source: ir.IRVar) -> None:
+        self.source_of[dest] = source
+        self.dests_of.setdefault(source, []).append(dest)
+
+    def written(self, var: ir.IRVar) -> None:
+        self.source_of.pop(var, None)
+        for dest in self.dests_of.pop(var, []):
+            if self.source_of.get(dest) is var:
+                del self.source_of[dest]
+
+    def resolve(self, var: ir.IRVar) -> ir.IRVar:
+        # A copy of a copy has the value of the first source. Chains cannot loop,
+        # since a copy into a variable ends the copies out of it.
+        while var in self.source_of:
+            var = self.source_of[var]
+        return var
+
+
+def _rewrite_reads(block: BasicBlock, known: _Copies) -> int:
+    """Replaces reads of copies in a block, starting from the copies known at its start, and returns how many changed."""
+    changed = 0
+
+    def use(var: ir.IRVar) -> ir.IRVar:
+        nonlocal changed
+        source = known.resolve(var)
+        if source is not var:
+            changed += 1
+        return source
+
+    instructions = []
+    for insn in block.instructions:
+        insn = insn.map_vars(use, lambda var: var)
+        for var in insn.defs():
+            known.written(var)
+        if isinstance(insn, ir.Copy) and insn.source is not None and insn.dest is not None and insn.source is not insn.dest:
+            known.add(insn.dest, insn.source)
+        instructions.append(insn)
+    block.instructions = instructions
+    return changed
+
+
+def propagate_copies(cfg: CFG) -> int:
+    """Makes instructions read the source of a copy instead of its destination, and returns how many reads changed.
+
+    A read is changed where the copy has run on every path to it, and neither
+    variable has been written since (an available copy). The copy itself is left
+    for dead code elimination.
+    """
+    # Copies within blocks are followed first, so that copies of copies read the
+    # first source before they are followed into other blocks.
+    changed = sum(_rewrite_reads(block, _Copies()) for block in cfg.blocks)
+
+    index = index_vars(cfg)
+    bits = index.bits
+    exposed_count = index.exposed_count
+    # Copies into variables that are read in other blocks are numbered for the
+    # dataflow problem. The others have no effect outside their own block.
+    copies: list[ir.Copy] = []
+    numbers_of: dict[ir.IRVar, list[int]] = {}
+    for block in cfg.blocks:
+        for insn in block.instructions:
+            if (isinstance(insn, ir.Copy) and insn.source is not None and insn.dest is not None
+                    and insn.source is not insn.dest and bits[insn.dest] < exposed_count):
+                numbers_of.setdefault(insn.source, []).append(len(copies))
+                numbers_of.setdefault(insn.dest, []).append(len(copies))
+                copies.append(insn)
+
+    gen: list[int] = []
+    kill: list[int] = []
+    number = 0
+    for block in cfg.blocks:
+        generated: dict[int, ir.Copy] = {}
+        defined: set[ir.IRVar] = set()
+        for insn in block.instructions:
+            for var in insn.defs():
+                defined.add(var)
+                for killed in numbers_of.get(var, []):
+                    generated.pop(killed, None)
+            if number < len(copies) and insn is copies[number]:
+                generated[number] = copies[number]
+                number += 1
+        gen.append(bitset(generated))
+        kill.append(bitset(killed for var in defined for killed in numbers_of.get(var, [])))
+    available = solve(cfg, gen, kill, forward=True, intersect=True, universe=(1 << len(copies)) - 1).ins
+
+    for block in cfg.blocks:
+        known = _Copies()
+        facts = available[block.index]
+        while facts:
+            low = facts & -facts
+            copy = copies[low.bit_length() - 1]
+            assert copy.source is not None and copy.dest is not None
+            known.add(copy.dest, copy.source)
+            facts ^= low
+        changed += _rewrite_reads(block, known)
+    return changed
+
+
+def coalesce_copies(cfg: CFG) -> int:
+    """Gives the source and destination of a copy the same variable where their values are never both needed at once.
+
+    Two variables interfere if one is written while the other is live, except that
+    the destination of a copy does not interfere with its source because of the
+    copy. Copies between variables that do not interfere are merged in program
+    order, and the copies that are left with the same source and destination are
+    removed. Returns how many variables were merged.
+    """
+    live = liveness(cfg)
+    interference: dict[ir.IRVar, set[ir.IRVar]] = {}
+    for block in cfg.blocks:
+        live_vars = set(live.index.to_vars(live.live_out[block.index]))
+        for insn in reversed(block.instructions):
+            defs = insn.defs()
+            copied = insn.source if isinstance(insn, ir.Copy) else None
+            for var in defs:
+                neighbours = interference.setdefault(var, set())
+                for other in live_vars:
+                    if other is not var and other is not copied:
+                        neighbours.add(other)
+                        interference.setdefault(other, set()).add(var)
+            live_vars.difference_update(defs)
+            live_vars.update(insn.uses())
+
+    parent: dict[ir.IRVar, ir.IRVar] = {}
+
+    def find(var: ir.IRVar) -> ir.IRVar:
+        while var in parent:
+            var = parent[var]
+        return var
+
+    for block in cfg.blocks:
+        for insn in block.instructions:
+            if not isinstance(insn, ir.Copy) or insn.source is None or insn.dest is None:
+                continue
+            kept, merged = find(insn.source), find(insn.dest)
+            if kept is merged or merged in interference.get(kept, ()):
+                continue
+            parent[merged] = kept
+            # The interference of the merged variable is now that of the one it was merged into.
+            neighbours = interference.setdefault(kept, set())
+            for other in interference.pop(merged, set()):
+                interference[other].discard(merged)
+                interference[other].add(kept)
+                neighbours.add(other)
+
+    if parent:
+        for block in cfg.blocks:
+            block.instructions = [insn for insn in (insn.map_vars(find, find) for insn in block.instructions)
+                                  if not (isinstance(insn, ir.Copy) and insn.source is insn.dest)]
+    return len(parent)
+
+
+def eliminate_copies(cfg: CFG) -> None:
+    """Removes copies by copy propagation, dead code elimination and coalescing, in that order."""
+    remove_unreachable_blocks(cfg)
+    if propagate_copies(cfg):
+        remove_dead_instructions(cfg)
+    coalesce_copies(cfg)
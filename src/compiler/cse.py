@@ -0,0 +1,117 @@
+from collections import Counter
+from compiler import ir
+from compiler.cfg import CFG, BasicBlock, dominators
+from compiler.ir_vm import binary_operators, unary_operators
+from compiler.ssa import from_ssa, to_ssa
+
+_pure_operators = set(binary_operators) | set(unary_operators)
+_commutative_operators = {'+', '*', '==', '!='}
+# 'a > b' is 'b < a', so both get the same value number.
+_swapped_operators = {'>': '<', '>=': '<='}
+
+# An operator with the value numbers of its arguments, or the type and value of a constant.
+# A value number is the variable that first held the value.
+Key = tuple[object, ...]
+
+
+def number_values(cfg: CFG, origin: dict[ir.IRVar, ir.IRVar]) -> int:
+    """Replaces operator calls that compute a value that a dominating instruction already computed by copies of it.
+
+    Works on a CFG in SSA form, with the original variable of each version in
+    'origin', by value numbering over the dominator tree (Briggs, Cooper and
+    Simpson): a value computed in a block can be reused in the blocks it
+    dominates. Copies and loads of the same constant give their destinations the
+    value number of their source, so that calls on them match too. A reused
+    division or remainder cannot trap, since the dominating one would already
+    have stopped the program.
+
+    The variable of a reused result must keep its value until the copies read it,
+    also once the CFG leaves SSA form. If it is a version of a variable with
+    other versions, the result is first written to a new variable, which is then
+    copied to it. Returns how many calls were replaced.
+    """
+    doms = dominators(cfg)
+    version_counts = Counter(origin.values())
+    value: dict[ir.IRVar, ir.IRVar] = {}
+    constants: dict[Key, ir.IRVar] = {}
+    # The block and position of the call that computed each value, and its value number.
+    computed: dict[Key, tuple[BasicBlock, int, ir.IRVar]] = {}
+    computed_keys: list[Key] = []
+    copies_after: dict[BasicBlock, dict[int, ir.Instruction]] = {}
+    replaced = 0
+
+    def number(var: ir.IRVar) -> ir.IRVar:
+        return value.get(var, var)
+
+    def key_of(call: ir.Call) -> Key | None:
+        name = call.fun.name
+        if name not in _pure_operators:
+            return None
+        args = [number(arg) for arg in call.args]
+        if name in _swapped_operators and len(args) == 2:
+            name = _swapped_operators[name]
+            args.reverse()
+        elif name in _commutative_operators and len(args) == 2 and args[0].id > args[1].id:
+            args.reverse()
+        return (name, *args)
+
+    def result_of(block: BasicBlock, i: int) -> ir.IRVar:
+        call = block.instructions[i]
+        assert isinstance(call, ir.Call)
+        dest = call.dest
+        if dest in origin and version_counts[origin[dest]] > 1:
+            result = cfg.new_var()
+            block.instructions[i] = ir.Call(call.fun, call.args, result)
+            copies_after.setdefault(block, {})[i] = ir.Copy(result, dest)
+            return result
+        return dest
+
+    # The stack has the blocks to number, and None to forget the calls of the block whose subtree was just finished.
+    marks: list[int] = []
+    stack: list[BasicBlock | None] = list(reversed(doms.roots))
+    while stack:
+        top = stack.pop()
+        if top is None:
+            mark = marks.pop()
+            for forgotten in computed_keys[mark:]:
+                del computed[forgotten]
+            del computed_keys[mark:]
+            continue
+        block = top
+        marks.append(len(computed_keys))
+        for i, insn in enumerate(block.instructions):
+            match insn:
+                case ir.LoadIntConst() | ir.LoadBoolConst():
+                    constant = (type(insn).__name__, insn.value)
+                    value[insn.dest] = constants.setdefault(constant, insn.dest)
+                case ir.Copy() if insn.source is not None and insn.dest is not None:
+                    value[insn.dest] = number(insn.source)
+                case ir.Call():
+                    key = key_of(insn)
+                    if key is None:
+                        continue
+                    if key in computed:
+                        source_block, j, value[insn.dest] = computed[key]
+                        block.instructions[i] = ir.Copy(result_of(source_block, j), insn.dest)
+                        replaced += 1
+                    else:
+                        computed_keys.append(key)
+                        computed[key] = (block, i, insn.dest)
+        stack.append(None)
+        stack.extend(reversed(doms.children[block.index]))
+
+    for block, copies in copies_after.items():
+        instructions: list[ir.Instruction] = []
+        for i, insn in enumerate(block.instructions):
+            instructions.append(insn)
+            if i in copies:
+                instructions.append(copies[i])
+        block.instructions = instructions
+    return replaced
+
+
+def eliminate_common_subexpressions(cfg: CFG) -> None:
+    """Reuses the results of operator calls instead of computing them again, by value numbering in SSA form."""
+    origin = to_ssa(cfg)
+    number_values(cfg, origin)
+    from_ssa(cfg, origin)
@@ -0,0 +1,242 @@
+import heapq
+from dataclasses import dataclass
+from typing import Iterable
+from compiler import ir
+from compiler.cfg import CFG, BasicBlock, reverse_postorder
+
+# Sets of variables and definitions are Python ints used as bitsets, so that
+# unions and differences of thousands of elements are single operations.
+# Operations take time in proportion to the highest bit, so bitsets are built
+# with as few operations on large ints as possible, and 'a & ~b' (which has to
+# negate 'b') is written 'a ^ (a & b)'.
+
+
+def bitset(positions: Iterable[int]) -> int:
+    """Returns the bitset of the given bit positions."""
+    positions = list(positions)
+    if not positions:
+        return 0
+    # Positions are usually close together, so the bits are set in a small int that is shifted once.
+    low = min(positions)
+    mask = 0
+    for position in positions:
+        mask |= 1 << (position - low)
+    return mask << low
+
+
+@dataclass
+class VarIndex:
+    """Numbers the variables of a CFG densely from 0, for use as bit positions.
+
+    The first 'exposed_count' variables are the ones that some block reads before
+    writing them. Only those can be live at the start or end of a block, so bitsets
+    of block boundaries only need the lowest bits.
+    """
+    vars: list[ir.IRVar]
+    bits: dict[ir.IRVar, int]
+    exposed_count: int
+
+    def bit(self, var: ir.IRVar) -> int:
+        return 1 << self.bits[var]
+
+    def to_vars(self, bitset: int) -> list[ir.IRVar]:
+        result = []
+        while bitset:
+            low = bitset & -bitset
+            result.append(self.vars[low.bit_length() - 1])
+            bitset ^= low
+        return result
+
+
+def index_vars(cfg: CFG) -> VarIndex:
+    exposed: dict[ir.IRVar, None] = {}
+    seen: dict[ir.IRVar, None] = {}
+    for block in cfg.blocks:
+        defined: set[ir.IRVar] = set()
+        for insn in block.instructions:
+            for var in insn.uses():
+                if var not in defined:
+                    exposed[var] = None
+                seen[var] = None
+            for var in insn.defs():
+                defined.add(var)
+                seen[var] = None
+    vars = list(exposed)
+    vars.extend(var for var in seen if var not in exposed)
+    return VarIndex(vars, {var: bit for bit, var in enumerate(vars)}, len(exposed))
+
+
+@dataclass
+class DataflowResult:
+    """The facts at the start and at the end of each block, by block index."""
+    ins: list[int]
+    outs: list[int]
+
+
+def solve(cfg: CFG, gen: list[int], kill: list[int], forward: bool,
+          intersect: bool = False, universe: int = 0, boundary: int = 0) -> DataflowResult:
+    """Solves a gen/kill dataflow problem with a worklist.
+
+    The transfer function of a block is 'gen | (facts & ~kill)'. Facts flow along
+    edges in the given direction and meet by union, or by intersection if
+    'intersect' is set, in which case they start at 'universe'. The facts entering
+    an entry (forward) or leaving an exit (backward) are 'boundary'.
+    """
+    count = len(cfg.blocks)
+    initial = universe if intersect else 0
+    ins = [initial] * count
+    outs = [initial] * count
+    # 'before' is the side facts enter a block from, 'after' the side they leave it.
+    before, after = (ins, outs) if forward else (outs, ins)
+    sources = [block.preds if forward else block.succs for block in cfg.blocks]
+    targets = [block.succs if forward else block.preds for block in cfg.blocks]
+    is_boundary = [False] * count
+    if forward:
+        for entry in cfg.entries:
+            is_boundary[entry.index] = True
+    else:
+        for block in cfg.blocks:
+            is_boundary[block.index] = not block.succs
+
+    # Blocks are visited in reverse postorder (postorder for backward problems),
+    # lowest position first, so that facts reach a block from all of its sources
+    # before it is visited again.
+    order = reverse_postorder(cfg)
+    seen = {block.index for block in order}
+    order.extend(block for block in cfg.blocks if block.index not in seen)
+    if not forward:
+        order.reverse()
+    position = [0] * count
+    for i, block in enumerate(order):
+        position[block.index] = i
+    worklist = list(range(count))
+    queued = [True] * count
+
+    while worklist:
+        i = order[heapq.heappop(worklist)].index
+        queued[i] = False
+        if is_boundary[i] and not sources[i]:
+            facts = boundary
+        elif intersect:
+            facts = universe
+            for source in sources[i]:
+                facts &= after[source.index]
+            if is_boundary[i]:
+                facts &= boundary
+        else:
+            facts = boundary if is_boundary[i] else 0
+            for source in sources[i]:
+                facts |= after[source.index]
+        before[i] = facts
+        new_after = gen[i] | (facts ^ (facts & kill[i]))
+        if new_after != after[i]:
+            after[i] = new_after
+            for target in targets[i]:
+                if not queued[target.index]:
+                    queued[target.index] = True
+                    heapq.heappush(worklist, position[target.index])
+    return DataflowResult(ins, outs)
+
+
+@dataclass
+class Liveness:
+    """The variables that may be read later without being written first, at the start and end of each block."""
+    index: VarIndex
+    live_in: list[int]
+    live_out: list[int]
+
+    def live_after(self, block: BasicBlock) -> list[int]:
+        """Returns the live variables right after each instruction of a block."""
+        bits = self.index.bits
+        live = self.live_out[block.index]
+        result = [0] * len(block.instructions)
+        for i in range(len(block.instructions) - 1, -1, -1):
+            result[i] = live
+            insn = block.instructions[i]
+            for var in insn.defs():
+                if live >> bits[var] & 1:
+                    live ^= 1 << bits[var]
+            for var in insn.uses():
+                live |= 1 << bits[var]
+        return result
+
+
+def liveness(cfg: CFG, index: VarIndex | None = None) -> Liveness:
+    index = index if index is not None else index_vars(cfg)
+    bits = index.bits
+    exposed_count = index.exposed_count
+    uses: list[int] = []
+    defs: list[int] = []
+    for block in cfg.blocks:
+        used: list[int] = []
+        defined: set[int] = set()
+        for insn in block.instructions:
+            for var in insn.uses():
+                if bits[var] not in defined:
+                    used.append(bits[var])
+            for var in insn.defs():
+                defined.add(bits[var])
+        uses.append(bitset(used))
+        defs.append(bitset(bit for bit in defined if bit < exposed_count))
+    result = solve(cfg, uses, defs, forward=False)
+    return Liveness(index, result.ins, result.outs)
+
+
+@dataclass(frozen=True, slots=True)
+class Definition:
+    """An instruction that writes a variable."""
+    block: BasicBlock
+    position: int
+    var: ir.IRVar
+
+
+@dataclass
+class ReachingDefinitions:
+    """The definitions that may reach the start and end of each block, as bitsets of indices into 'definitions'.
+
+    Only definitions of variables that some block reads before writing them are
+    numbered. The others are only read, if at all, in their own block.
+    """
+    definitions: list[Definition]
+    # The definitions of each variable.
+    of_var: dict[ir.IRVar, int]
+    reach_in: list[int]
+    reach_out: list[int]
+
+    def reaching(self, bitset: int) -> list[Definition]:
+        result = []
+        while bitset:
+            low = bitset & -bitset
+            result.append(self.definitions[low.bit_length() - 1])
+            bitset ^= low
+        return result
+
+
+def reaching_definitions(cfg: CFG, index: VarIndex | None = None) -> ReachingDefinitions:
+    index = index if index is not None else index_vars(cfg)
+    bits = index.bits
+    exposed_count = index.exposed_count
+    definitions: list[Definition] = []
+    numbers: dict[ir.IRVar, list[int]] = {}
+    # The last definition of each variable in each block.
+    last_defs: list[dict[ir.IRVar, int]] = []
+    for block in cfg.blocks:
+        last: dict[ir.IRVar, int] = {}
+        for position, insn in enumerate(block.instructions):
+            for var in insn.defs():
+                if bits[var] >= exposed_count:
+                    continue
+                number = len(definitions)
+                definitions.append(Definition(block, position, var))
+                numbers.setdefault(var, []).append(number)
+                last[var] = number
+        last_defs.append(last)
+    of_var = {var: bitset(var_numbers) for var, var_numbers in numbers.items()}
+
+    gen = []
+    kill = []
+    for last in last_defs:
+        gen.append(bitset(last.values()))
+        kill.append(bitset(number for var in last for number in numbers[var] if number != last[var]))
+    result = solve(cfg, gen, kill, forward=True)
+    return ReachingDefinitions(definitions, of_var, result.ins, result.outs)
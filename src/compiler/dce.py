@@ -0,0 +1,138 @@
+from compiler import ir
+from compiler.cfg import CFG, BasicBlock, redirect_edge, remove_unreachable_blocks
+from compiler.dataflow import liveness
+from compiler.ir_vm import binary_operators, unary_operators
+
+# Operators that cannot fail. Division and remainder stop the program on a zero
+# divisor, so they are kept even when their result is never read.
+_removable_operators = (set(binary_operators) | set(unary_operators)) - {'/', '%'}
+
+
+def has_side_effects(insn: ir.Instruction) -> bool:
+    """Tells whether an instruction does anything besides writing its destination."""
+    if isinstance(insn, (ir.LoadIntConst, ir.LoadBoolConst, ir.Copy)):
+        return False
+    if isinstance(insn, ir.Call):
+        return insn.fun.name not in _removable_operators
+    return True
+
+
+def remove_dead_instructions(cfg: CFG) -> int:
+    """Removes the instructions without side effects whose results are never read, and returns how many there were.
+
+    Removing an instruction can make the instructions that compute its operands
+    dead in turn. Within a block they are found in the same backward walk; across
+    blocks, liveness is computed again until nothing more is removed.
+    """
+    removed = 0
+    while True:
+        live = liveness(cfg)
+        bits = live.index.bits
+        exposed_count = live.index.exposed_count
+        again = False
+        for block in cfg.blocks:
+            live_vars = set(live.index.to_vars(live.live_out[block.index]))
+            kept: list[ir.Instruction] = []
+            for insn in reversed(block.instructions):
+                defs = insn.defs()
+                dead = not has_side_effects(insn) and not any(var in live_vars for var in defs)
+                if dead or isinstance(insn, ir.Copy) and insn.source is insn.dest:
+                    removed += 1
+                    again = again or any(bits[var] < exposed_count for var in insn.uses())
+                    continue
+                live_vars.difference_update(defs)
+                live_vars.update(insn.uses())
+                kept.append(insn)
+            kept.reverse()
+            block.instructions = kept
+        if not again:
+            return removed
+
+
+def skip_empty_blocks(cfg: CFG) -> int:
+    """Makes the jumps to blocks that only jump on go straight to the final target, and returns how many jumps were redirected.
+
+    The skipped blocks are left in place; they are unreachable once nothing falls through to them.
+    """
+    entries = set(cfg.entries)
+    redirected = 0
+    for block in cfg.blocks:
+        if block in entries or len(block.succs) != 1 or block.succs[0] is block:
+            continue
+        if block.instructions and not (len(block.instructions) == 1 and isinstance(block.instructions[0], ir.Jump)):
+            continue
+        target = block.succs[0]
+        # An empty block can follow a chain of them.
+        seen = {block}
+        while (target not in seen and len(target.succs) == 1 and target not in entries
+               and (not target.instructions or len(target.instructions) == 1 and isinstance(target.instructions[0], ir.Jump))):
+            seen.add(target)
+            target = target.succs[0]
+        if target in seen:
+            continue
+        for pred in list(block.preds):
+            if pred.terminator() is None:
+                # Falling through to the empty block is cheaper than jumping past it.
+                continue
+            redirect_edge(cfg, pred, block, target)
+            redirected += 1
+    return redirected
+
+
+def simplify_branches(cfg: CFG) -> None:
+    """Turns conditional jumps whose targets are the same block into jumps."""
+    for block in cfg.blocks:
+        terminator = block.terminator()
+        if isinstance(terminator, ir.CondJump) and len(block.succs) == 1:
+            block.instructions[-1] = ir.Jump(terminator.then_label)
+
+
+def merge_blocks(cfg: CFG) -> int:
+    """Appends each block to its predecessor when they only lead to each other, and returns how many jumps that removed."""
+    entries = set(cfg.entries)
+    merged: set[BasicBlock] = set()
+    removed = 0
+    for block in cfg.blocks:
+        if block in merged:
+            continue
+        while len(block.succs) == 1 and not isinstance(block.terminator(), ir.CondJump):
+            succ = block.succs[0]
+            if succ is block or len(succ.preds) != 1 or succ in entries:
+                break
+            if block.terminator() is not None:
+                block.instructions.pop()
+                removed += 1
+            block.instructions.extend(succ.instructions)
+            cfg.remove_edge(block, succ)
+            for next_block in list(succ.succs):
+                cfg.remove_edge(succ, next_block)
+                cfg.add_edge(block, next_block)
+            merged.add(succ)
+    cfg.blocks = [block for block in cfg.blocks if block not in merged]
+    cfg.renumber()
+    return removed
+
+
+def remove_jumps_to_next_block(cfg: CFG) -> int:
+    removed = 0
+    for block, following in zip(cfg.blocks, cfg.blocks[1:]):
+        if isinstance(block.terminator(), ir.Jump) and block.succs[0] is following:
+            block.instructions.pop()
+            removed += 1
+    return removed
+
+
+def eliminate_dead_code(cfg: CFG) -> None:
+    """Removes dead instructions, unreachable blocks and needless jumps.
+
+    Calls of functions other than the operators are kept, since they can read
+    input, print or stop the program.
+    """
+    remove_unreachable_blocks(cfg)
+    simplify_branches(cfg)
+    remove_dead_instructions(cfg)
+    if skip_empty_blocks(cfg):
+        simplify_branches(cfg)
+        remove_unreachable_blocks(cfg)
+    merge_blocks(cfg)
+    remove_jumps_to_next_block(cfg)
@@ -1,10 +1,19 @@
-import copy
-from typing import Any
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable
 from compiler import ast
-from compiler.parser1 import parse
-from compiler.tokenizer import tokenize
-Value = int | bool | None
-SymbolList = {
+from compiler.budget import ExecutionBudget
+from compiler.completion import BREAK, CONTINUE, Completion
+from compiler.memo import Memoizer
+from compiler.profiler import Profile
+from compiler.resolver import resolve, resolved_depth, resolved_frame_size, resolved_slot
+Value = Any
+# A frame holds the local variables of one function call (or of the top level)
+# at the slots assigned by 'resolver.resolve'. Slot 0 refers to the frame the
+# function was defined in.
+Frame = list[Any]
+
+operators: dict[str, Callable[..., Value]] = {
     '+': lambda x, y: x + y,
     '-': lambda x, y: x - y,
     '*': lambda x, y: x * y,
@@ -18,246 +27,214 @@ SymbolList = {
     '!=': lambda x, y: x != y,
     '+=': lambda x, y: x + y,
     '-=': lambda x, y: x - y,
-    'or': lambda x, y, st: or_operation(x,y,st),
-    'and': lambda x, y,st: and_operation(x,y,st),
-    'print_int':'',
-    'print_bool':'',
-    'read_int':'',
-
     'unary': lambda x: not x if isinstance(x, bool) else -x,
 }
 
 library_functions = ['print_int','print_bool','read_int']
 
-def or_operation(a,b,symbol_table:ast.SymTab) -> bool:
-    if interpret(a, symbol_table) == False:
-        if isinstance(interpret(b, symbol_table), bool):    
-            return interpret(b, symbol_table)
-    else:
-        return True
-    
-    return False
-
-def and_operation(a,b,symbol_table:ast.SymTab)-> bool:
-    if interpret(a, symbol_table) == True:
-        if isinstance(interpret(b, symbol_table), bool):    
-            return interpret(b, symbol_table)
-    else:
-        return False
-    
-    return False
-
-
-class BreakException(Exception):
-    pass
-
-class ContinueException(Exception):
-    pass
-
-def interpret(node: ast.Expression, symbol_table: ast.SymTab = ast.SymTab(variables=SymbolList)) -> Value:
+engines = ['tree', 'closure']
+
+
+@dataclass(slots=True)
+class FunctionValue:
+    """A user-defined function together with the frame it was defined in."""
+    definition: ast.Function
+    frame: Frame
+
+
+def interpret(node: ast.Expression, engine: str = 'tree', budget: ExecutionBudget | None = None,
+              profile: Profile | None = None, memo: Memoizer | None = None) -> Value:
+    # The 'tree' engine walks the AST directly.
+    # The 'closure' engine compiles the whole program into Python closures before running it.
+    # Without a budget, programs may run for as long as they like.
+    # A profile is filled in with execution counts and times; only the 'closure' engine can profile.
+    # With a memoizer, the 'closure' engine remembers the results of calls of pure functions.
+    if budget is not None:
+        budget.start()
+    if engine == 'closure':
+        # The tree engine does not depend on the closure engine, which is only loaded when it is used.
+        from compiler.closure_interpreter import compile_program
+        return compile_program(node, budget, profile, memo)()
+    if profile is not None:
+        raise Exception(f"Profiling is not supported by the '{engine}' engine")
+    if memo is not None:
+        raise Exception(f"Memoization is not supported by the '{engine}' engine")
+    if engine != 'tree':
+        raise Exception(f'Unknown engine: {engine}')
+    frame: Frame = [None] * resolve(node)
+    result = evaluate(node, frame, budget)
+    if isinstance(result, Completion):
+        return result.value
+    return result
+
+
+def _frame_at(frame: Frame, depth: int) -> Frame:
+    for _ in range(depth):
+        frame = frame[0]
+    return frame
+
+
+def evaluate(node: ast.Expression, frame: Frame, budget: ExecutionBudget | None = None) -> Value:
+    """Evaluates a resolved AST node in the given frame.
+
+    Loop iterations and calls are counted against the budget, if there is one.
+    """
     match node:
-        case ast.Break():
-            raise BreakException
-        case ast.Continue():
-            raise ContinueException
-
-        case ast.BinaryOp():
-            if isinstance(node.left, ast.Identifier) and node.operation in ['=']:
-                current_symbol_table = symbol_table
-                # Search for the variable in the current and all parent symbol tables
-                while current_symbol_table is not None:
-                    if node.left.name in current_symbol_table.variables:
-                        current_symbol_table.variables[node.left.name] = interpret(node.right, symbol_table)
-                        return None
-                    current_symbol_table = getattr(current_symbol_table, 'parent', None)
-                
-                # If the variable was not found in any scope, raise an exception
-                raise Exception(f'Variable {node.left.name} is not defined')
-
-            a = interpret(node.left, symbol_table)
-            b = interpret(node.right, symbol_table)
-
-            #while a,b are expressions
-            if isinstance(a, ast.Expression):
-                a = interpret(a, symbol_table)
-            if isinstance(b, ast.Expression):
-                b = interpret(b, symbol_table)
-
-            top_symbol_table = symbol_table
-
-            while isinstance(top_symbol_table, ast.HierarchicalSymTab):
-                top_symbol_table = top_symbol_table.parent
-            if node.operation in top_symbol_table.variables:
-                if node.operation in ['or','and']:
-                    operation_function = top_symbol_table.variables[node.operation]
-                    return operation_function(node.left, node.right, symbol_table)
-                else:
-                    
-                    operation_function = top_symbol_table.variables[node.operation]
-                    return operation_function(a,b)
-            else:
-                raise Exception(f'operation {node.operation} does not exist')
-
-        case ast.IfExpression():
-            if interpret(node.condition, symbol_table):
-                return interpret(node.then_branch, symbol_table)
-            elif node.else_branch is not None:
-                return interpret(node.else_branch, symbol_table)
-        
         case ast.Literal():
-            if isinstance(node.value, bool):
-                return node.value == True
             return node.value
-        
+
         case ast.Identifier():
-            if node.name in symbol_table.variables and not isinstance(symbol_table.variables[node.name], ast.Expression): 
-                return symbol_table.variables[node.name]
-            elif isinstance(symbol_table, ast.HierarchicalSymTab):
-                return interpret(node, symbol_table.parent)
-            else:
-                raise Exception(f'{node.name} is not defined')
-            
-        case ast.UnaryOp():
-            a: Any = interpret(node.right, symbol_table)
-            top_symbol_table = symbol_table
-            while isinstance(top_symbol_table, ast.HierarchicalSymTab):
-                top_symbol_table = top_symbol_table.parent
-            if 'unary' in top_symbol_table.variables:
-                operation_function = top_symbol_table.variables['unary']
-                return operation_function(a)
-            else:
-                raise Exception("Expected an unary operator")
+            slot = node.slot
+            if node.scope_depth == 0 and slot is not None:
+                return frame[slot]
+            return _frame_at(frame, resolved_depth(node))[resolved_slot(node)]
+
+        case ast.BinaryOp():
+            operation = node.operation
+            # Every operand may end early with a completion, which is passed on.
+            if operation == '=' and isinstance(node.left, ast.Identifier):
+                b = evaluate(node.right, frame, budget)
+                if b.__class__ is Completion:
+                    return b
+                _frame_at(frame, resolved_depth(node.left))[resolved_slot(node.left)] = b
+                return None
+            a = evaluate(node.left, frame, budget)
+            if a.__class__ is Completion:
+                return a
+            if operation == 'and':
+                if a == True:
+                    b = evaluate(node.right, frame, budget)
+                    return b if isinstance(b, bool) or b.__class__ is Completion else False
+                return False
+            if operation == 'or':
+                if a == False:
+                    b = evaluate(node.right, frame, budget)
+                    return b if isinstance(b, bool) or b.__class__ is Completion else False
+                return True
+            if operation not in operators:
+                raise Exception(f'operation {operation} does not exist')
+            b = evaluate(node.right, frame, budget)
+            if b.__class__ is Completion:
+                return b
+            return operators[operation](a, b)
 
+        case ast.UnaryOp():
+            a = evaluate(node.right, frame, budget)
+            if a.__class__ is Completion:
+                return a
+            return operators['unary'](a)
 
         case ast.VariableDeclaration():
-            if symbol_table.variables.get(node.name) is not None:
-                    raise Exception(f"The variable {node.name} has already been declared")
-            symbol_table.variables[node.name] = interpret(node.assignment, symbol_table)
-            return symbol_table.variables[node.name]
-        
-        case ast.FunctionCalled():
-                for i in range(0, len(node.arg_variables)):
-                    symbol_table.variables[node.arg_variables[i].name] = node.arg_variables[i].assignment
-                    if isinstance(symbol_table.variables[node.arg_variables[i].name], ast.Literal):
-                        symbol_table.variables[node.arg_variables[i].name] = symbol_table.variables[node.arg_variables[i].name].value
-                    if isinstance(symbol_table.variables[node.arg_variables[i].name], ast.Identifier):
-                        symbol_table.variables[node.arg_variables[i].name] = interpret(symbol_table.variables[node.arg_variables[i].name], symbol_table)
-                    if isinstance(symbol_table.variables[node.arg_variables[i].name], ast.Function):
-                        symbol_table.variables[node.arg_variables[i].name] = interpret(symbol_table.variables[node.arg_variables[i].name], symbol_table)
-                    if isinstance(symbol_table.variables[node.arg_variables[i].name], ast.FunctionCalled):
-                        symbol_table.variables[node.arg_variables[i].name] = interpret(symbol_table.variables[node.arg_variables[i].name], symbol_table)
+            value = evaluate(node.assignment, frame, budget)
+            if value.__class__ is not Completion:
+                frame[resolved_slot(node)] = value
+            return value
 
-                return interpret(node.body, symbol_table)
-        
         case ast.Block():
-            variables = ast.HierarchicalSymTab({}, symbol_table)
+            expressions = node.expressions
+            last = len(expressions) - 1
+            # A block that ends with ';' evaluates to its last expression before it.
+            last_expression = expressions[last]
+            if isinstance(last_expression, ast.Literal) and last_expression.value is None:
+                last -= 1
+            result = None
+            for i in range(0, last + 1):
+                result = evaluate(expressions[i], frame, budget)
+                if result.__class__ is Completion:
+                    return result
+            return result
 
-            for i in range(0, len(node.expressions)-1):
-                result = interpret(node.expressions[i], variables)
-                if isinstance(result, ast.FunctionCalled | ast.LibraryFunctionCalled):
-                    result = interpret(result, variables)
-            if not (isinstance(node.expressions[len(node.expressions)-1], ast.Literal) and getattr(node.expressions[len(node.expressions)-1],'value', None) is None):
-                result = interpret(node.expressions[len(node.expressions)-1], variables)
-            if isinstance(result, ast.FunctionCalled| ast.LibraryFunctionCalled):
-                return interpret(result, variables)
-            else:   return result
+        case ast.IfExpression():
+            condition = evaluate(node.condition, frame, budget)
+            if condition.__class__ is Completion:
+                return condition
+            if condition:
+                return evaluate(node.then_branch, frame, budget)
+            elif node.else_branch is not None:
+                return evaluate(node.else_branch, frame, budget)
+            return None
 
         case ast.WhileExpression():
-            condition = node.condition
-            counter = 0
-            if condition == True:
-                raise Exception('infinited loop')
-            while interpret(condition, symbol_table) == True:
-                if counter > 500 : raise Exception('loop is stopped manually')
-                counter+=1
-                try:
-                    interpret(node.do, symbol_table)
-                except ContinueException:
-                    continue
-                except BreakException:
-                    break
-            return None
-        
+            while True:
+                condition = evaluate(node.condition, frame, budget)
+                if condition != True:
+                    # A completion from the condition belongs to an enclosing loop or call.
+                    return condition if condition.__class__ is Completion else None
+                if budget is not None:
+                    budget.tick(node.location)
+                result = evaluate(node.do, frame, budget)
+                if result.__class__ is Completion:
+                    if result is BREAK:
+                        return None
+                    if result is not CONTINUE:
+                        return result
+
+        case ast.Break():
+            return BREAK
+        case ast.Continue():
+            return CONTINUE
+
         case ast.Return():
-            name = getattr(node.value, 'name', None)
-            if isinstance(node.value, ast.Function):
-                return interpret(node.value, symbol_table)
-            if symbol_table.variables.get(name) is not None:
-                return symbol_table.variables[name]
-            else:
-                return interpret(node.value, symbol_table)
-            
-        case ast.LibraryFunctionCalled():
-                    arg_variables = []
-                    for i in range(0, len(node.args)):
-                        arg = node.args[i]
-                        if getattr(arg, 'value', None) is None:
-                            arg = interpret(arg, symbol_table)
-                            arg_variables.append(arg)
-                        else:
-                            arg_variables.append(arg.value)
+            value = evaluate(node.value, frame, budget)
+            return value if value.__class__ is Completion else Completion('return', value)
 
-                    match node.name:
-                        case 'print_int':
-                                    for i in range(0, len(arg_variables)):
-                                        if type(arg_variables[i]) is int :
-                                            print(arg_variables[i])
-                                        else: raise Exception(f'Expected an integer, but get {arg_variables[i]}')
-                        case 'print_bool':
-                                    for i in range(0, len(arg_variables)):
-                                        if type(arg_variables[i]) is bool :
-                                            print(arg_variables[i])
-                                        else: raise Exception(f'Expected an boolean value, but get {node.args[0]}')
-                    return None
-                
         case ast.Function():
             # defining a function
             if node.body is not None:
-                name = node.name
-                body = node.body
-                symbol_table.variables[name] = node
-
-                return symbol_table
-            # calling a function
+                frame[resolved_slot(node)] = FunctionValue(node, frame)
+                return None
+            # calling a library function
+            if node.slot is None:
+                return _call_library_function(node, frame, budget)
+            # calling a user-defined function
+            function = _frame_at(frame, resolved_depth(node))[node.slot]
+            if not isinstance(function, FunctionValue):
+                raise Exception(f'{node.name} is not a function')
+            definition = function.definition
+            if len(definition.args) != len(node.args):
+                raise Exception(f'Expected {len(definition.args)} arguments')
+            # Arguments are evaluated in the caller's frame and bound by position in a new frame.
+            callee_frame: Frame = [None] * resolved_frame_size(definition)
+            callee_frame[0] = function.frame
+            for parameter, arg in zip(definition.args, node.args):
+                value = evaluate(arg, frame, budget)
+                if value.__class__ is Completion:
+                    return value
+                callee_frame[resolved_slot(parameter)] = value
+            if budget is None:
+                result = evaluate(definition.body, callee_frame, budget)
             else:
-                name = node.name
-                if node.name in symbol_table.variables: 
-                    # calling a library function
-                    if name in library_functions:
-                        top_symbol_table = symbol_table
-                        while isinstance(top_symbol_table, ast.HierarchicalSymTab):
-                            top_symbol_table = top_symbol_table.parent
-                        if node.name in top_symbol_table.variables:
-                                operation_function = top_symbol_table.variables[node.name]
-                        operation_function = top_symbol_table.variables[node.name]
-                        args = node.args
-                        variables = ast.HierarchicalSymTab({}, symbol_table)
-
-                        return ast.LibraryFunctionCalled(name=name, args=args)
-                    # calling a user-defined function
-                    else:
-                        body = symbol_table.variables[name].body
-                        return_type = symbol_table.variables[name].return_type
-                        
-                        args = node.args
-                        arg_variables = symbol_table.variables[name].args
-                        new_arg_variables = [copy.deepcopy(arg) for arg in arg_variables]
-                        if (len(arg_variables)!= len(args)):
-                            raise Exception(f'Expected {len(symbol_table.variables[name].args)} arguments')
-                        for i in range(0, len(args)):
-                                new_arg_variables[i].assignment = args[i]
-                        return ast.FunctionCalled(name=name, body=body, return_type=return_type, arg_variables=new_arg_variables)
-
-                elif isinstance(symbol_table, ast.HierarchicalSymTab):
-                    return interpret(node, symbol_table.parent)
-                else:
-                    raise Exception(f'{node.name} is not defined')
-                
-
+                budget.enter_call(node.location)
+                try:
+                    result = evaluate(definition.body, callee_frame, budget)
+                finally:
+                    budget.leave_call()
+            if result.__class__ is Completion:
+                return result.value
+            return result
 
         case _:
             raise Exception(f'{node} is not supported')
 
-            
 
-        
+def _call_library_function(node: ast.Function, frame: Frame, budget: ExecutionBudget | None) -> Value:
+    args = []
+    for arg in node.args:
+        value = evaluate(arg, frame, budget)
+        if value.__class__ is Completion:
+            return value
+        args.append(value)
+    match node.name:
+        case 'print_int':
+            for arg in args:
+                if type(arg) is int :
+                    print(arg)
+                else: raise Exception(f'Expected an integer, but get {arg}')
+        case 'print_bool':
+            for arg in args:
+                if type(arg) is bool :
+                    print(arg)
+                else: raise Exception(f'Expected an boolean value, but get {arg}')
+        case 'read_int':
+            return int(sys.stdin.readline())
+    return None
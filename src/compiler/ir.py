@@ -1,63 +1,176 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Callable, Optional, Sequence
+import weakref
+
+# The IRVars in use by name. An IRVar leaves the table once nothing refers to it,
+# and its id is given to the next new IRVar.
+_vars: dict[str, 'weakref.ref[IRVar]'] = {}
+_free_ids: list[int] = []
+_id_count = 0
 
-@dataclass(frozen=True)
 class IRVar:
+    """An IR variable, or the name of a called function.
+
+    IRVars are interned: there is one object per name, so they compare and hash by
+    identity, and each has a dense integer `id` that passes can use to index lists.
+    Ids are only unique among the IRVars in use, so they do not grow from one
+    compilation to the next.
+    """
+    __slots__ = ('id', 'name', '__weakref__')
+    id: int
     name: str
+
+    def __new__(cls, name: str) -> 'IRVar':
+        global _id_count
+        ref = _vars.get(name)
+        var = ref() if ref is not None else None
+        if var is None:
+            var = object.__new__(cls)
+            if _free_ids:
+                id = _free_ids.pop()
+            else:
+                id = _id_count
+                _id_count += 1
+            object.__setattr__(var, 'id', id)
+            object.__setattr__(var, 'name', name)
+            _vars[name] = weakref.ref(var)
+        return var
+
+    def __del__(self) -> None:
+        del _vars[self.name]
+        _free_ids.append(self.id)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('IRVar is immutable')
+
+    def __reduce__(self) -> tuple[type, tuple[str]]:
+        return IRVar, (self.name,)
+
     def __repr__(self) -> str:
         return self.name
 
+def var_count() -> int:
+    """Returns the largest number of IRVars that have been in use at once, an upper bound of every `id`."""
+    return _id_count
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Instruction():
     """Base class for IR instructions."""
 
-@dataclass(frozen=True)
+    def uses(self) -> tuple[IRVar, ...]:
+        """Returns the variables that the instruction reads."""
+        return ()
+
+    def defs(self) -> tuple[IRVar, ...]:
+        """Returns the variables that the instruction writes."""
+        return ()
+
+    def operands(self) -> tuple[IRVar, ...]:
+        """Returns the variables that the instruction reads or writes, in field order."""
+        return self.uses() + self.defs()
+
+    def map_vars(self, use: Callable[[IRVar], IRVar], define: Callable[[IRVar], IRVar]) -> 'Instruction':
+        """Returns the instruction with each variable it reads replaced by 'use(var)' and
+        each variable it writes by 'define(var)'. All calls of 'use' come first."""
+        return self
+
+@dataclass(frozen=True, slots=True)
 class Label(Instruction):
     name: str
     def __repr__(self) -> str:
         return self.name
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Call(Instruction):
     fun: IRVar
-    args: list[IRVar]
+    args: Sequence[IRVar]
     dest: IRVar
 
-@dataclass(frozen=True)
+    def __post_init__(self) -> None:
+        object.__setattr__(self, 'args', tuple(self.args))
+
+    def __repr__(self) -> str:
+        return f'Call(fun={self.fun!r}, args={list(self.args)!r}, dest={self.dest!r})'
+
+    def uses(self) -> tuple[IRVar, ...]:
+        return tuple(self.args)
+
+    def defs(self) -> tuple[IRVar, ...]:
+        return (self.dest,)
+
+    def map_vars(self, use: Callable[[IRVar], IRVar], define: Callable[[IRVar], IRVar]) -> 'Call':
+        args = [use(arg) for arg in self.args]
+        return Call(self.fun, args, define(self.dest))
+
+@dataclass(frozen=True, slots=True)
 class LoadIntConst(Instruction):
     value: int
     dest: IRVar
 
-@dataclass(frozen=True)
+    def defs(self) -> tuple[IRVar, ...]:
+        return (self.dest,)
+
+    def map_vars(self, use: Callable[[IRVar], IRVar], define: Callable[[IRVar], IRVar]) -> 'LoadIntConst':
+        return LoadIntConst(self.value, define(self.dest))
+
+@dataclass(frozen=True, slots=True)
 class FunctionDefinition(Instruction):
     name: str
     label: Label
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Return(Instruction):
     value: Optional[IRVar] = None
 
-@dataclass(frozen=True)
+    def uses(self) -> tuple[IRVar, ...]:
+        return (self.value,) if self.value is not None else ()
+
+    def map_vars(self, use: Callable[[IRVar], IRVar], define: Callable[[IRVar], IRVar]) -> 'Return':
+        return Return(use(self.value) if self.value is not None else None)
+
+@dataclass(frozen=True, slots=True)
 class Copy(Instruction):
-    source: IRVar
-    dest: IRVar
+    # The IR generator emits None for either operand of branches that produce no value.
+    source: IRVar | None
+    dest: IRVar | None
+
+    def uses(self) -> tuple[IRVar, ...]:
+        return (self.source,) if self.source is not None else ()
+
+    def defs(self) -> tuple[IRVar, ...]:
+        return (self.dest,) if self.dest is not None else ()
+
+    def map_vars(self, use: Callable[[IRVar], IRVar], define: Callable[[IRVar], IRVar]) -> 'Copy':
+        source = use(self.source) if self.source is not None else self.source
+        return Copy(source, define(self.dest) if self.dest is not None else self.dest)
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LoadBoolConst(Instruction):
     """Loads a boolean constant value to `dest`."""
     value: bool
     dest: IRVar
 
+    def defs(self) -> tuple[IRVar, ...]:
+        return (self.dest,)
 
-@dataclass(frozen=True)
+    def map_vars(self, use: Callable[[IRVar], IRVar], define: Callable[[IRVar], IRVar]) -> 'LoadBoolConst':
+        return LoadBoolConst(self.value, define(self.dest))
+
+
+@dataclass(frozen=True, slots=True)
 class Jump(Instruction):
     """Unconditionally continues execution from the given label."""
     label: Label
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CondJump(Instruction):
     """Continues execution from `then_label` if `cond` is true, otherwise from `else_label`."""
     condition: IRVar
     then_label: Label
     else_label: Label
 
+    def uses(self) -> tuple[IRVar, ...]:
+        return (self.condition,)
+
+    def map_vars(self, use: Callable[[IRVar], IRVar], define: Callable[[IRVar], IRVar]) -> 'CondJump':
+        return CondJump(use(self.condition), self.then_label, self.else_label)
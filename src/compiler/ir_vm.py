@@ -0,0 +1,174 @@
+import sys
+from typing import Callable, TextIO
+from compiler import ir
+
+# Values are 64-bit signed integers, like in the compiled program. Booleans are 0 and 1.
+_min_int = -2**63
+_max_int = 2**63 - 1
+
+
+def _wrap(x: int) -> int:
+    if _min_int <= x <= _max_int:
+        return x
+    return ((x - _min_int) & (2**64 - 1)) + _min_int
+
+
+def _divide(a: int, b: int) -> int:
+    # 'idivq' rounds towards zero, unlike Python's '//'.
+    if b == 0:
+        raise Exception('Division by zero')
+    quotient = abs(a) // abs(b)
+    return _wrap(-quotient if (a < 0) != (b < 0) else quotient)
+
+
+def _remainder(a: int, b: int) -> int:
+    if b == 0:
+        raise Exception('Division by zero')
+    quotient = abs(a) // abs(b)
+    return a - b * (-quotient if (a < 0) != (b < 0) else quotient)
+
+
+binary_operators: dict[str, Callable[[int, int], int]] = {
+    '+': lambda a, b: _wrap(a + b),
+    '-': lambda a, b: _wrap(a - b),
+    '*': lambda a, b: _wrap(a * b),
+    '/': _divide,
+    '%': _remainder,
+    '==': lambda a, b: 1 if a == b else 0,
+    '!=': lambda a, b: 1 if a != b else 0,
+    '<': lambda a, b: 1 if a < b else 0,
+    '<=': lambda a, b: 1 if a <= b else 0,
+    '>': lambda a, b: 1 if a > b else 0,
+    '>=': lambda a, b: 1 if a >= b else 0,
+}
+
+unary_operators: dict[str, Callable[[int], int]] = {
+    'unary_-': lambda a: _wrap(-a),
+    'unary_not': lambda a: a ^ 1,
+}
+
+# Opcodes of the loaded program.
+_LOAD, _COPY, _BINARY, _UNARY, _JUMP, _COND_JUMP, _PRINT_INT, _PRINT_BOOL, _READ_INT = range(9)
+
+
+def read_int(input: TextIO) -> int:
+    """Reads an integer from a line of input the way the compiled 'read_int' does:
+    non-digit characters are skipped, and each '-' flips the sign."""
+    line = input.readline()
+    if line == '':
+        raise Exception('read_int: no input')
+    negative = False
+    value = 0
+    for c in line:
+        if c == '\n':
+            break
+        if c == '-':
+            negative = not negative
+        elif '0' <= c <= '9':
+            value = value * 10 + ord(c) - ord('0')
+    return _wrap(-value if negative else value)
+
+
+def load(instructions: list[ir.Instruction]) -> tuple[list[tuple], int]:
+    """Translates IR into a list of (opcode, operands...) tuples for 'execute'.
+
+    Labels are resolved to instruction indices and IR variables to register numbers.
+    Returns the program and the number of registers it needs.
+    """
+    registers: dict[ir.IRVar, int] = {}
+    def register(var: ir.IRVar | None) -> int:
+        # The IR generator emits 'Copy(source=None)' for branches that produce no value.
+        # Register 0 always holds 0, which stands for the unit value.
+        if var is None:
+            return 0
+        if var not in registers:
+            registers[var] = len(registers) + 1
+        return registers[var]
+
+    targets: dict[str, int] = {}
+    count = 0
+    for insn in instructions:
+        if isinstance(insn, ir.Label):
+            targets[insn.name] = count
+        else:
+            count += 1
+
+    def target(label: ir.Label) -> int:
+        if label.name not in targets:
+            raise Exception(f'Undefined label: {label.name}')
+        return targets[label.name]
+
+    program: list[tuple] = []
+    for insn in instructions:
+        match insn:
+            case ir.Label():
+                continue
+            case ir.LoadIntConst():
+                program.append((_LOAD, register(insn.dest), _wrap(insn.value)))
+            case ir.LoadBoolConst():
+                program.append((_LOAD, register(insn.dest), 1 if insn.value else 0))
+            case ir.Copy():
+                program.append((_COPY, register(insn.dest), register(insn.source)))
+            case ir.Jump():
+                program.append((_JUMP, target(insn.label)))
+            case ir.CondJump():
+                program.append((_COND_JUMP, register(insn.condition), target(insn.then_label), target(insn.else_label)))
+            case ir.Call():
+                name = insn.fun.name
+                args = [register(arg) for arg in insn.args]
+                if name in binary_operators and len(args) == 2:
+                    program.append((_BINARY, register(insn.dest), binary_operators[name], args[0], args[1]))
+                elif name in unary_operators and len(args) == 1:
+                    program.append((_UNARY, register(insn.dest), unary_operators[name], args[0]))
+                elif name == 'print_int' and len(args) == 1:
+                    program.append((_PRINT_INT, args[0]))
+                elif name == 'print_bool' and len(args) == 1:
+                    program.append((_PRINT_BOOL, args[0]))
+                elif name == 'read_int' and len(args) == 0:
+                    program.append((_READ_INT, register(insn.dest)))
+                else:
+                    raise Exception(f'Unknown function: {name}')
+            case _:
+                # User-defined functions are not supported (the IR generator does not emit returns for them yet).
+                raise Exception(f'Unsupported instruction: {insn}')
+    return program, len(registers) + 1
+
+
+def execute(program: list[tuple], register_count: int,
+            input: TextIO | None = None, output: TextIO | None = None) -> list[int]:
+    """Runs a program produced by 'load' and returns the final register values."""
+    input = input if input is not None else sys.stdin
+    output = output if output is not None else sys.stdout
+    write = output.write
+    regs = [0] * register_count
+    pc = 0
+    end = len(program)
+    while pc < end:
+        insn = program[pc]
+        op = insn[0]
+        pc += 1
+        if op == _BINARY:
+            regs[insn[1]] = insn[2](regs[insn[3]], regs[insn[4]])
+        elif op == _COPY:
+            regs[insn[1]] = regs[insn[2]]
+        elif op == _LOAD:
+            regs[insn[1]] = insn[2]
+        elif op == _COND_JUMP:
+            pc = insn[2] if regs[insn[1]] != 0 else insn[3]
+        elif op == _JUMP:
+            pc = insn[1]
+        elif op == _UNARY:
+            regs[insn[1]] = insn[2](regs[insn[3]])
+        elif op == _PRINT_INT:
+            write(f'{regs[insn[1]]}\n')
+        elif op == _PRINT_BOOL:
+            write('true\n' if regs[insn[1]] != 0 else 'false\n')
+        else:
+            regs[insn[1]] = read_int(input)
+    return regs
+
+
+def run_ir(instructions: list[ir.Instruction], input: TextIO | None = None, output: TextIO | None = None) -> None:
+    """Executes IR directly, with the same results as the assembled program."""
+    program, register_count = load(instructions)
+    execute(program, register_count, input, output)
@@ -0,0 +1,127 @@
+from collections import Counter
+from compiler import ir
+from compiler.cfg import CFG, BasicBlock, Loop, dominators, find_loops, redirect_edge
+from compiler.ir_vm import binary_operators, unary_operators
+from compiler.ssa import from_ssa, to_ssa
+
+_pure_operators = set(binary_operators) | set(unary_operators)
+_trapping_operators = {'/', '%'}
+# Dividing by these can stop the program: by 0 always, and by -1 when the native code divides the smallest integer.
+_trapping_divisors = {0, -1}
+
+
+def insert_preheaders(cfg: CFG, loops: list[Loop]) -> list[BasicBlock]:
+    """Adds an empty block in front of each loop that every edge entering it from outside goes through.
+
+    Each block is placed just before the header of its loop, so that a block
+    which fell through to the header falls through to it instead. Returns the
+    new blocks.
+    """
+    preheader_of: dict[BasicBlock, BasicBlock] = {}
+    for loop in loops:
+        header = loop.header
+        preheader = BasicBlock(0, None)
+        for pred in [pred for pred in header.preds if pred not in loop.blocks]:
+            redirect_edge(cfg, pred, header, preheader)
+        cfg.add_edge(preheader, header)
+        preheader_of[header] = preheader
+    cfg.entries = [preheader_of.get(entry, entry) for entry in cfg.entries]
+    blocks: list[BasicBlock] = []
+    for block in cfg.blocks:
+        if block in preheader_of:
+            blocks.append(preheader_of[block])
+        blocks.append(block)
+    cfg.blocks = blocks
+    cfg.renumber()
+    return list(preheader_of.values())
+
+
+def hoist_invariants(cfg: CFG, origin: dict[ir.IRVar, ir.IRVar]) -> int:
+    """Moves instructions that compute the same value on every iteration of a loop to its preheader.
+
+    Works on a CFG in SSA form, with the original variable of each version in
+    'origin', where every loop has a preheader. Operator calls, copies and
+    constant loads are moved when all their arguments are written outside the
+    loop, innermost loops first, so that a computation can leave several loops.
+
+    A moved instruction also runs when the loop runs zero times, or when the
+    branch it was in is not taken. This is only done when its variable has no
+    other version that the early write could clobber, and for a division or
+    remainder only when the divisor is a constant that cannot make it trap.
+    Returns how many instructions were moved.
+    """
+    doms = dominators(cfg)
+    version_counts = Counter(origin.values())
+    def_block: dict[ir.IRVar, BasicBlock] = {}
+    definition: dict[ir.IRVar, ir.Instruction] = {}
+    for block in cfg.blocks:
+        for insn in block.instructions:
+            for var in insn.defs():
+                def_block[var] = block
+                definition[var] = insn
+    position = {block: i for i, block in enumerate(doms.preorder())}
+
+    def invariant(var: ir.IRVar, loop: Loop) -> bool:
+        return var not in def_block or def_block[var] not in loop.blocks
+
+    def can_trap(insn: ir.Call) -> bool:
+        if insn.fun.name not in _trapping_operators:
+            return False
+        divisor = definition.get(insn.args[1])
+        return not isinstance(divisor, ir.LoadIntConst) or divisor.value in _trapping_divisors
+
+    def movable(insn: ir.Instruction, loop: Loop) -> bool:
+        match insn:
+            case ir.LoadIntConst() | ir.LoadBoolConst():
+                dest = insn.dest
+            case ir.Copy() if insn.source is not None and insn.dest is not None:
+                if not invariant(insn.source, loop):
+                    return False
+                dest = insn.dest
+            case ir.Call() if insn.fun.name in _pure_operators:
+                if not all(invariant(arg, loop) for arg in insn.args) or can_trap(insn):
+                    return False
+                dest = insn.dest
+            case _:
+                return False
+        return version_counts[origin.get(dest, dest)] == 1
+
+    moved = 0
+    for loop in find_loops(cfg, doms):
+        preheaders = [pred for pred in loop.header.preds if pred not in loop.blocks]
+        if len(preheaders) != 1 or preheaders[0].succs != [loop.header]:
+            continue
+        preheader = preheaders[0]
+        # A block comes after its dominators, so arguments are moved before the instructions that read them.
+        for block in sorted(loop.blocks, key=lambda block: position[block]):
+            kept: list[ir.Instruction] = []
+            for insn in block.instructions:
+                if movable(insn, loop):
+                    preheader.instructions.append(insn)
+                    for var in insn.defs():
+                        def_block[var] = preheader
+                    moved += 1
+                else:
+                    kept.append(insn)
+            block.instructions = kept
+    return moved
+
+
+def hoist_loop_invariants(cfg: CFG) -> None:
+    """Moves loop-invariant computations out of loops, into a preheader added in front of each loop."""
+    preheaders = insert_preheaders(cfg, find_loops(cfg, dominators(cfg)))
+    origin = to_ssa(cfg)
+    hoist_invariants(cfg, origin)
+    from_ssa(cfg, origin)
+    # The preheaders that nothing was moved to are removed again.
+    header_of: dict[BasicBlock, BasicBlock] = {}
+    for preheader in preheaders:
+        if not preheader.instructions:
+            header = header_of[preheader] = preheader.succs[0]
+            for pred in list(preheader.preds):
+                redirect_edge(cfg, pred, preheader, header)
+            cfg.remove_edge(preheader, header)
+    if header_of:
+        cfg.entries = [header_of.get(entry, entry) for entry in cfg.entries]
+        cfg.blocks = [block for block in cfg.blocks if block not in header_of]
+        cfg.renumber()
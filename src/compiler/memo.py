@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from compiler import ast
+from compiler.purity import pure_functions
+from compiler.tokenizer import Location
+
+default_max_entries = 4096
+
+
+@dataclass
+class MemoTable:
+    """The results of the calls of one pure function by argument values, least recently used first."""
+    name: str
+    location: Location | None
+    max_entries: int
+    entries: OrderedDict[tuple[Any, ...], Any] = field(default_factory=OrderedDict, repr=False)
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def memoize(self, function: Callable[..., Any]) -> Callable[..., Any]:
+        entries = self.entries
+
+        def memoized(*args: Any) -> Any:
+            if args in entries:
+                entries.move_to_end(args)
+                self.hits += 1
+                return entries[args]
+            self.misses += 1
+            result = function(*args)
+            entries[args] = result
+            if len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self.evictions += 1
+            return result
+        return memoized
+
+
+@dataclass
+class Memoizer:
+    """Memoizes the calls of pure user-defined functions, in one bounded table per function.
+
+    'find_pure_functions' has to be called on the resolved program first.
+    """
+    max_entries: int = default_max_entries
+    tables: list[MemoTable] = field(default_factory=list)
+    _pure: set[int] = field(default_factory=set, init=False, repr=False)
+
+    def find_pure_functions(self, root: ast.Expression) -> None:
+        self._pure = pure_functions(root)
+
+    def table(self, definition: ast.Function) -> MemoTable | None:
+        """Returns a new table for the calls of a function definition, or None if it is not pure."""
+        if id(definition) not in self._pure:
+            return None
+        table = MemoTable(definition.name, definition.location, self.max_entries)
+        self.tables.append(table)
+        return table
+
+    def report(self) -> str:
+        lines = ['', f'{"hits":>10} {"misses":>10} {"evictions":>10}  memoized function']
+        for table in sorted(self.tables, key=lambda table: table.hits, reverse=True):
+            location = f'{table.location.line}:{table.location.pos}' if table.location is not None else '?'
+            lines.append(f'{table.hits:10d} {table.misses:10d} {table.evictions:10d}  {table.name} at {location}')
+        return '\n'.join(lines) + '\n'
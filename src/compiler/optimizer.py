@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from typing import Callable
+from compiler import ir
+from compiler.cfg import CFG, build_cfg, linearize
+from compiler.copyprop import eliminate_copies
+from compiler.cse import eliminate_common_subexpressions
+from compiler.dce import eliminate_dead_code
+from compiler.licm import hoist_loop_invariants
+from compiler.sccp import sccp
+
+# A pass rewrites the blocks of a CFG in place.
+Pass = Callable[[CFG], None]
+
+passes: dict[str, Pass] = {
+    'sccp': sccp,
+    'cse': eliminate_common_subexpressions,
+    'licm': hoist_loop_invariants,
+    'copyprop': eliminate_copies,
+    'dce': eliminate_dead_code,
+}
+default_passes = ['sccp', 'cse', 'licm', 'copyprop', 'dce']
+
+
+@dataclass
+class PassRun:
+    """The number of instructions in the blocks before and after a pass ran."""
+    name: str
+    before: int
+    after: int
+
+    @property
+    def removed(self) -> int:
+        return self.before - self.after
+
+
+def instruction_count(cfg: CFG) -> int:
+    return sum(len(block.instructions) for block in cfg.blocks)
+
+
+def optimize(instructions: list[ir.Instruction], pass_names: list[str] | None = None,
+             runs: list[PassRun] | None = None) -> list[ir.Instruction]:
+    """Runs optimization passes over IR, in order, and returns the optimized IR.
+
+    If 'runs' is given, a PassRun is appended to it for each pass. Labels are not
+    counted as instructions, nor are the jumps that the blocks get back when they
+    are turned into a list again.
+
+    IR with function definitions is returned unchanged: the IR generator does not
+    give user-defined functions parameters or returns that the passes could follow.
+    """
+    if any(isinstance(insn, ir.FunctionDefinition) for insn in instructions):
+        return instructions
+    cfg = build_cfg(instructions)
+    for name in pass_names if pass_names is not None else default_passes:
+        before = instruction_count(cfg)
+        passes[name](cfg)
+        if runs is not None:
+            runs.append(PassRun(name, before, instruction_count(cfg)))
+    return linearize(cfg)
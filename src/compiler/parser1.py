@@ -1,49 +1,84 @@
+from typing import Any, Generator, Iterable
+
 from compiler import ast
-from compiler.tokenizer import Token
+from compiler.tokenizer import Token, TokenStream
 from compiler.tokenizer import tokenize
 
-
-
-def parse(tokens: list[Token]) -> ast.Expression:
-    pos = 0
-    # 'peek()' returns the token at 'pos',
-    # or a special 'end' token if we're past the end of the token list.
-    def peek() -> Token:
-        if pos < len(tokens):
-            return tokens[pos]
+# A parsing step: a generator that yields the sub-steps it needs the results of
+# (see '_run') and returns the AST node it has parsed.
+_Step = Generator[Any, Any, Any]
+
+# Binary operators: text -> (left binding power, right binding power).
+# An operator on the pending stack is reduced when an operator with a lower
+# left binding power follows it. 'and', 'or' and '=' take a whole expression
+# as their right operand, which their right binding power of 0 expresses.
+_binary_operators: dict[str, tuple[int, int]] = {
+    '=': (0, 0),
+    'or': (1, 0), 'and': (1, 0),
+    '==': (3, 5), '!=': (3, 5), '<': (3, 5), '<=': (3, 5), '>': (3, 5), '>=': (3, 5),
+    '%': (3, 5), '+=': (3, 5), '-=': (3, 5),
+    '+': (5, 7), '-': (5, 7),
+    '*': (7, 9), '/': (7, 9),
+}
+_arithmetic_operators = frozenset(['+', '-', '*', '/'])
+_comparison_operators = frozenset(['==', '!=', '<', '<=', '>', '>=', '%', '+=', '-='])
+
+# Identifiers that 'parse_factor' does not treat as names.
+_special_identifiers = frozenset(['true', 'false', 'while', 'not', 'return'])
+
+# Where 'parse_expression' is within the current (sub)expression. It decides
+# which operators may continue it.
+_START, _AFTER_BLOCK, _CALCULATION, _COMPARISON = range(4)
+
+
+def _run(step: _Step) -> Any:
+    """Runs a parsing step and all the sub-steps it yields with an explicit stack instead of recursion."""
+    stack = [step]
+    value = None
+    while True:
+        try:
+            substep = stack[-1].send(value)
+        except StopIteration as finished:
+            stack.pop()
+            if not stack:
+                return finished.value
+            value = finished.value
         else:
-            return Token(
-                type="end",
-                text="",
-                location=tokens[-1].location
-            )
+            stack.append(substep)
+            value = None
+
+
+def parse(tokens: Iterable[Token] | TokenStream) -> ast.Expression:
+    # 'tokens' can be a list, any lazy iterable such as 'tokenize_iter(...)',
+    # or a 'TokenStream'. Tokens are only pulled from it as parsing proceeds.
+    #
+    # The parsing functions below are generators. Instead of calling each other,
+    # they 'yield' the parsing step whose result they need, and '_run' drives them
+    # with an explicit stack. Chains of binary operators are parsed by a single
+    # precedence-climbing loop in 'parse_expression' using '_binary_operators'.
+    # Deep nesting is therefore not limited by Python's recursion limit.
+    stream = tokens if isinstance(tokens, TokenStream) else TokenStream(tokens)
+    # 'peek()' returns the current token,
+    # or a special 'end' token if we're past the end of the tokens.
+    def peek() -> Token:
+        return stream.current
 
-    # 'consume(expected)' returns the token at 'pos' and moves 'pos' forward.
+    # 'consume(expected)' returns the current token and moves the stream forward.
     # If the optional parameter 'expected' is given, it checks that the token being consumed has that text.
     # If 'expected' is a list, then the token must have one of the texts in the list.
     def consume(expected: str | list[str] | None = None) -> Token:
-        # print(f'expected {expected}')
-        nonlocal pos
-        token = peek()
+        token = stream.current
         if isinstance(expected, str) and token.text != expected:
             raise Exception(f'{peek().location} :  expected "{expected}"')
         if isinstance(expected, list) and token.text not in expected:
             comma_separated = ", ".join([f'"{e}"' for e in expected])
             raise Exception(f'{peek().location} :  expected one of: {comma_separated}')
-        pos += 1
-        # print(f'consumed {token}')
+        stream.advance()
         return token
 
-    # This is the parsing function for integer literals.
-    # It checks that we're looking at an integer literal token,
-    # moves past it, and returns a 'Literal' AST node containing the integer from the token.
-    def parse_int_literal() -> ast.Literal:
-        if peek().type != 'int_literal':
-            raise Exception(f'{peek().location} :  expected an integer literal')
-        token = consume()
-        return ast.Literal(int(token.text))
+    advance = stream.advance
 
-    def parse_identifier() -> ast.Identifier| ast.Literal| ast.Function | ast.VariableDeclaration:
+    def parse_identifier() -> _Step:
         token = peek()
         if token.text == 'true':
             consume(token.text)
@@ -51,320 +86,253 @@ def parse(tokens: list[Token]) -> ast.Expression:
         if token.text == 'false':
             consume(token.text)
             return ast.Literal(bool(False))
-        if peek().type != 'identifier':
-            raise Exception(f'{peek().location} :  expected an identifier')
-        else:
-            consume()
-            next_token = peek()
-
-            if next_token.text == '(':
-                consume('(')
-                args = parse_arguments()
-                consume(')')
-                return ast.Function(name=token.text, args=args)
-            elif next_token.text == ':':
-                consume(':')
-                arg_type = parse_type_annotation()
-                return ast.VariableDeclaration(name=token.text, variable_type=arg_type)
-            else:   # no an if expression
-                if token.text.isdigit() or (token.text[0].isdigit() and not token.text.isidentifier()):
-                    raise Exception(f'{next_token.location} : An identifier cannot start with a digit')
-                return ast.Identifier(token.text)
-    
-    def parse_arguments()-> list[ast.Expression]:
-        args:list[ast.Expression] = []
-        while peek().type != 'end' and peek().text != ')' and peek().text !=':' and peek().text !='{':
+        if token.type != 'identifier':
+            raise Exception(f'{token.location} :  expected an identifier')
+        consume()
+        next_token = peek()
+        if next_token.text == '(':
+            consume('(')
+            args = yield parse_arguments()
+            consume(')')
+            return ast.Function(name=token.text, args=args, location=token.location)
+        elif next_token.text == ':':
+            consume(':')
+            arg_type = parse_type_annotation()
+            return ast.VariableDeclaration(name=token.text, variable_type=arg_type, location=token.location)
+        return ast.Identifier(token.text, location=token.location)
+
+    def parse_arguments() -> _Step:
+        args: list[ast.Expression] = []
+        while peek().type != 'end' and peek().text not in (')', ':', '{'):
             if peek().text == ',':
                 consume(',')
             if peek().text == ';':
                 consume(';')
-            args.append(parse_expression())
-
-        # print(f'args{args}')
+            args.append((yield parse_expression()))
         return args
 
-    def parse_term() -> ast.Expression:
-        left = parse_factor()
-        while peek().text in ['*', '/']:
-            operator_token = consume()
-            operator = operator_token.text
-            right = parse_factor()
-            left = ast.BinaryOp(
-                left,
-                operator,
-                right
-            )
-        return left
-
-    # Borrowing from mathematics, we say that
-    # "an identifier or an integer literal"
-    # is called a "term".
-    def parse_factor() -> ast.Expression:
-        # print(peek().text,peek().type)
-        if peek().text == '(':
-            return parse_parenthesized()
-        elif peek().text == 'if':
-            return parse_if()
-        elif peek().text == 'while':
-            return parse_while()
-        elif peek().text in ['not', '-']:
-            return parse_unary()
-        elif peek().text =='break':
-            return parse_break()
-        elif peek().text == 'continue':
-            return parse_continue()
-        elif peek().text == 'return':
-            return parse_return()
-        elif peek().text =='&':
-            return parse_address()
-        elif peek().text =='*':
-            return parse_dereference()
-        elif peek().type == 'int_literal':
-            return parse_int_literal()
-        elif peek().type == 'identifier':
-            return parse_identifier()
-
+    def parse_factor() -> _Step:
+        token = peek()
+        text = token.text
+        if text == '(':
+            consume('(')
+            expr = yield parse_expression()
+            if peek().text == ')': consume(')')
+            if peek().text == ';': consume(';')
+            return expr
+        elif text == 'if':
+            consume('if')
+            condition = yield parse_expression()
+            consume('then')
+            then_branch = yield parse_expression()
+            else_branch = None
+            if peek().text == 'else':
+                consume('else')
+                else_branch = yield parse_expression()
+            return ast.IfExpression(condition=condition, then_branch=then_branch, else_branch=else_branch,
+                                    location=token.location)
+        elif text == 'while':
+            consume('while')
+            condition = yield parse_expression()
+            consume('do')
+            do = yield parse_expression()
+            if not isinstance(do, ast.Block) and peek().text == ';':
+                consume(';')
+                do = ast.Block([do, ast.Literal(None)])
+            return ast.WhileExpression(condition=condition, do=do, location=token.location)
+        elif text in ('not', '-'):
+            consume()
+            if peek().text in ('not', '-'):
+                right = yield parse_factor()
+            else:
+                right = yield parse_expression()
+            return ast.UnaryOp(operation=text, right=right)
+        elif text == 'break':
+            consume('break')
+            return ast.Break()
+        elif text == 'continue':
+            consume('continue')
+            return ast.Continue()
+        elif text == 'return':
+            consume('return')
+            value = yield parse_expression()
+            return ast.Return(value=value, location=token.location)
+        elif text == '&':
+            consume('&')
+            operand = yield parse_expression()
+            return ast.AddressOf(operand=operand)
+        elif text == '*':
+            consume('*')
+            operand = yield parse_expression()
+            return ast.Dereference(operand=operand)
+        elif token.type == 'int_literal':
+            consume()
+            return ast.Literal(int(text))
+        elif token.type == 'identifier':
+            return (yield parse_identifier())
         else:
-            raise Exception(f'{peek().location} : expected an integer literal or an identifier, but got {peek()}')
-    
-    def parse_parenthesized() -> ast.Expression:
-        consume('(')
-        # Recursively call the top level parsing function
-        # to parse whatever is inside the parentheses.
-        expr = parse_expression()
-        if peek().text == ')': consume(')')
-        if peek().text == ';': consume(';')
-        return expr  
-    
-    def parse_if() -> ast.Expression:
-        consume('if')
-        condition = parse_expression()
-        consume('then')
-        then_branch = parse_expression()
-
-        if peek().text == 'else':
-            consume('else')
-            else_branch = parse_expression()
-        else:   else_branch = None
-        return ast.IfExpression(condition=condition, then_branch=then_branch, else_branch=else_branch)
-    
-    def parse_while() -> ast.Expression:
-        consume('while')
-        condition = parse_expression()
-        consume('do')
-        do = parse_expression()
-
-        if isinstance(do, ast.Block):
-            return ast.WhileExpression(condition=condition, do=do)
-        elif peek().text == ';':
-            consume(';')
-            return ast.WhileExpression(condition=condition, do=ast.Block([do, ast.Literal(None)]))
-        return ast.WhileExpression(condition=condition, do=do)
-
-    
-    def parse_calculation() -> ast.Expression:
-        # Parse the first term.
-        left = parse_term()
-        # While there are more `+` or '-'...
-        while peek().text in ['+', '-']:
-            # Move past the '+' or '-'.
-            operator_token = consume()
-            operator = operator_token.text
-
-            # Parse the operator on the right.
-            right = parse_term()
-
-            # Combine it with the stuff we've accumulated on the left so far.
-            left = ast.BinaryOp(
-                left,
-                operator,
-                right
-            )
-        
+            raise Exception(f'{token.location} : expected an integer literal or an identifier, but got {token}')
+
+    def parse_expression() -> _Step:
+        # Operators whose right operand is still being parsed: (left operand, operator, right binding power).
+        pending: list[tuple[ast.Expression, str, int]] = []
+        state = _START
+        while True:
+            # Parse an operand. Plain literals, identifiers and calls are handled inline.
+            token = stream.current
+            if token.type == 'int_literal':
+                advance()
+                left: ast.Expression = ast.Literal(int(token.text))
+            elif token.type == 'identifier' and token.text not in _special_identifiers:
+                advance()
+                following = stream.current.text
+                if following == '(':
+                    advance()
+                    args = yield parse_arguments()
+                    consume(')')
+                    left = ast.Function(name=token.text, args=args, location=token.location)
+                elif following == ':':
+                    advance()
+                    left = ast.VariableDeclaration(name=token.text, variable_type=parse_type_annotation(),
+                                                   location=token.location)
+                else:
+                    left = ast.Identifier(token.text, location=token.location)
+            elif state == _START and token.text == '{':
+                left = yield parse_block()
+                state = _AFTER_BLOCK
+            else:
+                left = yield parse_factor()
+            if state == _START:
+                state = _CALCULATION
+
+            # Apply binary operators until one cannot continue this expression.
+            operator = stream.current.text
+            binding_powers = _binary_operators.get(operator)
+            if binding_powers is None \
+                    or (state == _AFTER_BLOCK and operator in _arithmetic_operators) \
+                    or (state == _COMPARISON and operator == '='):
+                break
+            left_power, right_power = binding_powers
+            while pending and left_power < pending[-1][2]:
+                pending_left, pending_operator, _ = pending.pop()
+                left = ast.BinaryOp(pending_left, pending_operator, left)
+            advance()
+            pending.append((left, operator, right_power))
+            if operator in _comparison_operators:
+                state = _COMPARISON
+            elif operator not in _arithmetic_operators:
+                # 'and', 'or' and '=' start a new expression on their right.
+                state = _START
+
+        while pending:
+            pending_left, pending_operator, _ = pending.pop()
+            left = ast.BinaryOp(pending_left, pending_operator, left)
         return left
 
-    def parse_unary()-> ast.Expression:
-        operation = peek().text
-        consume()
-        if peek().text in ['not','-']:
-            right = parse_unary()
-        else:
-            right = parse_expression()
-        return ast.UnaryOp(operation=operation, right=right)
-    
-    def parse_break() -> ast.Expression:
-        consume('break')
-        return ast.Break()
-    
-    def parse_continue() -> ast.Expression:
-        consume('continue')
-        return ast.Continue()
-    
-    def parse_return() -> ast.Return:
-        consume('return')
-        value = parse_expression()  
-        return ast.Return(value=value)
-
-    
-    def parse_address() -> ast.Expression:
-        consume('&')
-        operand = parse_expression()
-        return ast.AddressOf(operand=operand)
-    
-    def parse_dereference() -> ast.Expression:
-        consume('*')
-        operand = parse_expression()
-        return ast.Dereference(operand=operand)
-
-    def parse_block()-> ast.Expression:
+    def parse_block() -> _Step:
         consume('{')
-        expressions = parse_multiple_expressions()
+        expressions = yield parse_multiple_expressions()
         block = ast.Block(expressions)
         consume('}')
         return block
-    
+
     def parse_type_annotation() -> ast.Type:
+        base_type: ast.Type
         if peek().text == 'Int':
             consume('Int')
-            base_type =  ast.Int
+            base_type = ast.Int
         elif peek().text == 'Bool':
             consume('Bool')
-            base_type =  ast.Bool
+            base_type = ast.Bool
         elif peek().text == 'Unit':
             consume('Unit')
-            base_type =  ast.Unit
+            base_type = ast.Unit
         else:
             raise Exception(f'{peek().location} : Unsupported type {peek().text}')
-
         if peek().text == '*':
             consume('*')
-            return ast.PointerType(base_type=base_type)  
-
+            return ast.PointerType(base_type=base_type)
         return base_type
-        
-
 
-    def parse_variable_declaration()-> ast.Expression:
+    def parse_variable_declaration() -> _Step:
         consume('var')
-        if peek().type == 'identifier':
-            name = peek().text
-            consume()
-
-            type_annotation = None
-            if peek().text == ':':
-                consume(':')
-                type_annotation = parse_type_annotation()
-
-            consume('=')
-            initializer = parse_expression()
-
-            
-
-            return ast.VariableDeclaration(name=name, assignment=initializer, variable_type=type_annotation)
-        else:
+        if peek().type != 'identifier':
             raise Exception(f'{peek().location} : Expected an identifier')
-    
-    def parse_function_definition() -> ast.Function:
+        name_token = consume()
+        name = name_token.text
+        type_annotation = None
+        if peek().text == ':':
+            consume(':')
+            type_annotation = parse_type_annotation()
+        consume('=')
+        initializer = yield parse_expression()
+        return ast.VariableDeclaration(name=name, assignment=initializer, variable_type=type_annotation,
+                                       location=name_token.location)
+
+    def parse_function_definition() -> _Step:
         consume('fun')
-        if peek().type == 'identifier':
-
-            name = peek().text
-            consume()
-            params = parse_arguments()
-            if peek().text == ')': consume(')')
-
-            return_type = None
-            if peek().text == ':':
-                consume(':')
-                return_type = parse_type_annotation()
-            if peek().text == '{':
-                body = parse_block()
-            
-            return ast.Function(name=name, args=params, return_type=return_type, body=body)
-        else:
+        if peek().type != 'identifier':
             raise Exception(f'{peek().location} : Expected an identifier')
-
-    def parse_multiple_expressions() -> list[ast.Expression]:
+        name_token = consume()
+        name = name_token.text
+        params = yield parse_arguments()
+        if peek().text == ')': consume(')')
+        return_type = None
+        if peek().text == ':':
+            consume(':')
+            return_type = parse_type_annotation()
+        if peek().text != '{':
+            raise Exception(f'{peek().location} : Expected a function body')
+        body = yield parse_block()
+        return ast.Function(name=name, args=params, return_type=return_type, body=body,
+                            location=name_token.location)
+
+    def parse_multiple_expressions() -> _Step:
         expressions: list[ast.Expression] = []
         result: ast.Expression = ast.Literal(None)
 
-        while peek().type != 'end' and peek().text!='}':
+        while peek().type != 'end' and peek().text != '}':
             if peek().text == ';':
-                consume(';')# This handles empty statements (just a semicolon)
+                consume(';')    # This handles empty statements (just a semicolon)
                 continue
             if peek().text == '{':
-                block = parse_block()
+                block = yield parse_block()
                 if peek().text == ';':
                     consume(';')
                     expressions.append(block)
-                elif peek().type != 'end' and peek().text!='}':
+                elif peek().type != 'end' and peek().text != '}':
                     expressions.append(block)
                 else:
                     result = block
                     break
             else:
                 if peek().text == 'var':
-                    expression = parse_variable_declaration()
+                    expression = yield parse_variable_declaration()
                 elif peek().text == 'fun':
-                    expression = parse_function_definition()
+                    expression = yield parse_function_definition()
                 else:
-                    expression = parse_expression()
-                if peek().type != 'end' and peek().text!='}':
-
+                    expression = yield parse_expression()
+                if peek().type != 'end' and peek().text != '}':
                     if peek().text == ';':
                         consume(';')
-                    elif peek().text not in ('}', 'end') and not isinstance(expression, ast.IfExpression | ast.WhileExpression | ast.Function):
-                        # If the expression is not an if-else statement, and we're not at the end or facing a closing brace, expect a semicolon.
-                        # no semicolon is allowed after function definition
-                        raise Exception("{peek().location} : Expected ';' after expression within a block, unless it's an if-else statement.")
-
+                    elif peek().text != 'end' and not isinstance(expression, ast.IfExpression | ast.WhileExpression | ast.Function):
+                        # No semicolon is needed after if-else, while and function definitions.
+                        raise Exception(f"{peek().location} : Expected ';' after expression within a block, unless it's an if-else statement.")
                     expressions.append(expression)
-                else:   
+                else:
                     result = expression
-                        
 
         expressions.append(result)
         return expressions
-    # This is our main parsing function for this example.
-    # To parse "integer + integer" expressions,
-    # it uses `parse_int_literal` to parse the first integer,
-    # then it checks that there's a supported operator,
-    # and finally it uses `parse_int_literal` to parse the
-    # second integer.
-    def parse_expression() -> ast.Expression:
 
-        if peek().text == '{':
-            left = parse_block()
-        else:
-                    left = parse_calculation()
-        
-        if peek().text == '=':
-            consume('=')
-            operation = '='
-            right = parse_expression()
-            return ast.BinaryOp(left=left, operation=operation, right=right)
-        
-        while peek().text in ['==', '!=', '<','<=', '>', '>=','%','+=','-=']:
-            operation_token = consume()
-            right = parse_calculation()
-            left = ast.BinaryOp(left=left, operation=operation_token.text, right=right)
-        while peek().text in ['or', 'and']:
-            operation_token = consume(peek().text)
-            right=parse_expression()
-            left = ast.BinaryOp(left=left, operation=operation_token.text, right=right)
-        return left
-    
-    def parse_all()-> ast.Expression:
+    def parse_all() -> _Step:
         if peek().type == 'end':
             raise Exception('No input')
-        expressions = parse_multiple_expressions()
-        if pos!= len(tokens):
-            raise Exception(f'{peek().location} : Only {pos} tokens were parsed')
-        
-        if len(expressions) ==1: 
+        expressions = yield parse_multiple_expressions()
+        if not stream.at_end():
+            raise Exception(f'{peek().location} : Only {stream.consumed} tokens were parsed')
+        if len(expressions) == 1:
             return expressions[0]
-        else:   
-            return ast.Block(expressions)
-    
-    return parse_all()
+        return ast.Block(expressions)
 
+    return _run(parse_all())
@@ -0,0 +1,163 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, TextIO
+from compiler import ast
+from compiler.tokenizer import Location
+
+# The name of the outermost frame in call stacks.
+main_frame = '<main>'
+
+
+@dataclass
+class NodeStats:
+    """How often a node was evaluated, and the time spent in it including everything it evaluated."""
+    label: str
+    location: Location | None
+    count: int = 0
+    time: float = 0.0
+    # Evaluations that have not finished yet. Only the outermost one of a
+    # recursion adds to 'time', so that no time is counted twice.
+    active: int = 0
+
+
+@dataclass
+class FunctionStats:
+    """Calls of a user-defined function. 'self_time' excludes the time spent in other user-defined functions."""
+    name: str
+    location: Location | None
+    calls: int = 0
+    time: float = 0.0
+    self_time: float = 0.0
+    active: int = 0
+
+
+def _node_label(node: ast.Expression) -> tuple[str, Location | None] | None:
+    match node:
+        case ast.WhileExpression():
+            return 'while', node.location
+        case ast.IfExpression():
+            return 'if', node.location
+        case ast.Return():
+            return 'return', node.location
+        case ast.VariableDeclaration():
+            return f'var {node.name}', node.location
+        case ast.BinaryOp(operation='=') if isinstance(node.left, ast.Identifier):
+            left = node.left
+            return f'{left.name} =', left.location
+        case ast.Function() if node.body is None:
+            return f'call {node.name}', node.location
+    return None
+
+
+def _format_location(location: Location | None) -> str:
+    return f'{location.line}:{location.pos}' if location is not None else '?'
+
+
+@dataclass
+class Profile:
+    """Execution counts and times of a program run by the closure engine.
+
+    The engine only instruments the program when it is given a profile. Loops,
+    conditionals, declarations, assignments, returns and calls are recorded per
+    node, and user-defined functions per definition. The self time of every call
+    stack is kept for flame graphs.
+    """
+    nodes: list[NodeStats] = field(default_factory=list)
+    functions: list[FunctionStats] = field(default_factory=list)
+    # Self time per call stack, from the outermost frame inwards.
+    stacks: dict[tuple[str, ...], float] = field(default_factory=dict)
+    total_time: float = 0.0
+    _stack: list[str] = field(default_factory=lambda: [main_frame], init=False, repr=False)
+    # Time spent in calls made by each frame on '_stack'.
+    _callee_times: list[float] = field(default_factory=lambda: [0.0], init=False, repr=False)
+
+    def _add_stack_time(self, self_time: float) -> None:
+        key = tuple(self._stack)
+        self.stacks[key] = self.stacks.get(key, 0.0) + self_time
+
+    def instrument_program(self, run: Callable[[], Any]) -> Callable[[], Any]:
+        def profiled_program() -> Any:
+            start = time.perf_counter()
+            try:
+                return run()
+            finally:
+                elapsed = time.perf_counter() - start
+                self.total_time += elapsed
+                self._add_stack_time(elapsed - self._callee_times[0])
+                self._callee_times[0] = 0.0
+        return profiled_program
+
+    def instrument_node(self, node: ast.Expression, code: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        """Wraps the compiled code of a node, if it is one of the profiled kinds."""
+        label = _node_label(node)
+        if label is None:
+            return code
+        stats = NodeStats(*label)
+        self.nodes.append(stats)
+        perf_counter = time.perf_counter
+
+        def profiled_node(frame: Any) -> Any:
+            stats.count += 1
+            stats.active += 1
+            start = perf_counter()
+            try:
+                return code(frame)
+            finally:
+                stats.active -= 1
+                if stats.active == 0:
+                    stats.time += perf_counter() - start
+        return profiled_node
+
+    def function_stats(self, definition: ast.Function) -> FunctionStats:
+        stats = FunctionStats(definition.name, definition.location)
+        self.functions.append(stats)
+        return stats
+
+    def instrument_function(self, stats: FunctionStats, function: Callable[..., Any]) -> Callable[..., Any]:
+        stack = self._stack
+        callee_times = self._callee_times
+        perf_counter = time.perf_counter
+
+        def profiled_function(*args: Any) -> Any:
+            stats.calls += 1
+            stats.active += 1
+            stack.append(stats.name)
+            callee_times.append(0.0)
+            start = perf_counter()
+            try:
+                return function(*args)
+            finally:
+                elapsed = perf_counter() - start
+                self_time = elapsed - callee_times.pop()
+                self._add_stack_time(self_time)
+                stack.pop()
+                callee_times[-1] += elapsed
+                stats.self_time += self_time
+                stats.active -= 1
+                if stats.active == 0:
+                    stats.time += elapsed
+        return profiled_function
+
+    def report(self, limit: int = 20) -> str:
+        """Returns tables of the nodes and functions that took the most time."""
+        total = self.total_time or 1.0
+        lines = [f'Total time: {self.total_time:.3f} s', '',
+                 f'{"time (s)":>10} {"%":>6} {"count":>10}  node']
+        for node in sorted(self.nodes, key=lambda stats: stats.time, reverse=True)[:limit]:
+            if node.count > 0:
+                lines.append(f'{node.time:10.4f} {100 * node.time / total:6.1f} {node.count:10d}  '
+                             f'{node.label} at {_format_location(node.location)}')
+        if self.functions:
+            lines += ['', f'{"time (s)":>10} {"self (s)":>10} {"calls":>10}  function']
+            for function in sorted(self.functions, key=lambda stats: stats.self_time, reverse=True)[:limit]:
+                lines.append(f'{function.time:10.4f} {function.self_time:10.4f} {function.calls:10d}  '
+                             f'{function.name} at {_format_location(function.location)}')
+        return '\n'.join(lines) + '\n'
+
+    def write_collapsed_stacks(self, output: TextIO) -> None:
+        """Writes the self time of each call stack in microseconds, one 'main;f;g 123' line per stack,
+        the input format of flame graph tools."""
+        for stack, self_time in sorted(self.stacks.items()):
+            microseconds = round(self_time * 1_000_000)
+            if microseconds > 0:
+                output.write(f'{";".join(stack)} {microseconds}\n')
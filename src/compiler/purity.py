@@ -0,0 +1,134 @@
+from dataclasses import dataclass, field
+from compiler import ast
+
+
+@dataclass
+class _Definition:
+    """What the body of a function definition does, apart from what the functions it calls do."""
+    has_effects: bool = False
+    # Ids of the definitions it calls, or None for a call whose target is not known.
+    callees: set[int | None] = field(default_factory=set)
+
+
+def pure_functions(root: ast.Expression) -> set[int]:
+    """Returns the ids of the function definitions in a resolved program that are pure.
+
+    A function is pure if its result depends only on its arguments: it does not call
+    library functions, it neither reads nor assigns variables outside of its own
+    frame, and it only calls pure functions. Functions that call each other are
+    assumed pure until one of them is shown not to be.
+    """
+    definitions: dict[int, _Definition] = {}
+    # The function definitions of each frame by slot, innermost frame last,
+    # and the definition whose body is being visited, if any.
+    frames: list[dict[int, ast.Function]] = []
+    current: list[_Definition | None] = [None]
+
+    def collect_definitions(node: ast.Expression | None, found: dict[int, ast.Function]) -> dict[int, ast.Function]:
+        # Definitions may be called before they appear, so a frame's definitions are collected first.
+        match node:
+            case ast.Function() if node.body is not None:
+                if node.slot is not None:
+                    found[node.slot] = node
+            case ast.Function():
+                for arg in node.args:
+                    collect_definitions(arg, found)
+            case ast.Block():
+                for expression in node.expressions:
+                    collect_definitions(expression, found)
+            case ast.BinaryOp():
+                collect_definitions(node.left, found)
+                collect_definitions(node.right, found)
+            case ast.UnaryOp():
+                collect_definitions(node.right, found)
+            case ast.VariableDeclaration():
+                collect_definitions(node.assignment, found)
+            case ast.IfExpression():
+                collect_definitions(node.condition, found)
+                collect_definitions(node.then_branch, found)
+                collect_definitions(node.else_branch, found)
+            case ast.WhileExpression():
+                collect_definitions(node.condition, found)
+                collect_definitions(node.do, found)
+            case ast.Return():
+                collect_definitions(node.value, found)
+        return found
+
+    def mark_effect() -> None:
+        definition = current[-1]
+        if definition is not None:
+            definition.has_effects = True
+
+    def visit(node: ast.Expression | None) -> None:
+        match node:
+            case None:
+                pass
+
+            case ast.Identifier():
+                if node.scope_depth != 0:
+                    mark_effect()
+
+            case ast.Function() if node.body is not None:
+                definition = _Definition()
+                definitions[id(node)] = definition
+                frames.append(collect_definitions(node.body, {}))
+                current.append(definition)
+                visit(node.body)
+                current.pop()
+                frames.pop()
+
+            case ast.Function():
+                for arg in node.args:
+                    visit(arg)
+                if node.slot is None:
+                    mark_effect()
+                    return
+                callee = None
+                if node.scope_depth is not None and node.scope_depth < len(frames):
+                    callee = frames[-1 - node.scope_depth].get(node.slot)
+                caller = current[-1]
+                if caller is not None:
+                    caller.callees.add(id(callee) if callee is not None else None)
+
+            case ast.Block():
+                for expression in node.expressions:
+                    visit(expression)
+
+            case ast.BinaryOp():
+                visit(node.left)
+                visit(node.right)
+
+            case ast.UnaryOp():
+                visit(node.right)
+
+            case ast.VariableDeclaration():
+                visit(node.assignment)
+
+            case ast.IfExpression():
+                visit(node.condition)
+                visit(node.then_branch)
+                visit(node.else_branch)
+
+            case ast.WhileExpression():
+                visit(node.condition)
+                visit(node.do)
+
+            case ast.Return():
+                visit(node.value)
+
+            case ast.AddressOf() | ast.Dereference():
+                mark_effect()
+                visit(node.operand)
+
+    frames.append(collect_definitions(root, {}))
+    visit(root)
+
+    pure = {key for key, definition in definitions.items() if not definition.has_effects}
+    changed = True
+    while changed:
+        changed = False
+        for key in list(pure):
+            if any(callee not in pure for callee in definitions[key].callees):
+                pure.discard(key)
+                changed = True
+    return pure
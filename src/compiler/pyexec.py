@@ -0,0 +1,389 @@
+import hashlib
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import CodeType
+from typing import Any, Callable, TypeVar
+from compiler import ast
+from compiler.interpreter import operators
+from compiler.parser1 import parse
+from compiler.resolver import resolve, resolved_depth, resolved_slot
+from compiler.tokenizer import tokenize
+from compiler.type_checker import typecheck
+
+Value = Any
+T = TypeVar('T')
+
+# The generated source defines the whole program as this function.
+program_function = '__program__'
+
+# Deeper expressions are split up with temporaries, because CPython's
+# parser and compiler only handle a limited nesting of expressions.
+max_nesting = 50
+
+# Compiled programs kept by 'compile_source', by the hash of their source code.
+code_cache_size = 128
+_code_cache: OrderedDict[str, CodeType] = OrderedDict()
+
+_binary_operators = {
+    '+': '+', '-': '-', '*': '*', '/': '//', '%': '%',
+    '<': '<', '<=': '<=', '>': '>', '>=': '>=', '==': '==', '!=': '!=',
+    # Like the interpreters, '+=' and '-=' compute the result without assigning it.
+    '+=': '+', '-=': '-',
+}
+
+
+def _print_int(*args: Value) -> None:
+    for arg in args:
+        if type(arg) is not int:
+            raise Exception(f'Expected an integer, but get {arg}')
+        print(arg)
+
+
+def _print_bool(*args: Value) -> None:
+    for arg in args:
+        if type(arg) is not bool:
+            raise Exception(f'Expected an boolean value, but get {arg}')
+        print(arg)
+
+
+def _read_int() -> int:
+    return int(sys.stdin.readline())
+
+
+# The globals that generated code may refer to, besides its own definitions.
+runtime: dict[str, Any] = {
+    '_print_int': _print_int,
+    '_print_bool': _print_bool,
+    '_read_int': _read_int,
+    '_unary': operators['unary'],
+}
+
+
+@dataclass
+class _Loop:
+    in_condition: bool = True
+    # Temporary that tells why the loop's condition left the loop, if it ever does.
+    escape: str | None = None
+
+
+class _Generator:
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+        self.indent = 1
+        self.temporaries: set[str] = set()
+        # Nesting depth of generated expressions, for those that are nested at all.
+        self.depths: dict[str, int] = {}
+        # Ids of the frames of the functions being generated, innermost last.
+        self.frames = [0]
+        self.frame_count = 1
+        self.loops: list[_Loop] = []
+        # Names of enclosing functions that the current function assigns to.
+        self.nonlocals: set[str] = set()
+
+    def emit(self, line: str, extra_indent: int = 0) -> None:
+        self.lines.append('    ' * (self.indent + extra_indent) + line)
+
+    def nested(self, generate: Callable[[], T]) -> tuple[list[str], T]:
+        """Generates code one level deeper, returning its lines instead of emitting them."""
+        lines, self.lines = self.lines, []
+        self.indent += 1
+        try:
+            value = generate()
+            return self.lines, value
+        finally:
+            self.indent -= 1
+            self.lines = lines
+
+    def temporary(self) -> str:
+        name = f'_t{len(self.temporaries)}'
+        self.temporaries.add(name)
+        return name
+
+    def name(self, name: str, depth: int, slot: int) -> str:
+        # Names are unique per frame and slot, so blocks need no scopes of their own.
+        return f'{name}_{self.frames[-1 - depth]}_{slot}'
+
+    def is_stable(self, value: str) -> bool:
+        """Whether evaluating 'value' later gives the same result as evaluating it now."""
+        return value in ('None', 'True', 'False') or value.isdigit() or value in self.temporaries
+
+    def nest(self, expression: str, operands: list[str]) -> str:
+        depth = 1 + max((self.depths.get(operand, 0) for operand in operands), default=0)
+        if depth < max_nesting:
+            self.depths[expression] = depth
+            return expression
+        temporary = self.temporary()
+        self.emit(f'{temporary} = {expression}')
+        return temporary
+
+    def operands(self, nodes: list[ast.Expression]) -> list[str]:
+        values: list[str] = []
+        for node in nodes:
+            start = len(self.lines)
+            value = self.expression(node)
+            if len(self.lines) > start:
+                # The statements of this operand must run after the earlier operands are evaluated.
+                saved = []
+                for i, earlier in enumerate(values):
+                    if not self.is_stable(earlier):
+                        values[i] = self.temporary()
+                        saved.append('    ' * self.indent + f'{values[i]} = {earlier}')
+                self.lines[start:start] = saved
+            values.append(value)
+        return values
+
+    def statement(self, node: ast.Expression) -> None:
+        """Generates code for a node whose value is not used."""
+        match node:
+            case ast.Block():
+                for expression in node.expressions:
+                    self.statement(expression)
+            case ast.IfExpression():
+                condition = self.expression(node.condition)
+                self.emit(f'if {condition}:')
+                self.emit_lines(self.nested(lambda: self.statement(node.then_branch))[0])
+                if node.else_branch is not None:
+                    else_lines = self.nested(lambda: self.statement(node.else_branch))[0]
+                    if else_lines:
+                        self.emit('else:')
+                        self.lines += else_lines
+            case _:
+                value = self.expression(node)
+                if not value.isidentifier() and not value.isdigit():
+                    self.emit(value)
+
+    def emit_lines(self, lines: list[str]) -> None:
+        self.lines += lines if lines else ['    ' * (self.indent + 1) + 'pass']
+
+    def expression(self, node: ast.Expression) -> str:
+        """Generates the statements of a node and returns a Python expression for its value."""
+        match node:
+            case ast.Literal():
+                return repr(node.value)
+
+            case ast.Identifier():
+                return self.name(node.name, resolved_depth(node), resolved_slot(node))
+
+            case ast.BinaryOp():
+                operation = node.operation
+                if operation == '=':
+                    if not isinstance(node.left, ast.Identifier):
+                        raise Exception(f'{node} is not supported by pyexec')
+                    depth = resolved_depth(node.left)
+                    name = self.name(node.left.name, depth, resolved_slot(node.left))
+                    if depth > 0:
+                        self.nonlocals.add(name)
+                    self.emit(f'{name} = {self.expression(node.right)}')
+                    return 'None'
+                if operation in ('and', 'or'):
+                    return self.short_circuit(node)
+                if operation not in _binary_operators:
+                    raise Exception(f'operation {operation} does not exist')
+                left, right = self.operands([node.left, node.right])
+                return self.nest(f'({left} {_binary_operators[operation]} {right})', [left, right])
+
+            case ast.UnaryOp():
+                operand = self.expression(node.right)
+                # The type checker knows which of the two the operator is; untyped code decides at run time.
+                if node.operation == 'not' and node.type == ast.Bool:
+                    return self.nest(f'(not {operand})', [operand])
+                if node.operation == '-' and node.type == ast.Int:
+                    return self.nest(f'(-{operand})', [operand])
+                return self.nest(f'_unary({operand})', [operand])
+
+            case ast.VariableDeclaration():
+                name = self.name(node.name, 0, resolved_slot(node))
+                self.emit(f'{name} = {self.expression(node.assignment)}')
+                return name
+
+            case ast.Block():
+                expressions = node.expressions
+                # A block that ends with ';' evaluates to its last expression before it.
+                last = len(expressions) - 1
+                last_expression = expressions[last] if expressions else None
+                if isinstance(last_expression, ast.Literal) and last_expression.value is None:
+                    last -= 1
+                for expression in expressions[:last]:
+                    self.statement(expression)
+                return self.expression(expressions[last]) if last >= 0 else 'None'
+
+            case ast.IfExpression():
+                return self.if_expression(node)
+
+            case ast.WhileExpression():
+                self.while_loop(node)
+                return 'None'
+
+            case ast.Break():
+                self.loop_exit('break')
+                return 'None'
+            case ast.Continue():
+                self.loop_exit('continue')
+                return 'None'
+
+            case ast.Return():
+                self.emit(f'return {self.expression(node.value)}')
+                return 'None'
+
+            case ast.Function():
+                if node.body is not None:
+                    self.function_definition(node)
+                    return 'None'
+                args = self.operands(node.args)
+                if node.slot is None:
+                    if f'_{node.name}' not in runtime:
+                        raise Exception(f'{node.name} is not defined')
+                    function = f'_{node.name}'
+                else:
+                    function = self.name(node.name, resolved_depth(node), node.slot)
+                return self.nest(f'{function}({", ".join(args)})', args)
+
+            case _:
+                raise Exception(f'{node} is not supported by pyexec')
+
+    def short_circuit(self, node: ast.BinaryOp) -> str:
+        operation = node.operation
+        # Chains of the same operator are flattened, so that long ones need no nesting.
+        operands: list[ast.Expression] = []
+        pending: list[ast.Expression] = [node]
+        while pending:
+            current = pending.pop()
+            if isinstance(current, ast.BinaryOp) and current.operation == operation:
+                pending += [current.right, current.left]
+            else:
+                operands.append(current)
+        first = self.expression(operands[0])
+        rest = []
+        for operand in operands[1:]:
+            rest.append(self.nested(lambda: self.expression(operand)))
+        if not any(lines for lines, _ in rest):
+            values = [first] + [value for _, value in rest]
+            return self.nest(f'({f" {operation} ".join(values)})', values)
+        # The remaining operands only run while the result is still undecided.
+        result = self.temporary()
+        self.emit(f'{result} = {first}')
+        for lines, value in rest:
+            self.emit(f'if {result}:' if operation == 'and' else f'if not {result}:')
+            self.lines += lines
+            self.emit(f'{result} = {value}', 1)
+        return result
+
+    def if_expression(self, node: ast.IfExpression) -> str:
+        condition = self.expression(node.condition)
+        then_lines, then_value = self.nested(lambda: self.expression(node.then_branch))
+        else_lines: list[str] = []
+        else_value = 'None'
+        if node.else_branch is not None:
+            else_lines, else_value = self.nested(lambda: self.expression(node.else_branch))
+        if not then_lines and not else_lines:
+            return self.nest(f'({then_value} if {condition} else {else_value})',
+                             [condition, then_value, else_value])
+        result = self.temporary()
+        self.emit(f'if {condition}:')
+        self.lines += then_lines
+        self.emit(f'{result} = {then_value}', 1)
+        self.emit('else:')
+        self.lines += else_lines
+        self.emit(f'{result} = {else_value}', 1)
+        return result
+
+    def while_loop(self, node: ast.WhileExpression) -> None:
+        loop = _Loop()
+        self.loops.append(loop)
+        condition_lines, condition = self.nested(lambda: self.expression(node.condition))
+        loop.in_condition = False
+        body_lines = self.nested(lambda: self.statement(node.do))[0]
+        self.loops.pop()
+        if loop.escape is not None:
+            self.emit(f'{loop.escape} = None')
+        if not condition_lines:
+            self.emit(f'while {condition}:')
+        else:
+            self.emit('while True:')
+            self.lines += condition_lines
+            self.emit(f'if not {condition}:', 1)
+            self.emit('break', 2)
+        self.emit_lines(body_lines)
+        if loop.escape is not None:
+            # 'break' and 'continue' in the condition belong to the enclosing loop.
+            self.emit(f"if {loop.escape} == 'break':")
+            self.lines += self.nested(lambda: self.loop_exit('break'))[0]
+            self.emit(f"elif {loop.escape} == 'continue':")
+            self.lines += self.nested(lambda: self.loop_exit('continue'))[0]
+
+    def loop_exit(self, keyword: str) -> None:
+        if not self.loops:
+            raise Exception(f'{keyword} outside of a loop is not supported by pyexec')
+        loop = self.loops[-1]
+        if not loop.in_condition:
+            self.emit(keyword)
+            return
+        # A Python 'break' here would leave the loop whose condition this is, so
+        # the loop leaves itself and tells the enclosing loop what to do.
+        if loop.escape is None:
+            loop.escape = self.temporary()
+        self.emit(f"{loop.escape} = '{keyword}'")
+        self.emit('break')
+
+    def function_definition(self, node: ast.Function) -> None:
+        name = self.name(node.name, 0, resolved_slot(node))
+        self.frames.append(self.frame_count)
+        self.frame_count += 1
+        parameters = [self.name(parameter.name, 0, resolved_slot(parameter)) for parameter in node.args]
+        loops, nonlocals = self.loops, self.nonlocals
+        self.loops, self.nonlocals = [], set()
+        body_lines, value = self.nested(lambda: self.expression(node.body))
+        function_nonlocals = self.nonlocals
+        self.loops, self.nonlocals = loops, nonlocals
+        self.frames.pop()
+        self.emit(f'def {name}({", ".join(parameters)}):')
+        if function_nonlocals:
+            self.emit(f'nonlocal {", ".join(sorted(function_nonlocals))}', 1)
+        self.lines += body_lines
+        self.emit(f'return {value}', 1)
+
+
+def transpile(node: ast.Expression) -> str:
+    """Translates a program into Python source code that defines it as the function '__program__'.
+
+    Variables become local variables of Python functions, named after their frame and
+    slot, so blocks need no scopes of their own. Loops become Python loops and functions
+    become nested Python functions.
+    """
+    resolve(node)
+    generator = _Generator()
+    value = generator.expression(node)
+    generator.emit(f'return {value}')
+    return '\n'.join([f'def {program_function}():'] + generator.lines) + '\n'
+
+
+def compile_python(python_source: str, file_name: str = '<pyexec>') -> CodeType:
+    return compile(python_source, file_name, 'exec')
+
+
+def compile_source(source_code: str) -> CodeType:
+    """Parses, type checks and transpiles a program into a Python code object.
+
+    Code objects are cached by the hash of the source code, so a program that is run
+    again is not compiled again.
+    """
+    digest = hashlib.sha256(source_code.encode()).hexdigest()
+    code = _code_cache.get(digest)
+    if code is not None:
+        _code_cache.move_to_end(digest)
+        return code
+    node = parse(tokenize(source_code))
+    typecheck(node)
+    code = compile_python(transpile(node), f'<pyexec {digest[:12]}>')
+    _code_cache[digest] = code
+    if len(_code_cache) > code_cache_size:
+        _code_cache.popitem(last=False)
+    return code
+
+
+def run(code: CodeType) -> Value:
+    """Runs a program compiled by 'compile_source' or 'compile_python' and returns its value."""
+    namespace = dict(runtime)
+    exec(code, namespace)
+    return namespace[program_function]()
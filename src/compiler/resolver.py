@@ -0,0 +1,162 @@
+from dataclasses import dataclass, field
+from compiler import ast
+
+library_functions = ['print_int', 'print_bool', 'read_int']
+
+
+@dataclass
+class _Frame:
+    """The slots of one function call (or of the top level). Slot 0 refers to the frame the function was defined in."""
+    size: int = 1
+
+    def new_slot(self) -> int:
+        self.size += 1
+        return self.size - 1
+
+
+@dataclass
+class _Scope:
+    """The names declared in one block, mapped to slots of the enclosing function's frame."""
+    frame: _Frame
+    parent: '_Scope | None'
+    names: dict[str, int] = field(default_factory=dict)
+
+
+def resolve(root: ast.Expression) -> int:
+    """Resolves every name in the program to a frame slot, in a single pass.
+
+    Fills in 'scope_depth' and 'slot' of identifiers and function calls, 'slot' of
+    variable declarations and parameters, and 'slot' and 'frame_size' of function
+    definitions. Each block is a scope, but all blocks of a function share its frame.
+    Calls to library functions keep 'slot' as None.
+
+    Returns the number of slots in the top-level frame. Raises an exception listing
+    all undefined and duplicate names.
+    """
+    errors: list[str] = []
+    top_level = _Frame()
+    # Function definitions that were already declared at the start of their block.
+    hoisted: set[int] = set()
+
+    def where(node: ast.Identifier | ast.VariableDeclaration | ast.Function) -> str:
+        return f'{node.location} : ' if node.location is not None else ''
+
+    def lookup(name: str, scope: _Scope) -> tuple[int, int] | None:
+        depth = 0
+        current: _Scope | None = scope
+        while current is not None:
+            if name in current.names:
+                return depth, current.names[name]
+            if current.parent is not None and current.parent.frame is not current.frame:
+                depth += 1
+            current = current.parent
+        return None
+
+    def declare(node: ast.VariableDeclaration | ast.Identifier | ast.Function, scope: _Scope) -> int:
+        if node.name in scope.names:
+            errors.append(f'{where(node)}The variable {node.name} has already been declared')
+            return scope.names[node.name]
+        slot = scope.frame.new_slot()
+        scope.names[node.name] = slot
+        return slot
+
+    def visit(node: ast.Expression | None, scope: _Scope) -> None:
+        match node:
+            case None:
+                pass
+
+            case ast.Identifier():
+                resolved = lookup(node.name, scope)
+                if resolved is None:
+                    errors.append(f'{where(node)}{node.name} is not defined')
+                else:
+                    node.scope_depth, node.slot = resolved
+
+            case ast.VariableDeclaration():
+                # The initializer cannot see the variable it initializes.
+                visit(node.assignment, scope)
+                node.slot = declare(node, scope)
+
+            case ast.Block():
+                block_scope = _Scope(scope.frame, scope)
+                # Functions can be called before their definition within the same block.
+                for expression in node.expressions:
+                    if isinstance(expression, ast.Function) and expression.body is not None:
+                        expression.scope_depth, expression.slot = 0, declare(expression, block_scope)
+                        hoisted.add(id(expression))
+                for expression in node.expressions:
+                    visit(expression, block_scope)
+
+            case ast.Function():
+                if node.body is not None:
+                    if id(node) not in hoisted:
+                        node.scope_depth, node.slot = 0, declare(node, scope)
+                    function_scope = _Scope(_Frame(), scope)
+                    for parameter in node.args:
+                        if isinstance(parameter, ast.VariableDeclaration | ast.Identifier):
+                            parameter.slot = declare(parameter, function_scope)
+                            if isinstance(parameter, ast.Identifier):
+                                parameter.scope_depth = 0
+                        else:
+                            errors.append(f'{where(node)}Expected a parameter name in the definition of {node.name}')
+                    visit(node.body, function_scope)
+                    node.frame_size = function_scope.frame.size
+                else:
+                    for arg in node.args:
+                        visit(arg, scope)
+                    resolved = lookup(node.name, scope)
+                    if resolved is not None:
+                        node.scope_depth, node.slot = resolved
+                    elif node.name not in library_functions:
+                        errors.append(f'{where(node)}{node.name} is not defined')
+
+            case ast.BinaryOp():
+                visit(node.left, scope)
+                visit(node.right, scope)
+
+            case ast.UnaryOp():
+                visit(node.right, scope)
+
+            case ast.IfExpression():
+                visit(node.condition, scope)
+                visit(node.then_branch, scope)
+                visit(node.else_branch, scope)
+
+            case ast.WhileExpression():
+                visit(node.condition, scope)
+                visit(node.do, scope)
+
+            case ast.Return():
+                visit(node.value, scope)
+
+            case ast.AddressOf() | ast.Dereference():
+                visit(node.operand, scope)
+
+            case _:
+                pass
+
+    visit(root, _Scope(top_level, None))
+    if errors:
+        raise Exception('\n'.join(errors))
+    return top_level.size
+
+
+# The interpreters run on resolved trees only. These return the fields that
+# 'resolve' filled in, and fail if it has not been run.
+
+def resolved_slot(node: ast.Identifier | ast.VariableDeclaration | ast.Function) -> int:
+    if node.slot is None:
+        raise Exception(f'{node.name} has not been resolved')
+    return node.slot
+
+
+def resolved_depth(node: ast.Identifier | ast.Function) -> int:
+    if node.scope_depth is None:
+        raise Exception(f'{node.name} has not been resolved')
+    return node.scope_depth
+
+
+def resolved_frame_size(node: ast.Function) -> int:
+    if node.frame_size is None:
+        raise Exception(f'{node.name} has not been resolved')
+    return node.frame_size
@@ -0,0 +1,198 @@
+from compiler import ir
+from compiler.cfg import CFG, BasicBlock
+from compiler.ir_vm import binary_operators, unary_operators
+from compiler.ssa import Phi, from_ssa, phi_count, remove_edge, to_ssa
+
+# Operators whose result is a Bool.
+_boolean_operators = {'==', '!=', '<', '<=', '>', '>=', 'unary_not'}
+_pure_operators = set(binary_operators) | set(unary_operators)
+
+# The value of a variable is a constant (an int or a bool), or None if it can take
+# more than one value. Variables that have no value yet are not in the dict.
+Values = dict[ir.IRVar, int | None]
+
+
+def fold(name: str, args: list[int]) -> int | None:
+    """Returns the result of an operator on constants, or None if it is not an
+    operator or traps at run time."""
+    try:
+        if name in binary_operators and len(args) == 2:
+            result = binary_operators[name](int(args[0]), int(args[1]))
+        elif name in unary_operators and len(args) == 1:
+            result = unary_operators[name](int(args[0]))
+        else:
+            return None
+    except Exception:
+        # Division by zero is left for the program to report.
+        return None
+    return bool(result) if name in _boolean_operators else result
+
+
+def load_constant(value: int, dest: ir.IRVar) -> ir.Instruction:
+    if isinstance(value, bool):
+        return ir.LoadBoolConst(value, dest)
+    return ir.LoadIntConst(value, dest)
+
+
+def successor(block: BasicBlock, label: ir.Label) -> BasicBlock:
+    for succ in block.succs:
+        if succ.label == label:
+            return succ
+    raise Exception(f'{block!r} has no successor {label}')
+
+
+def _same(a: int | None, b: int | None) -> bool:
+    # True == 1 in Python, but a Bool constant must stay a Bool.
+    return a == b and type(a) is type(b)
+
+
+def propagate_constants(cfg: CFG) -> Values:
+    """Sparse conditional constant propagation (Wegman and Zadeck) over a CFG in SSA form.
+
+    Blocks are only evaluated once an edge into them is found to be executable,
+    and a branch on a constant only makes one of its edges executable, so values
+    flowing in from branches that are never taken do not count. Returns the value
+    of each variable; the variables of blocks that are never executed have none.
+    Removes the edges that are never taken and the blocks that are never executed,
+    and replaces instructions whose result is a constant by loads of the constant.
+    """
+    values: Values = {}
+    uses: dict[ir.IRVar, list[tuple[BasicBlock, int]]] = {}
+    defined: set[ir.IRVar] = set()
+    for block in cfg.blocks:
+        for i, insn in enumerate(block.instructions):
+            for var in insn.uses():
+                uses.setdefault(var, []).append((block, i))
+            defined.update(insn.defs())
+    # Variables read before they are written hold whatever the program starts with.
+    for var in uses:
+        if var not in defined:
+            values[var] = None
+
+    executable_blocks = [False] * len(cfg.blocks)
+    executable_edges: set[tuple[int, int]] = set()
+    flow_worklist: list[tuple[BasicBlock | None, BasicBlock]] = [(None, entry) for entry in cfg.entries]
+    ssa_worklist: list[ir.IRVar] = []
+
+    def lower(var: ir.IRVar, value: int | None) -> None:
+        if var in values:
+            old = values[var]
+            if old is None or _same(old, value):
+                return
+            value = None
+        values[var] = value
+        ssa_worklist.append(var)
+
+    def take(block: BasicBlock, succ: BasicBlock) -> None:
+        if (block.index, succ.index) not in executable_edges:
+            flow_worklist.append((block, succ))
+
+    def evaluate(block: BasicBlock, i: int) -> None:
+        insn = block.instructions[i]
+        match insn:
+            case Phi():
+                value: int | None = None
+                known = False
+                for pred, arg in zip(block.preds, insn.args):
+                    if (pred.index, block.index) not in executable_edges or arg not in values:
+                        continue
+                    if not known:
+                        value = values[arg]
+                        known = True
+                    elif not _same(value, values[arg]):
+                        value = None
+                if known:
+                    lower(insn.dest, value)
+            case ir.LoadIntConst():
+                lower(insn.dest, insn.value)
+            case ir.LoadBoolConst():
+                lower(insn.dest, bool(insn.value))
+            case ir.Copy() if insn.dest is not None:
+                if insn.source is None:
+                    lower(insn.dest, None)
+                elif insn.source in values:
+                    lower(insn.dest, values[insn.source])
+            case ir.Call():
+                if insn.fun.name not in _pure_operators:
+                    lower(insn.dest, None)
+                elif all(arg in values for arg in insn.args):
+                    args = [values[arg] for arg in insn.args]
+                    constants = [arg for arg in args if arg is not None]
+                    lower(insn.dest, fold(insn.fun.name, constants) if len(constants) == len(args) else None)
+            case ir.CondJump():
+                if insn.condition in values:
+                    condition = values[insn.condition]
+                    if condition is None or condition:
+                        take(block, successor(block, insn.then_label))
+                    if condition is None or not condition:
+                        take(block, successor(block, insn.else_label))
+            case ir.Jump():
+                take(block, block.succs[0])
+
+    while flow_worklist or ssa_worklist:
+        while flow_worklist:
+            pred, block = flow_worklist.pop()
+            if pred is not None:
+                if (pred.index, block.index) in executable_edges:
+                    continue
+                executable_edges.add((pred.index, block.index))
+            if executable_blocks[block.index]:
+                for i in range(phi_count(block)):
+                    evaluate(block, i)
+                continue
+            executable_blocks[block.index] = True
+            for i in range(len(block.instructions)):
+                evaluate(block, i)
+            if block.terminator() is None and block.succs:
+                take(block, block.succs[0])
+        while ssa_worklist:
+            var = ssa_worklist.pop()
+            for block, i in uses.get(var, []):
+                if executable_blocks[block.index]:
+                    evaluate(block, i)
+
+    for block in cfg.blocks:
+        for succ in list(block.succs):
+            if (block.index, succ.index) not in executable_edges:
+                remove_edge(cfg, block, succ)
+        terminator = block.terminator()
+        if isinstance(terminator, ir.CondJump) and len(block.succs) == 1 and executable_blocks[block.index]:
+            target = block.succs[0].label
+            assert target is not None
+            block.instructions[-1] = ir.Jump(target)
+    cfg.blocks = [block for block in cfg.blocks if executable_blocks[block.index]]
+    cfg.renumber()
+
+    for block in cfg.blocks:
+        phis = phi_count(block)
+        kept_phis: list[ir.Instruction] = []
+        loads: list[ir.Instruction] = []
+        rest: list[ir.Instruction] = []
+        for i, insn in enumerate(block.instructions):
+            folded = _folded(insn, values)
+            if i >= phis:
+                rest.append(folded if folded is not None else insn)
+            elif folded is not None:
+                # Phis have to stay at the start of the block.
+                loads.append(folded)
+            else:
+                kept_phis.append(insn)
+        block.instructions = kept_phis + loads + rest
+    return values
+
+
+def _folded(insn: ir.Instruction, values: Values) -> ir.Instruction | None:
+    """Returns a load of the constant that an instruction without side effects writes, if it writes one."""
+    if isinstance(insn, (Phi, ir.Copy)) or isinstance(insn, ir.Call) and insn.fun.name in _pure_operators:
+        for dest in insn.defs():
+            value = values.get(dest)
+            if value is not None:
+                return load_constant(value, dest)
+    return None
+
+
+def sccp(cfg: CFG) -> None:
+    """Folds constants and removes the branches that are never taken, by constant propagation in SSA form."""
+    origin = to_ssa(cfg)
+    propagate_constants(cfg)
+    from_ssa(cfg, origin)
@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from typing import Callable
+from compiler import ir
+from compiler.cfg import CFG, BasicBlock, Dominators, dominators, remove_unreachable_blocks
+from compiler.dataflow import liveness
+
+
+@dataclass(frozen=True, slots=True)
+class Phi(ir.Instruction):
+    """Writes 'args[i]' to 'dest' when its block is entered from the block's i-th predecessor.
+
+    Phis only exist in SSA form, at the start of a block.
+    """
+    dest: ir.IRVar
+    args: tuple[ir.IRVar, ...]
+
+    def __repr__(self) -> str:
+        return f'Phi(dest={self.dest!r}, args={list(self.args)!r})'
+
+    def uses(self) -> tuple[ir.IRVar, ...]:
+        return self.args
+
+    def defs(self) -> tuple[ir.IRVar, ...]:
+        return (self.dest,)
+
+    def map_vars(self, use: Callable[[ir.IRVar], ir.IRVar], define: Callable[[ir.IRVar], ir.IRVar]) -> 'Phi':
+        args = tuple(use(arg) for arg in self.args)
+        return Phi(define(self.dest), args)
+
+
+def phi_count(block: BasicBlock) -> int:
+    count = 0
+    for insn in block.instructions:
+        if not isinstance(insn, Phi):
+            break
+        count += 1
+    return count
+
+
+def remove_edge(cfg: CFG, source: BasicBlock, target: BasicBlock) -> None:
+    """Removes an edge, along with the arguments of the phis of 'target' that come through it."""
+    j = target.preds.index(source)
+    cfg.remove_edge(source, target)
+    for i in range(phi_count(target)):
+        phi = target.instructions[i]
+        assert isinstance(phi, Phi)
+        target.instructions[i] = Phi(phi.dest, phi.args[:j] + phi.args[j + 1:])
+
+
+def dominance_frontiers(cfg: CFG, doms: Dominators) -> list[list[BasicBlock]]:
+    """Returns, for each block, the blocks where its dominance ends: the first blocks on each path that it does not strictly dominate."""
+    frontiers: list[list[BasicBlock]] = [[] for _ in cfg.blocks]
+    for block in cfg.blocks:
+        if len(block.preds) < 2 or not doms.reachable(block):
+            continue
+        idom = doms.idom[block.index]
+        for pred in block.preds:
+            runner: BasicBlock | None = pred
+            while runner is not None and runner is not idom and doms.reachable(runner):
+                if not frontiers[runner.index] or frontiers[runner.index][-1] is not block:
+                    frontiers[runner.index].append(block)
+                runner = doms.idom[runner.index]
+    return frontiers
+
+
+def to_ssa(cfg: CFG) -> dict[ir.IRVar, ir.IRVar]:
+    """Puts a CFG into pruned SSA form in place, so that every variable is written by one instruction.
+
+    Blocks that cannot be reached are removed first. Phis are placed at the
+    dominance frontiers of the writes of a variable, where the variable is live.
+    Each write gets a new version of its variable, named after it. A read that no
+    write reaches keeps the original variable, which stands for the value it has
+    at the start of the program. Returns the original variable of each version.
+    """
+    remove_unreachable_blocks(cfg)
+    doms = dominators(cfg)
+    frontiers = dominance_frontiers(cfg, doms)
+    live = liveness(cfg)
+    bits = live.index.bits
+    exposed_count = live.index.exposed_count
+
+    # Only variables that some block reads before writing them can need phis.
+    def_blocks: dict[ir.IRVar, list[BasicBlock]] = {}
+    for block in cfg.blocks:
+        for insn in block.instructions:
+            for var in insn.defs():
+                if bits[var] < exposed_count:
+                    blocks = def_blocks.setdefault(var, [])
+                    if not blocks or blocks[-1] is not block:
+                        blocks.append(block)
+
+    phi_vars: list[list[ir.IRVar]] = [[] for _ in cfg.blocks]
+    for var, blocks in def_blocks.items():
+        bit = 1 << bits[var]
+        has_phi: set[BasicBlock] = set()
+        queued = set(blocks)
+        worklist = list(blocks)
+        while worklist:
+            block = worklist.pop()
+            for frontier in frontiers[block.index]:
+                if frontier not in has_phi and live.live_in[frontier.index] & bit:
+                    has_phi.add(frontier)
+                    phi_vars[frontier.index].append(var)
+                    if frontier not in queued:
+                        queued.add(frontier)
+                        worklist.append(frontier)
+    for block in cfg.blocks:
+        if phi_vars[block.index]:
+            block.instructions[:0] = [Phi(var, (var,) * len(block.preds)) for var in phi_vars[block.index]]
+
+    origin: dict[ir.IRVar, ir.IRVar] = {}
+    versions: dict[ir.IRVar, list[ir.IRVar]] = {}
+    counts: dict[ir.IRVar, int] = {}
+    pushed: list[ir.IRVar] = []
+
+    def current(var: ir.IRVar) -> ir.IRVar:
+        stack = versions.get(var)
+        return stack[-1] if stack else var
+
+    def new_version(var: ir.IRVar) -> ir.IRVar:
+        count = counts.get(var, 0) + 1
+        counts[var] = count
+        version = ir.IRVar(f'{var.name}.{count}')
+        origin[version] = var
+        versions.setdefault(var, []).append(version)
+        pushed.append(var)
+        return version
+
+    # Blocks are renamed in a preorder walk of the dominator tree. Each entry of the
+    # stack is a block to rename, or None to undo the versions pushed by the block
+    # whose subtree was just finished.
+    marks: list[int] = []
+    stack: list[BasicBlock | None] = list(reversed(doms.roots))
+    while stack:
+        top = stack.pop()
+        if top is None:
+            mark = marks.pop()
+            for var in pushed[mark:]:
+                versions[var].pop()
+            del pushed[mark:]
+            continue
+        block = top
+        marks.append(len(pushed))
+        block.instructions = [insn.map_vars(current, new_version) if not isinstance(insn, Phi)
+                              else Phi(new_version(insn.dest), insn.args) for insn in block.instructions]
+        for succ in block.succs:
+            j = succ.preds.index(block)
+            for i in range(phi_count(succ)):
+                phi = succ.instructions[i]
+                assert isinstance(phi, Phi)
+                var = origin.get(phi.dest, phi.dest)
+                succ.instructions[i] = Phi(phi.dest, phi.args[:j] + (current(var),) + phi.args[j + 1:])
+        stack.append(None)
+        stack.extend(reversed(doms.children[block.index]))
+    return origin
+
+
+def from_ssa(cfg: CFG, origin: dict[ir.IRVar, ir.IRVar]) -> None:
+    """Leaves SSA form by renaming every version back to its original variable and removing the phis.
+
+    This is only correct as long as no two versions of a variable are live at the
+    same time. 'to_ssa' produces such a form, and it is kept by rewrites that replace
+    an instruction by another one writing the same variable and by the removal of
+    edges and blocks. Passes that move or forward copies across versions break it.
+    """
+    def original(var: ir.IRVar) -> ir.IRVar:
+        return origin.get(var, var)
+
+    for block in cfg.blocks:
+        block.instructions = [insn.map_vars(original, original)
+                              for insn in block.instructions[phi_count(block):]]
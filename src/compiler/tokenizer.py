@@ -1,6 +1,11 @@
+from array import array
+from bisect import bisect_right
+import codecs
+from collections import deque
 from dataclasses import dataclass
+import mmap
 import re
-from typing import List, Pattern, Literal, Tuple
+from typing import IO, Callable, Deque, Iterable, Iterator, List, Pattern, Literal, Tuple, cast
 
 TokenType = Literal["int_literal", "identifier", "operator", "parenthesis", "punctuation", "end"]
 
@@ -23,43 +28,393 @@ class Token:
     location: Location = None
 
 
+_token_patterns: List[Tuple[str, str]] = [
+    ('single_line_comment', r'\/\/[^\n]*|#.*'),
+    ('multi_line_comment', r'\/\*[\s\S]*?\*\/'),
+    ('keyword', r'\b(?:if|then|else|break|continue)\b'),
+    ('identifier', r'[a-zA-Z_][a-zA-Z0-9_]*'),
+    ('int_literal', r'\b\d+\b'),
+    ('operator', r'==|!=|<=|>=|\+=|\-=|[+\-*/=><%&]'),
+    ('parenthesis', r'[(){}]'),
+    ('punctuation', r'[;,:]'),
+    ('line', r'\n'),
+    ('whitespace', r'\s+'),
+]
+
+# All token patterns combined into one regex. Alternatives are tried in the
+# order above, so the first pattern that matches at a position wins, and
+# 'match.lastgroup' tells which one it was. The final 'mismatch' alternative
+# catches any character that no token pattern accepts.
+_token_regex: Pattern = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in _token_patterns) + r'|(?P<mismatch>[\s\S])')
+
+_skipped_types = frozenset(['whitespace', 'single_line_comment', 'multi_line_comment', 'line'])
+
+
+class _Scanner:
+    """Matches the tokens of a string, skipping whitespace and comments and counting lines.
+
+    'line' and 'pos' hold the line and position of the next token, so that
+    scanning can continue in another string, such as the next chunk of a file.
+    """
+
+    def __init__(self, line: int = 1, pos: int = 1) -> None:
+        self.line = line
+        self.pos = pos
+        self.resume = 0
+
+    def scan(self, text: str, position: int = 0, partial: bool = False) -> Iterator[Tuple[str, int, int, int, int]]:
+        """Yields the type, start, end, line and position of each token in 'text' from 'position' on.
+
+        If 'partial', more input follows 'text'. Scanning then stops at the first
+        match that more input could change, and 'resume' is set to its start.
+        """
+        line = self.line
+        pos = self.pos
+        end_of_text = self.resume = len(text)
+        try:
+            for match in _token_regex.finditer(text, position):
+                token_type = match.lastgroup
+                assert token_type is not None
+                start, end = match.span()
+                # A match touching the end of the text may still grow (e.g. 'ab' -> 'abc',
+                # '=' -> '=='), and a '/' could be the start of a multi-line comment whose
+                # end has not been read yet.
+                if partial and (end == end_of_text
+                                or (token_type == 'mismatch' and start + 10 > end_of_text)
+                                or (token_type == 'operator' and text.startswith('/*', start))):
+                    self.resume = start
+                    return
+                if token_type in _skipped_types:
+                    if token_type == 'line':
+                        line += 1
+                        pos = 1
+                    continue
+                if token_type == 'mismatch':
+                    raise Exception(f"Tokenization failed near '{text[start:start+10]}'...")
+                yield token_type, start, end, line, pos
+                pos += end - start
+        finally:
+            self.line = line
+            self.pos = pos
+
+
+# Default number of characters (or bytes) read at a time by 'tokenize_iter'.
+default_chunk_size = 64 * 1024
+
+
 def tokenize(source_code: str) -> List[Token]:
-    token_patterns = [
-        ('single_line_comment', r'\/\/[^\n]*|#.*'),
-        ('multi_line_comment', r'\/\*[\s\S]*?\*\/'),
-        ('keyword', r'\b(if|then|else|break|continue)\b'), 
-        ('identifier', r'[a-zA-Z_][a-zA-Z0-9_]*'),
-        ('int_literal', r'\b\d+\b'),
-        ('operator', r'==|!=|<=|>=|\+=|\-=|[+\-*/=><%&]'),
-        ('parenthesis', r'[(){}]'),
-        ('punctuation', r'[;,:]'),
-        ('line', r'\n'),
-        ('whitespace', r'\s+'),
-
-    ]
-
-    compiled_patterns: List[Tuple[str, Pattern]] = [(name, re.compile(pattern)) for name, pattern in token_patterns]
-
-    result: List[Token] = []
+    return list(tokenize_iter(source_code))
+
+
+def tokenize_iter(source: str | IO[str] | IO[bytes] | mmap.mmap, chunk_size: int = default_chunk_size) -> Iterator[Token]:
+    """Lazily yields the tokens of 'source'.
+
+    'source' is either the source code itself, or a text file, binary file
+    or mmap that is read in chunks of 'chunk_size'. Binary input is decoded
+    as UTF-8. Tokens and comments that cross chunk boundaries are held back
+    until enough input has been read to know where they end.
+    """
+    if isinstance(source, str):
+        chunks: Iterator[str] = iter(())
+        buffer = source
+        at_eof = True
+    else:
+        chunks = _read_chunks(source, chunk_size)
+        buffer = ''
+        at_eof = False
     position = 0
-    line_counter = 1
-    line_pos_counter = 1
-
-    while position < len(source_code):
-        for token_type, regex in compiled_patterns:
-            match = regex.match(source_code, position)
-            if match:
-                if token_type == 'line':
-                    line_counter += 1
-                    line_pos_counter = 1
-                    
-                if token_type not in ['whitespace', 'single_line_comment', 'multi_line_comment','line']:
-                    result.append(Token(type=token_type, text=match.group(), location=Location(line=line_counter, pos=line_pos_counter)))
-                    line_pos_counter += match.end() - match.start()
-                position += match.end() - match.start()
-                break
+    scanner = _Scanner()
+
+    while True:
+        if not at_eof:
+            chunk = next(chunks, '')
+            if chunk:
+                buffer += chunk
+            else:
+                at_eof = True
+        for token_type, start, end, line, pos in scanner.scan(buffer, position, partial=not at_eof):
+            yield Token(cast(TokenType, token_type), buffer[start:end], Location(line, pos))
+
+        if at_eof:
+            return
+        # Keep one character before the resume point so that '\b' sees what precedes it.
+        resume = scanner.resume
+        context = max(resume - 1, 0)
+        buffer = buffer[context:]
+        position = resume - context
+
+
+def _read_chunks(source: IO[str] | IO[bytes] | mmap.mmap, chunk_size: int) -> Iterator[str]:
+    decoder = None
+    while True:
+        chunk = source.read(chunk_size)
+        if isinstance(chunk, bytes):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder('utf-8')()
+            text = decoder.decode(chunk, final=not chunk)
         else:
-            raise Exception(f"Tokenization failed near '{source_code[position:position+10]}'...")
-    
+            text = chunk
+        if text:
+            yield text
+        if not chunk:
+            return
+
+
+class TokenStream:
+    """Lookahead-buffered stream of tokens, consumed by the parser.
+
+    Tokens are pulled from the underlying iterable only when they are looked at,
+    so the whole token list never needs to exist at once. Past the last token,
+    the stream returns an 'end' token located at the last real token, or at the
+    start of the input if there are no tokens.
+    """
+
+    def __init__(self, tokens: Iterable[Token]) -> None:
+        self._tokens = iter(tokens)
+        self._lookahead: Deque[Token] = deque()
+        self.consumed = 0
+        self.current = next(self._tokens, None) or Token(type="end", text="", location=Location(1, 1))
+
+    def peek(self, offset: int = 0) -> Token:
+        """Returns the token 'offset' positions after the current one without consuming anything."""
+        if offset == 0:
+            return self.current
+        while len(self._lookahead) < offset:
+            last = self._lookahead[-1] if self._lookahead else self.current
+            token = next(self._tokens, None)
+            if token is None:
+                return Token(type="end", text="", location=last.location)
+            self._lookahead.append(token)
+        return self._lookahead[offset - 1]
+
+    def advance(self) -> Token:
+        """Consumes and returns the current token."""
+        token = self.current
+        if token.type == "end":
+            return token
+        self.consumed += 1
+        if self._lookahead:
+            self.current = self._lookahead.popleft()
+        else:
+            self.current = next(self._tokens, None) or Token(type="end", text="", location=token.location)
+        return token
+
+    def at_end(self) -> bool:
+        return self.current.type == "end"
+
+
+class TokenBuffer:
+    """Compact, column-oriented token list over the original source code.
+
+    Instead of one 'Token' and one 'Location' object per token, the token
+    types, start offsets, lengths, lines and positions are kept in parallel
+    'array.array' columns. 'Token' objects are created only when indexing or
+    iterating, so a buffer can be passed anywhere a token list is expected,
+    including 'parse'.
+    """
+    token_types: Tuple[str, ...] = ('keyword', 'identifier', 'int_literal', 'operator', 'parenthesis', 'punctuation')
+
+    # Number of pending shifts after which 'retokenize' folds them into the columns.
+    max_pending_shifts = 256
+
+    def __init__(self, source_code: str) -> None:
+        self.source_code = source_code
+        self.types = array('B')
+        self.lengths = array('i')
+        self.positions = array('i')
+        self._starts = array('q')
+        self._lines = array('i')
+        # Shifts left behind by 'retokenize', as (first token index, offset shift, line shift)
+        # sorted by index. Each one applies to '_starts' and '_lines' up to the next one.
+        # They are folded into the columns when the columns are read as a whole.
+        self._shifts: List[Tuple[int, int, int]] = []
+
+    @property
+    def starts(self) -> 'array[int]':
+        self._apply_shifts()
+        return self._starts
+
+    @property
+    def lines(self) -> 'array[int]':
+        self._apply_shifts()
+        return self._lines
+
+    def _apply_shifts(self) -> None:
+        ends = [index for index, _, _ in self._shifts[1:]] + [len(self.types)]
+        for (index, offset_shift, line_shift), end in zip(self._shifts, ends):
+            if offset_shift:
+                self._starts[index:end] = array('q', map(offset_shift.__add__, self._starts[index:end]))
+            if line_shift:
+                self._lines[index:end] = array('i', map(line_shift.__add__, self._lines[index:end]))
+        self._shifts = []
+
+    def _shift_at(self, index: int) -> Tuple[int, int, int]:
+        position = bisect_right(self._shifts, index, key=lambda shift: shift[0])
+        return self._shifts[position - 1] if position > 0 else (0, 0, 0)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        start = self.start_at(index)
+        return Token(
+            cast(TokenType, self.token_types[self.types[index]]),
+            self.source_code[start:start + self.lengths[index]],
+            Location(self.line_at(index), self.positions[index])
+        )
+
+    def __iter__(self) -> Iterator[Token]:
+        source_code = self.source_code
+        token_types = self.token_types
+        for token_type, start, length, line, pos in zip(self.types, self.starts, self.lengths, self.lines, self.positions):
+            yield Token(cast(TokenType, token_types[token_type]), source_code[start:start + length], Location(line, pos))
+
+    def type_at(self, index: int) -> str:
+        return self.token_types[self.types[index]]
+
+    def start_at(self, index: int) -> int:
+        if self._shifts:
+            return self._starts[index] + self._shift_at(index)[1]
+        return self._starts[index]
+
+    def line_at(self, index: int) -> int:
+        if self._shifts:
+            return self._lines[index] + self._shift_at(index)[2]
+        return self._lines[index]
+
+    def text_at(self, index: int) -> str:
+        start = self.start_at(index)
+        return self.source_code[start:start + self.lengths[index]]
+
+    def nbytes(self) -> int:
+        """Returns the number of bytes used by the columns, excluding the source code."""
+        return sum(column.itemsize * len(column) for column in (self.types, self._starts, self.lengths, self._lines, self.positions))
+
+
+_token_type_codes = {token_type: code for code, token_type in enumerate(TokenBuffer.token_types)}
+
+
+def tokenize_compact(source_code: str) -> TokenBuffer:
+    """Like 'tokenize', but returns the tokens as a 'TokenBuffer'."""
+    buffer = TokenBuffer(source_code)
+    append_type = buffer.types.append
+    append_start = buffer._starts.append
+    append_length = buffer.lengths.append
+    append_line = buffer._lines.append
+    append_pos = buffer.positions.append
+
+    for token_type, start, end, line, pos in _Scanner().scan(source_code):
+        append_type(_token_type_codes[token_type])
+        append_start(start)
+        append_length(end - start)
+        append_line(line)
+        append_pos(pos)
+
+    return buffer
+
+
+def retokenize(buffer: TokenBuffer, offset: int, deleted: int, inserted: str) -> TokenBuffer:
+    """Returns the tokens of 'buffer's source code after an edit.
+
+    The edit replaces 'deleted' characters at 'offset' with 'inserted'. Only
+    the damaged region is lexed again: lexing restarts at the end of the last
+    token that the edit cannot affect and stops as soon as it produces a token
+    identical to an old one at the same (shifted) offset. The remaining old
+    tokens are copied over unchanged, and their new offsets and lines are
+    recorded as pending shifts instead of being rewritten one by one.
+    """
+    old_source_code = buffer.source_code
+    if offset < 0 or deleted < 0 or offset + deleted > len(old_source_code):
+        raise ValueError(f'Edit at {offset} deleting {deleted} characters is out of range')
+    source_code = old_source_code[:offset] + inserted + old_source_code[offset + deleted:]
+    delta = len(inserted) - deleted
+    inserted_end = offset + len(inserted)
+    old_count = len(buffer)
+    start_at = buffer.start_at
+
+    # Keep the tokens that end before the edit.
+    kept = _bisect_tokens(start_at, offset, 0, old_count)
+    while kept > 0 and start_at(kept - 1) + buffer.lengths[kept - 1] >= offset:
+        kept -= 1
+    # A '/' token followed by '*' is a multi-line comment that was never closed.
+    # The edit may close it, so lexing must restart from the first such token.
+    # They can only appear after the last '*/' of the old source code.
+    opener = old_source_code.find('/*', max(old_source_code.rfind('*/') - 1, 0), offset)
+    while opener != -1:
+        index = _bisect_tokens(start_at, opener, 0, kept)
+        if index < kept and start_at(index) == opener:
+            kept = index
+            break
+        opener = old_source_code.find('/*', opener + 1, offset)
+
+    result = TokenBuffer(source_code)
+    types, starts, lengths = buffer.types[:kept], buffer._starts[:kept], buffer.lengths[:kept]
+    lines, positions = buffer._lines[:kept], buffer.positions[:kept]
+    shifts = [shift for shift in buffer._shifts if shift[0] < kept]
+    if kept > 0:
+        position = start_at(kept - 1) + buffer.lengths[kept - 1]
+        scanner = _Scanner(buffer.line_at(kept - 1), buffer.positions[kept - 1] + buffer.lengths[kept - 1])
+    else:
+        position = 0
+        scanner = _Scanner()
+    if shifts:
+        shifts.append((kept, 0, 0))
+
+    old_index = _bisect_tokens(start_at, offset + deleted, kept, old_count)
+    resync = -1
+    for token_type, start, end, line_counter, line_pos_counter in scanner.scan(source_code, position):
+        type_code = _token_type_codes[token_type]
+        if start >= inserted_end:
+            # Past the edit, a token equal to the old one at the same place means
+            # that lexing from here on would reproduce the old tokens.
+            old_start = start - delta
+            while old_index < old_count and start_at(old_index) < old_start:
+                old_index += 1
+            if (old_index < old_count and start_at(old_index) == old_start
+                    and buffer.lengths[old_index] == end - start and buffer.types[old_index] == type_code):
+                resync = old_index
+                break
+        types.append(type_code)
+        starts.append(start)
+        lengths.append(end - start)
+        lines.append(line_counter)
+        positions.append(line_pos_counter)
+
+    if resync >= 0:
+        old_line = buffer.line_at(resync)
+        line_shift = line_counter - old_line
+        pos_shift = line_pos_counter - buffer.positions[resync]
+        # Only the tokens on the same line as the resynchronization point
+        # have their positions shifted; later lines start again from 1.
+        same_line_end = _bisect_tokens(buffer.line_at, old_line + 1, resync, old_count)
+        tail = len(types)
+        _, offset_shift, old_line_shift = buffer._shift_at(resync)
+        shifts.append((tail, offset_shift + delta, old_line_shift + line_shift))
+        for index, offset_shift, old_line_shift in buffer._shifts:
+            if index > resync:
+                shifts.append((index - resync + tail, offset_shift + delta, old_line_shift + line_shift))
+        types.frombytes(memoryview(buffer.types)[resync:].cast('B'))
+        lengths.frombytes(memoryview(buffer.lengths)[resync:].cast('B'))
+        starts.frombytes(memoryview(buffer._starts)[resync:].cast('B'))
+        lines.frombytes(memoryview(buffer._lines)[resync:].cast('B'))
+        positions.extend(array('i', map(pos_shift.__add__, buffer.positions[resync:same_line_end])))
+        positions.frombytes(memoryview(buffer.positions)[same_line_end:].cast('B'))
+
+    result.types, result._starts, result.lengths = types, starts, lengths
+    result._lines, result.positions = lines, positions
+    result._shifts = [shift for i, shift in enumerate(shifts)
+                      if shift[1:] != (shifts[i - 1][1:] if i > 0 else (0, 0))]
+    if len(result._shifts) > TokenBuffer.max_pending_shifts:
+        result._apply_shifts()
     return result
 
+
+def _bisect_tokens(key: Callable[[int], int], value: int, low: int, high: int) -> int:
+    """Returns the first index in [low, high) whose key is not less than 'value', or 'high'."""
+    while low < high:
+        middle = (low + high) // 2
+        if key(middle) < value:
+            low = middle + 1
+        else:
+            high = middle
+    return low
@@ -0,0 +1,69 @@
+import io
+import pytest
+from compiler.batch_interpreter import interpret_batch
+from compiler.interpreter import interpret
+from compiler.parser1 import parse
+from compiler.tokenizer import tokenize
+
+
+def interpret_lane(source_code: str, inputs: list[int], capsys: pytest.CaptureFixture[str],
+                   monkeypatch: pytest.MonkeyPatch) -> tuple[object, list[str]]:
+    monkeypatch.setattr('sys.stdin', io.StringIO(''.join(f'{value}\n' for value in inputs)))
+    value = interpret(parse(tokenize(source_code)))
+    return value, capsys.readouterr().out.splitlines()
+
+def test_batch_matches_tree_engine(capsys: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch) -> None:
+    programs = [
+        'var n = read_int(); var s = 0; while n > 0 do { s = s + n; n = n - 1; } s',
+        'var n = read_int(); var m = read_int(); if n > m then { print_int(n); n } else { print_bool(n == m); m }',
+        'var x = read_int(); var y = read_int(); if y != 0 then x / y else -x % 7',
+        'var x = read_int(); x > 3 and { print_int(x); true } or x < 1',
+        'var a = read_int(); fun g(k: Int): Int { a = a + k; a } g(1); g(a); a',
+        'fun fib(n: Int): Int { if n < 2 then n else fib(n - 1) + fib(n - 2) } fib(read_int() % 10)',
+    ]
+    inputs = [[x, y] for x in range(-2, 9) for y in range(-2, 4)]
+    for program in programs:
+        result = interpret_batch(parse(tokenize(program)), inputs)
+        for lane, lane_inputs in enumerate(inputs):
+            value, output = interpret_lane(program, lane_inputs, capsys, monkeypatch)
+            assert (result.values[lane].item(), result.outputs[lane]) == (value, output), (program, lane_inputs)
+
+def test_batch_divergent_control_flow(capsys: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch) -> None:
+    programs = [
+        '''fun f(n: Int): Int {
+            var i = 0;
+            while true do {
+                i = i + 1;
+                if i % 3 == 0 then continue;
+                if i > n then { return i * 10; }
+                if i == 7 then break;
+            }
+            i
+        }
+        f(read_int())''',
+        'var i = 0; var x = read_int(); while i < 10 do { i = i + 1; while { if i > x then { break; } false } do 0; } i',
+        'fun f(c: Bool): Int { 1 + (if c then { return 5; } else 2) } f(read_int() > 2) * 1000',
+    ]
+    inputs = [[x] for x in range(-1, 12)]
+    for program in programs:
+        result = interpret_batch(parse(tokenize(program)), inputs)
+        for lane, lane_inputs in enumerate(inputs):
+            value, _ = interpret_lane(program, lane_inputs, capsys, monkeypatch)
+            assert result.values[lane] == value, (program, lane_inputs)
+
+def test_batch_without_value() -> None:
+    result = interpret_batch(parse(tokenize('print_int(read_int() * 2);')), [[1], [2], [3]])
+    assert result.values is None
+    assert result.outputs == [['2'], ['4'], ['6']]
+
+def test_batch_errors() -> None:
+    for program, inputs in [('read_int() / read_int()', [[1, 1], [1, 0]]), ('read_int() + read_int()', [[1], [2]])]:
+        failed = False
+        try:
+            interpret_batch(parse(tokenize(program)), inputs)
+        except Exception:
+            failed = True
+        assert failed
+    # Lanes that take the other branch never divide by zero.
+    result = interpret_batch(parse(tokenize('var y = read_int(); if y == 0 then 0 else 10 / y')), [[0], [5]])
+    assert list(result.values) == [0, 2]
@@ -0,0 +1,65 @@
+from compiler.budget import BudgetExceeded, ExecutionBudget
+from compiler.interpreter import engines, interpret
+from compiler.parser1 import parse
+from compiler.tokenizer import tokenize
+
+
+def exceeded(source_code: str, engine: str, budget: ExecutionBudget) -> BudgetExceeded | None:
+    try:
+        interpret(parse(tokenize(source_code)), engine=engine, budget=budget)
+    except BudgetExceeded as e:
+        return e
+    return None
+
+def test_budget_unlimited_by_default() -> None:
+    program = 'var i = 0; while i < 10000 do i = i + 1; i'
+    for engine in engines:
+        assert interpret(parse(tokenize(program)), engine=engine) == 10000
+        assert interpret(parse(tokenize(program)), engine=engine, budget=ExecutionBudget()) == 10000
+
+def test_budget_max_steps() -> None:
+    program = 'var i = 0; while i < 100 do i = i + 1; i'
+    for engine in engines:
+        assert interpret(parse(tokenize(program)), engine=engine, budget=ExecutionBudget(max_steps=100)) == 100
+        error = exceeded(program, engine, ExecutionBudget(max_steps=99))
+        assert error is not None and error.limit == 'steps'
+        assert str(error) == 'Location: Line 1, at position 8 : Execution budget exceeded: more than 99 steps'
+
+def test_budget_counts_calls() -> None:
+    program = 'fun f(n: Int): Int { if n == 0 then 0 else f(n - 1) } f(10)'
+    for engine in engines:
+        assert interpret(parse(tokenize(program)), engine=engine, budget=ExecutionBudget(max_steps=11)) == 0
+        error = exceeded(program, engine, ExecutionBudget(max_steps=10))
+        assert error is not None and error.limit == 'steps'
+
+def test_budget_timeout() -> None:
+    program = '\nvar i = 0;\nwhile true do i = i + 1;'
+    for engine in engines:
+        budget = ExecutionBudget(timeout=0.05, check_interval=100)
+        error = exceeded(program, engine, budget)
+        assert error is not None and error.limit == 'time'
+        assert str(error).startswith('Location: Line 3,')
+        assert budget.steps % 100 == 0
+
+def test_budget_max_call_depth() -> None:
+    program = 'fun f(n: Int): Int { if n == 0 then 0 else 1 + f(n - 1) } f(20)'
+    for engine in engines:
+        budget = ExecutionBudget(max_call_depth=21)
+        assert interpret(parse(tokenize(program)), engine=engine, budget=budget) == 20
+        assert budget.call_depth == 0
+        budget = ExecutionBudget(max_call_depth=20)
+        error = exceeded(program, engine, budget)
+        assert error is not None and error.limit == 'call depth'
+        assert 'call depth of 20' in str(error)
+        assert budget.call_depth == 0
+
+def test_budget_call_depth_recovers_after_errors() -> None:
+    program = 'fun f(n: Int): Int { if n == 0 then 1 / 0 else f(n - 1) } f(5)'
+    for engine in engines:
+        budget = ExecutionBudget(max_call_depth=10)
+        for _ in range(3):
+            try:
+                interpret(parse(tokenize(program)), engine=engine, budget=budget)
+            except ZeroDivisionError:
+                pass
+            assert budget.call_depth == 0
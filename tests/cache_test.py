@@ -0,0 +1,99 @@
+import os
+import pickle
+import tempfile
+import time
+import zlib
+from pathlib import Path
+import pytest
+from compiler.cache import CompilationCache
+from compiler.ir_generator import generate_ir
+from compiler.parser1 import parse
+from compiler.tokenizer import tokenize
+from compiler.type_checker import typecheck
+
+
+source_code = 'var a = 3; while a < 6 do { a = a + 1; } print_int(a);'
+
+@pytest.fixture(autouse=True)
+def key_in_temporary_config(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('XDG_CONFIG_HOME', str(tmp_path))
+
+def test_cache_round_trip() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompilationCache(directory)
+        key = cache.key(source_code)
+        assert cache.load(key, 'ast') is None
+        ast_node = parse(tokenize(source_code))
+        typecheck(ast_node)
+        instructions = generate_ir(ast_node)
+        assert cache.store(key, 'ast', ast_node)
+        assert cache.store(key, 'ir', instructions)
+
+        cached_ast = cache.load(key, 'ast')
+        assert cached_ast == ast_node and cached_ast.type == ast_node.type
+        assert cache.load(key, 'ir') == instructions
+        assert (cache.stats.hits, cache.stats.misses) == (2, 1)
+
+def test_cache_key_depends_on_source() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompilationCache(directory)
+        assert cache.key(source_code) == cache.key(source_code)
+        assert cache.key(source_code) != cache.key(source_code + ' ')
+
+def test_cache_corrupt_entry_is_a_miss() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompilationCache(directory)
+        key = cache.key(source_code)
+        with open(os.path.join(directory, f'{key}.ir'), 'wb') as f:
+            f.write(b'garbage')
+        assert cache.load(key, 'ir') is None
+        assert cache.stats.misses == 1
+
+def test_cache_unsigned_entry_is_not_loaded() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompilationCache(directory)
+        key = cache.key(source_code)
+        with open(os.path.join(directory, f'{key}.ir'), 'wb') as f:
+            f.write(bytes(32) + zlib.compress(pickle.dumps([1, 2, 3])))
+        assert cache.load(key, 'ir') is None
+        # An entry signed under another name is not loaded either.
+        cache.store(cache.key('other'), 'ir', [1, 2, 3])
+        os.replace(os.path.join(directory, f'{cache.key("other")}.ir'), os.path.join(directory, f'{key}.ir'))
+        assert cache.load(key, 'ir') is None
+        assert cache.stats.misses == 2
+
+def test_cache_store_failure_leaves_no_temporary_file() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompilationCache(directory)
+        key = cache.key(source_code)
+        os.mkdir(os.path.join(directory, f'{key}.ir'))
+        failed = False
+        try:
+            cache.store(key, 'ir', [1, 2, 3])
+        except OSError:
+            failed = True
+        assert failed
+        assert not [name for name in os.listdir(directory) if name.endswith('.tmp')]
+
+def test_cache_evicts_least_recently_used() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompilationCache(directory)
+        keys = [cache.key(str(i)) for i in range(3)]
+        for key in keys[:2]:
+            cache.store(key, 'ir', list(range(1000)))
+            time.sleep(0.01)
+        cache.load(keys[0], 'ir')
+        time.sleep(0.01)
+        cache.max_bytes = cache.size() + 10
+        cache.store(keys[2], 'ir', list(range(1000)))
+        assert cache.load(keys[1], 'ir') is None
+        assert cache.load(keys[0], 'ir') is not None and cache.load(keys[2], 'ir') is not None
+        assert cache.stats.evictions == 1
+
+def test_cache_statistics_accumulate() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(2):
+            cache = CompilationCache(directory)
+            cache.load(cache.key(source_code), 'ast')
+            cache.save_stats()
+        assert CompilationCache(directory).total_stats().misses == 2
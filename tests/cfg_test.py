@@ -0,0 +1,68 @@
+from compiler import ir
+from compiler.cfg import build_cfg, dominators, find_loops, linearize, to_dot
+from tests.helpers import get_cases, make_ir, run
+
+
+nested_loops = '''
+var i = 0;
+while i < 3 do {
+    var j = 0;
+    while j < i do { print_int(j); j = j + 1; }
+    if i == 1 then print_int(10) else print_int(20);
+    i = i + 1;
+}
+'''
+
+def test_linearize_round_trip() -> None:
+    for code in [case.code for case in get_cases()] + [nested_loops]:
+        instructions = make_ir(code)
+        assert linearize(build_cfg(instructions)) == instructions
+
+def test_blocks_and_edges() -> None:
+    cfg = build_cfg(make_ir('var a = 1; if a < 2 then print_int(a) else print_int(2); print_int(3);'))
+    entry, then_block, else_block, end = cfg.blocks
+    assert [str(block.label) for block in cfg.blocks] == ['None', 'L1', 'L2', 'L3']
+    assert entry.succs == [then_block, else_block] and end.preds == [then_block, else_block]
+    # The else block falls through to the end.
+    assert else_block.terminator() is None and else_block.succs == [end]
+    assert end.succs == []
+
+def test_dominators_and_loops() -> None:
+    cfg = build_cfg(make_ir(nested_loops))
+    doms = dominators(cfg)
+    outer, inner = sorted(find_loops(cfg, doms), key=lambda loop: loop.depth())
+    assert inner.parent is outer and inner.depth() == 2
+    assert inner.blocks < outer.blocks
+    assert all(doms.dominates(outer.header, block) for block in outer.blocks)
+    assert not doms.dominates(inner.header, outer.header)
+    assert [str(block.label) for block in (outer.header, inner.header)] == ['L1', 'L4']
+    exit_block = cfg.blocks[-1]
+    assert outer.exits() == [(outer.header, exit_block)]
+    assert doms.idom[exit_block.index] is outer.header
+    assert doms.preorder()[0] is cfg.blocks[0]
+
+def test_linearize_adds_jumps() -> None:
+    instructions = make_ir(nested_loops)
+    expected = run(instructions)
+    cfg = build_cfg(instructions)
+    # Any order of the blocks runs the same, as long as the entry stays first.
+    cfg.blocks[1:] = reversed(cfg.blocks[1:])
+    cfg.renumber()
+    reordered = linearize(cfg)
+    assert reordered != instructions
+    assert run(reordered) == expected == '20\n0\n10\n0\n1\n20\n'
+
+def test_function_definitions_start_blocks() -> None:
+    cfg = build_cfg([
+        ir.LoadIntConst(1, ir.IRVar('x1')),
+        ir.FunctionDefinition('f', ir.Label('L1')),
+        ir.Copy(ir.IRVar('x1'), ir.IRVar('x2')),
+    ])
+    assert len(cfg.blocks) == 2 and cfg.entries == cfg.blocks
+    assert isinstance(cfg.blocks[1].instructions[0], ir.FunctionDefinition)
+
+def test_dot() -> None:
+    dot = to_dot(build_cfg(make_ir('var i = 0; while i < 3 do i = i + 1;')))
+    assert dot.startswith('digraph cfg {') and dot.endswith('}\n')
+    assert 'B2 -> B1 [style=dashed];' in dot
+    assert 'Call(fun=<, args=[x2, x3], dest=x4)' in dot
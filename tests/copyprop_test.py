@@ -0,0 +1,43 @@
+from compiler import ir
+from compiler.cfg import build_cfg, linearize
+from compiler.copyprop import coalesce_copies, eliminate_copies, propagate_copies
+from tests.helpers import make_ir, run
+
+
+def copies(instructions: list[ir.Instruction]) -> list[ir.Copy]:
+    return [insn for insn in instructions if isinstance(insn, ir.Copy)]
+
+def test_propagate_copies() -> None:
+    instructions = make_ir('var a = read_int(); var b = a; if b > 0 then print_int(b); var c = b; print_int(c);')
+    cfg = build_cfg(instructions)
+    assert propagate_copies(cfg) > 0
+    optimized = linearize(cfg)
+    read = [insn for insn in optimized if isinstance(insn, ir.Call) and insn.fun.name == 'read_int'][0]
+    # Every read of a, b and c now reads the result of read_int, in all blocks.
+    assert [insn.args for insn in optimized if isinstance(insn, ir.Call) and insn.fun.name == 'print_int'] == [(read.dest,)] * 2
+    assert run(optimized, '4\n') == run(instructions, '4\n') == '4\n4\n'
+
+def test_copies_end_at_writes() -> None:
+    # 'b' keeps the old value of 'a', so its reads after 'a' changes must not read 'a'.
+    instructions = make_ir('var a = read_int(); var b = a; while a < 5 do a = a + 1; print_int(b); print_int(a);')
+    cfg = build_cfg(instructions)
+    eliminate_copies(cfg)
+    optimized = linearize(cfg)
+    assert run(optimized, '2\n') == run(instructions, '2\n') == '2\n5\n'
+    assert len(copies(optimized)) == 1
+
+def test_coalesce_copies() -> None:
+    instructions = make_ir('var i = 0; var s = 0; while i < read_int() do { s = s + i; i = i + 1; } print_int(s);')
+    cfg = build_cfg(instructions)
+    assert coalesce_copies(cfg) > 0
+    optimized = linearize(cfg)
+    # The loop updates 'i' and 's' in place.
+    assert not [copy for copy in copies(optimized) if copy.source is not None]
+    assert run(optimized, '3\n' * 4) == run(instructions, '3\n' * 4) == '3\n'
+
+def test_coalesce_keeps_interfering_copies() -> None:
+    instructions = make_ir('var a = read_int(); var b = read_int(); var t = a; a = b; b = t; print_int(a - b);')
+    cfg = build_cfg(instructions)
+    eliminate_copies(cfg)
+    optimized = linearize(cfg)
+    assert run(optimized, '5\n2\n') == run(instructions, '5\n2\n') == '-3\n'
@@ -0,0 +1,63 @@
+from compiler import ir
+from compiler.cfg import build_cfg, linearize
+from compiler.cse import eliminate_common_subexpressions
+from compiler.ir import IRVar
+from tests.helpers import make_ir, run
+
+
+def call_names(instructions: list[ir.Instruction]) -> list[str]:
+    return [insn.fun.name for insn in instructions if isinstance(insn, ir.Call)]
+
+def cse(instructions: list[ir.Instruction]) -> list[ir.Instruction]:
+    cfg = build_cfg(instructions)
+    eliminate_common_subexpressions(cfg)
+    return linearize(cfg)
+
+def test_cse_in_dominated_blocks() -> None:
+    instructions = make_ir('''
+        var a = read_int(); var b = read_int();
+        var c = a * b + b * a;
+        if a > b then print_int(a * b) else print_bool(b < a);
+        print_int(c);
+    ''')
+    optimized = cse(instructions)
+    # 'b * a' is 'a * b', 'b < a' is 'a > b', and both branches are dominated by the first block.
+    assert call_names(optimized) == ['read_int', 'read_int', '*', '+', '>', 'print_int', 'print_bool', 'print_int']
+    for input in ['3\n2\n', '2\n3\n']:
+        assert run(optimized, input) == run(instructions, input)
+
+def test_cse_not_across_branches() -> None:
+    # Neither branch dominates the end, so 'a + 1' is computed again there.
+    instructions = make_ir('var a = read_int(); var b = 0; if a > 0 then b = a + 1 else b = 2; print_int(a + 1 + b);')
+    assert call_names(cse(instructions)).count('+') == 3
+
+def test_cse_division() -> None:
+    # The second division can reuse the first, which has already stopped the program if 'b' is 0.
+    instructions = make_ir('var a = read_int(); var b = read_int(); print_int(a / b); print_int(a % b); print_int(a / b * 2); print_bool(a % b == 1);')
+    optimized = cse(instructions)
+    assert call_names(optimized).count('/') == 1 and call_names(optimized).count('%') == 1
+    assert run(optimized, '7\n2\n') == run(instructions, '7\n2\n') == '3\n1\n6\ntrue\n'
+    # The division in the branch does not dominate the one after the 'if', so both stay.
+    instructions = make_ir('var a = read_int(); var b = read_int(); if a > 0 then print_int(a / b); print_int(a / b);')
+    assert call_names(cse(instructions)).count('/') == 2
+
+def test_cse_result_written_again() -> None:
+    a, b, x, y = IRVar('x1'), IRVar('x2'), IRVar('x3'), IRVar('x4')
+    read_int, print_int = IRVar('read_int'), IRVar('print_int')
+    instructions: list[ir.Instruction] = [
+        ir.Call(read_int, [], a),
+        ir.Call(read_int, [], b),
+        ir.Call(IRVar('*'), [a, b], x),
+        ir.Call(IRVar('+'), [x, a], x),
+        ir.Call(print_int, [x], y),
+        ir.Call(IRVar('*'), [a, b], y),
+        ir.Call(print_int, [y], y),
+    ]
+    optimized = cse(instructions)
+    # x1 * x2 is written to a new variable, since x3 no longer holds it at the end.
+    assert [str(insn) for insn in optimized[2:4]] == [
+        'Call(fun=*, args=[x1, x2], dest=x5)',
+        'Copy(source=x5, dest=x3)',
+    ]
+    assert str(optimized[6]) == 'Copy(source=x5, dest=x4)'
+    assert run(optimized, '3\n4\n') == run(instructions, '3\n4\n') == '15\n12\n'
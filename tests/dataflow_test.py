@@ -0,0 +1,54 @@
+from compiler.cfg import build_cfg
+from compiler.dataflow import bitset, index_vars, liveness, reaching_definitions, solve
+from compiler.ir import IRVar
+from tests.helpers import make_ir
+
+
+loop = 'var i = 0; var s = 0; while i < 3 do { s = s + i; i = i + 1; } print_int(s);'
+
+def names(vars: list[IRVar]) -> list[str]:
+    return sorted(var.name for var in vars)
+
+def test_bitset() -> None:
+    assert bitset([]) == 0
+    assert bitset([70, 3, 64]) == 2**70 | 2**64 | 2**3
+
+def test_liveness() -> None:
+    cfg = build_cfg(make_ir(loop))
+    entry, header, body, exit = cfg.blocks
+    live = liveness(cfg)
+    index = live.index
+    # x2 is i and x4 is s. Temporaries never cross blocks, so they get the highest bits.
+    assert names(index.vars[:index.exposed_count]) == ['x2', 'x4']
+    assert index.to_vars(live.live_in[entry.index]) == []
+    assert names(index.to_vars(live.live_in[header.index])) == ['x2', 'x4']
+    assert names(index.to_vars(live.live_out[header.index])) == ['x2', 'x4']
+    assert names(index.to_vars(live.live_in[exit.index])) == ['x4']
+    assert [names(index.to_vars(bits)) for bits in live.live_after(header)] == [
+        ['x2', 'x4', 'x5'], ['x2', 'x4', 'x6'], ['x2', 'x4'],
+    ]
+
+def test_reaching_definitions() -> None:
+    cfg = build_cfg(make_ir(loop))
+    entry, header, body, exit = cfg.blocks
+    reaching = reaching_definitions(cfg)
+    # Both the initial value and the increment of i and s reach the loop condition.
+    at_header = reaching.reaching(reaching.reach_in[header.index])
+    assert sorted((d.block.index, d.position, d.var.name) for d in at_header) == [
+        (0, 1, 'x2'), (0, 3, 'x4'), (2, 1, 'x4'), (2, 4, 'x2'),
+    ]
+    assert reaching.reach_in[exit.index] == reaching.reach_in[header.index]
+    assert [(d.block, d.position) for d in reaching.reaching(reaching.reach_out[body.index])] == [(body, 1), (body, 4)]
+    assert reaching.of_var[IRVar('x2')] == 0b1001
+
+def test_must_problem() -> None:
+    # Blocks that are on every path from the entry: the dominators of each block.
+    cfg = build_cfg(make_ir('var a = 1; if a < 2 then a = 3 else a = 4; while a > 0 do a = a - 1;'))
+    count = len(cfg.blocks)
+    gen = [1 << block.index for block in cfg.blocks]
+    result = solve(cfg, gen, [0] * count, forward=True, intersect=True, universe=2**count - 1)
+    entry, then_block, else_block, join, header, body, exit = cfg.blocks
+    assert result.outs[join.index] == bitset([entry.index, join.index])
+    assert result.outs[body.index] == bitset([entry.index, join.index, header.index, body.index])
+    assert result.ins[exit.index] == bitset([entry.index, join.index, header.index])
+    assert index_vars(cfg).exposed_count == 1
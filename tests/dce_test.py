@@ -0,0 +1,60 @@
+from compiler import ir
+from compiler.cfg import build_cfg, linearize
+from compiler.dce import eliminate_dead_code, remove_dead_instructions
+from compiler.ir import IRVar, Label
+from tests.helpers import make_ir, run
+
+
+def call_names(instructions: list[ir.Instruction]) -> list[str]:
+    return [insn.fun.name for insn in instructions if isinstance(insn, ir.Call)]
+
+def test_dce_keeps_side_effects() -> None:
+    instructions = make_ir('var a = read_int(); var b = a * 2 + 1; var c = 3 / a; var d = b; print_int(a);')
+    cfg = build_cfg(instructions)
+    eliminate_dead_code(cfg)
+    optimized = linearize(cfg)
+    # The division stays, since it stops the program if 'a' is 0.
+    assert call_names(optimized) == ['read_int', '/', 'print_int'] and len(optimized) == 5
+    assert run(optimized, '7\n') == run(instructions, '7\n') == '7\n'
+
+def test_dce_across_blocks() -> None:
+    # 'b' is only read by 'c', which is never read, so neither is needed after the loop.
+    instructions = make_ir('var a = 0; var b = 0; var c = 0; while a < 3 do { b = a + 1; c = b * b; a = a + 1; } print_int(a);')
+    cfg = build_cfg(instructions)
+    removed = remove_dead_instructions(cfg)
+    optimized = linearize(cfg)
+    assert call_names(optimized) == ['<', '+', 'print_int']
+    assert len(optimized) == len(instructions) - removed
+    assert run(optimized) == run(instructions) == '3\n'
+
+def test_dce_blocks() -> None:
+    x1, x2 = IRVar('x1'), IRVar('x2')
+    l1, l2, l3, l4 = Label('L1'), Label('L2'), Label('L3'), Label('L4')
+    print_int = IRVar('print_int')
+    instructions: list[ir.Instruction] = [
+        ir.LoadIntConst(1, x1),
+        ir.Jump(l1),
+        ir.Call(print_int, [x1], x2),  # never runs
+        l1,
+        ir.Call(IRVar('>'), [x1, x1], x2),
+        ir.CondJump(x2, l2, l3),
+        l2,
+        ir.Jump(l4),  # only leads on to L4
+        l3,
+        ir.Call(print_int, [x1], x2),
+        ir.Jump(l4),
+        l4,
+        ir.Call(print_int, [x1], x2),
+    ]
+    cfg = build_cfg(instructions)
+    eliminate_dead_code(cfg)
+    assert [str(insn) for insn in linearize(cfg)] == [
+        'LoadIntConst(value=1, dest=x1)',
+        'Call(fun=>, args=[x1, x1], dest=x2)',
+        'CondJump(condition=x2, then_label=L4, else_label=L3)',
+        'L3',
+        'Call(fun=print_int, args=[x1], dest=x2)',
+        'L4',
+        'Call(fun=print_int, args=[x1], dest=x2)',
+    ]
+    assert run(linearize(cfg)) == run(instructions) == '1\n1\n'
@@ -7,43 +7,11 @@ from compiler.assembly_generator import generate_assembly
 import os
 import sys
 import subprocess
-from dataclasses import dataclass
+from tests.helpers import CaseTest, directory_path, get_cases
 
 
-@dataclass
-class CaseTest():
-    name: str
-    code: str
-    inputs: list[str]
-    expect: list[str]
-
-directory_path = os.path.join(os.path.dirname(__file__), '../test_programs')
-test_file_name = "test.txt"
 compiled_file_name = "compiled_programs"
 
-def get_cases() -> list[CaseTest]:
-    case_list: list[CaseTest] = []
-    file_path = os.path.join(directory_path, test_file_name)
-    if os.path.isfile(file_path):
-        with open(file_path, 'r') as f:
-            cases = f.read().split('\n**********\n')
-            for i in range(0, len(cases)):
-                code = ""
-                name = ""
-                inputs = []
-                expect = []
-                for line in cases[i].split("\n"):
-                    if line.startswith("# describe: "):
-                        name=line[len("# describe: "):]
-                    elif line.startswith("input"):
-                        inputs.append(line[len("input "):])
-                    elif line.startswith("expect"):
-                        expect.append(line[len("expect: "):])
-                    else:
-                        code = code + line + "\n"
-                case_list.append(CaseTest(name=name, code=code, inputs=inputs, expect=expect))
-    return case_list
-
 def test_all() -> None:
     output_path = os.path.join(directory_path, compiled_file_name)
     if not os.path.exists(output_path):     os.makedirs(output_path)
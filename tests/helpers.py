@@ -0,0 +1,54 @@
+import io
+import os
+from dataclasses import dataclass
+from compiler import ir
+from compiler.ir_generator import generate_ir
+from compiler.ir_vm import run_ir
+from compiler.parser1 import parse
+from compiler.tokenizer import tokenize
+from compiler.type_checker import typecheck
+
+
+@dataclass
+class CaseTest():
+    name: str
+    code: str
+    inputs: list[str]
+    expect: list[str]
+
+directory_path = os.path.join(os.path.dirname(__file__), '../test_programs')
+test_file_name = "test.txt"
+
+def get_cases() -> list[CaseTest]:
+    case_list: list[CaseTest] = []
+    file_path = os.path.join(directory_path, test_file_name)
+    if os.path.isfile(file_path):
+        with open(file_path, 'r') as f:
+            cases = f.read().split('\n**********\n')
+            for i in range(0, len(cases)):
+                code = ""
+                name = ""
+                inputs = []
+                expect = []
+                for line in cases[i].split("\n"):
+                    if line.startswith("# describe: "):
+                        name=line[len("# describe: "):]
+                    elif line.startswith("input"):
+                        inputs.append(line[len("input "):])
+                    elif line.startswith("expect"):
+                        # Some cases write 'expect::'.
+                        expect.append(line[len("expect"):].lstrip(": "))
+                    else:
+                        code = code + line + "\n"
+                case_list.append(CaseTest(name=name, code=code, inputs=inputs, expect=expect))
+    return case_list
+
+def make_ir(source_code: str) -> list[ir.Instruction]:
+    ast_node = parse(tokenize(source_code))
+    typecheck(ast_node)
+    return generate_ir(ast_node)
+
+def run(instructions: list[ir.Instruction], input: str = '') -> str:
+    output = io.StringIO()
+    run_ir(instructions, io.StringIO(input), output)
+    return output.getvalue()
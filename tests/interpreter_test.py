@@ -1,4 +1,6 @@
-from compiler.interpreter import interpret
+import pytest
+from compiler.budget import ExecutionBudget
+from compiler.interpreter import engines, interpret
 from compiler.parser1 import parse
 from compiler.tokenizer import tokenize
 
@@ -62,7 +64,7 @@ def test_interpreter_while_expression() -> None:
 
 def test_interpreter_infinite_loop() -> None:
     try:
-        interpret(parse(tokenize('while a < 2 do a += 1; a'))) 
+        interpret(parse(tokenize('while a < 2 do a += 1; a')), budget=ExecutionBudget(max_steps=1000))
     except Exception:
         assert True
 
@@ -108,3 +110,101 @@ def test_interpreter_function_call_other_function() -> None:
 
 def test_interpreter_function_call_itself() -> None:
         assert interpret(parse(tokenize('fun square(x:Int):Int{return x*x}; return square(square(3))'))) == 81
+
+def test_closure_engine_matches_tree_engine() -> None:
+    programs = [
+        '(1 + 2) * 3',
+        'if 2>1 then 2*(2+3) else 3*3',
+        'not -1',
+        'var a=1;{var b=2; var a = 3;}   a+4',
+        'var a=1; {var a=2; a=a+1;} a',
+        'var a=1; {a=2; a=a+1;} a',
+        '1!=1 or 1<2 ',
+        'var a = -1; while a<2 do a=a+1; a',
+        'var x = 0; while (x < 10) do { x = x + 1; if (x == 5) then break; } x',
+        'var x = 0; var y = 0; while (x < 5) do { x = x + 1; if (x == 3) then continue; y = y + 1; } y',
+        'fun square(x:Int):Int{return x*x}; fun plus(x,y){return square(x)+y}; return plus(2,3)',
+        'var a=2; fun plus(x: Int, y:Int){return x+y} fun square(x: Int){return x*x} return square(plus(a,3))',
+    ]
+    for program in programs:
+        assert interpret(parse(tokenize(program)), engine='closure') == interpret(parse(tokenize(program)))
+
+def test_closure_engine_errors() -> None:
+    for program in ['{var a=1}  a', 'var a = 1; var a = 2;', 'var i = 0; while true do i = i + 1;']:
+        failed = False
+        try:
+            interpret(parse(tokenize(program)), engine='closure', budget=ExecutionBudget(max_steps=1000))
+        except Exception:
+            failed = True
+        assert failed
+
+def test_closure_engine_recursion(capsys: pytest.CaptureFixture[str]) -> None:
+    program = '''
+    fun count_down(n: Int): Unit { if n > 0 then { print_int(n); count_down(n - 1); } }
+    count_down(3);
+    '''
+    interpret(parse(tokenize(program)), engine='closure')
+    assert capsys.readouterr().out == '3\n2\n1\n'
+
+def test_interpreter_recursion() -> None:
+    fib = 'fun fib(n: Int): Int { if n < 2 then n else fib(n - 1) + fib(n - 2) } fib(15)'
+    assert interpret(parse(tokenize(fib))) == 610
+    ackermann = '''
+    fun ack(m: Int, n: Int): Int {
+        if m == 0 then n + 1 else if n == 0 then ack(m - 1, 1) else ack(m - 1, ack(m, n - 1))
+    }
+    ack(2, 3)
+    '''
+    assert interpret(parse(tokenize(ackermann))) == 9
+
+def test_interpreter_call_does_not_change_caller() -> None:
+    program = 'var x = 1; fun f(x: Int): Int { x = x + 10; return x; } var y = f(5); x + y'
+    assert interpret(parse(tokenize(program))) == 16
+
+def test_interpreter_early_return() -> None:
+    program = '''
+    fun first_multiple(n: Int, limit: Int): Int {
+        var i = 1;
+        while i < limit do {
+            if i % n == 0 then { return i; }
+            i = i + 1;
+        }
+        return 0;
+    }
+    first_multiple(7, 100) * 100 + first_multiple(200, 100)
+    '''
+    for engine in engines:
+        assert interpret(parse(tokenize(program)), engine=engine) == 700
+
+def test_interpreter_break_and_continue_in_nested_blocks() -> None:
+    program = '''
+    var i = 0; var odd = 0;
+    while true do {
+        i = i + 1;
+        { if i % 2 == 0 then { continue; } }
+        if i > 9 then { { break; } }
+        odd = odd + 1;
+    }
+    odd * 100 + i
+    '''
+    for engine in engines:
+        assert interpret(parse(tokenize(program)), engine=engine) == 511
+
+def test_interpreter_return_from_nested_expressions() -> None:
+    programs = {
+        'fun f(c: Bool): Int { var y = 0; y = { if c then { return 5; } 2 }; return y + 100; } f(true) * 1000 + f(false)': 5102,
+        'fun f(c: Bool): Int { var y = { if c then { return 5; } 2 }; return y + 100; } f(true) * 1000 + f(false)': 5102,
+        'fun f(c: Bool): Int { 1 + (if c then { return 5; } else 2) } f(true) * 1000 + f(false)': 5003,
+        'fun f(c: Bool): Int { -(if c then { return 5; } else 2) } f(true) * 1000 + f(false)': 4998,
+        'fun g(x: Int): Int { x * 10 } fun f(c: Bool): Int { g(if c then { return 5; } else 2) } f(true) * 1000 + f(false)': 5020,
+        'fun f(c: Bool): Int { if { if c then { return 5; } true } then 1 else 0 } f(true) * 1000 + f(false)': 5001,
+        'fun f(c: Bool): Bool { c and { return false; } } f(true)': False,
+    }
+    for program, expected in programs.items():
+        for engine in engines:
+            assert interpret(parse(tokenize(program)), engine=engine) == expected
+
+def test_interpreter_break_from_loop_condition() -> None:
+    program = 'var i = 0; while true do { i = i + 1; while { if i > 3 then { break; } false } do 0; } i'
+    for engine in engines:
+        assert interpret(parse(tokenize(program)), engine=engine) == 4
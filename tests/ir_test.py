@@ -0,0 +1,41 @@
+import pickle
+from compiler import ir
+from compiler.ir import IRVar, Label
+from compiler.assembly_generator import get_all_ir_variables
+
+
+def test_irvar_interning() -> None:
+    x = IRVar('x1')
+    assert IRVar('x1') is x and x.name == 'x1'
+    assert IRVar('x2').id != x.id and max(x.id, IRVar('x2').id) < ir.var_count()
+    assert pickle.loads(pickle.dumps(x)) is x
+
+def test_irvar_ids_are_reused() -> None:
+    [IRVar(f'reused{i}') for i in range(100)]
+    count = ir.var_count()
+    # The IRVars above are no longer in use, so these take their ids.
+    vars = [IRVar(f'reused{i}') for i in range(100, 200)]
+    assert ir.var_count() == count and all(var.id < count for var in vars)
+
+def test_instruction_text() -> None:
+    call = ir.Call(IRVar('+'), [IRVar('x1'), IRVar('x2')], IRVar('x3'))
+    assert str(call) == 'Call(fun=+, args=[x1, x2], dest=x3)'
+    assert str(ir.CondJump(IRVar('x3'), Label('L1'), Label('L2'))) == 'CondJump(condition=x3, then_label=L1, else_label=L2)'
+    assert str(ir.Copy(None, IRVar('x4'))) == 'Copy(source=None, dest=x4)'
+    assert hash(call) == hash(ir.Call(IRVar('+'), (IRVar('x1'), IRVar('x2')), IRVar('x3')))
+
+def test_operands() -> None:
+    x1, x2, x3 = IRVar('x1'), IRVar('x2'), IRVar('x3')
+    instructions = [
+        ir.LoadIntConst(1, x1),
+        ir.Copy(x1, x2),
+        ir.Call(IRVar('*'), [x1, x2], x3),
+        ir.CondJump(x3, Label('L1'), Label('L2')),
+        ir.Label('L1'),
+        ir.Copy(None, x3),
+        ir.Return(),
+    ]
+    assert [(insn.uses(), insn.defs()) for insn in instructions] == [
+        ((), (x1,)), ((x1,), (x2,)), ((x1, x2), (x3,)), ((x3,), ()), ((), ()), ((), (x3,)), ((), ()),
+    ]
+    assert get_all_ir_variables(instructions) == [x1, x2, x3]
@@ -0,0 +1,44 @@
+import io
+from compiler import ir
+from compiler.ir import IRVar, Label
+from compiler.ir_vm import run_ir
+from tests.helpers import get_cases, make_ir, run as run_instructions
+
+
+def run(source_code: str, input: str = '') -> str:
+    return run_instructions(make_ir(source_code), input)
+
+def test_ir_vm_test_programs() -> None:
+    # The same programs and expectations as the end-to-end tests, without assembling.
+    for case in get_cases():
+        assert run(case.code, ''.join(input + '\n' for input in case.inputs)) == f'{case.expect[0]}\n', case
+
+def test_ir_vm_loop() -> None:
+    assert run('var a = 0; while a < 1000 do a = a + 1; print_int(a);') == '1000\n'
+
+def test_ir_vm_native_arithmetic() -> None:
+    # Division truncates towards zero and integers wrap around at 64 bits, as in the compiled program.
+    assert run('print_int(-7 / 2); print_int(-7 % 2); print_int(9223372036854775807 + 1);') == \
+        '-3\n-1\n-9223372036854775808\n'
+    assert run('print_bool(1 < 2); print_bool(not true);') == 'true\nfalse\n'
+
+def test_ir_vm_read_int() -> None:
+    assert run('var a = read_int(); var b = read_int(); print_int(a - b);', '1x0\n-5\n') == '15\n'
+
+def test_ir_vm_handwritten_ir() -> None:
+    x, one, c = IRVar('x1'), IRVar('x2'), IRVar('x3')
+    l_loop, l_body, l_end = Label('L1'), Label('L2'), Label('L3')
+    output = io.StringIO()
+    run_ir([
+        ir.LoadIntConst(3, x),
+        ir.LoadIntConst(1, one),
+        l_loop,
+        ir.Call(IRVar('>='), [x, one], c),
+        ir.CondJump(c, l_body, l_end),
+        l_body,
+        ir.Call(IRVar('print_int'), [x], c),
+        ir.Call(IRVar('-'), [x, one], x),
+        ir.Jump(l_loop),
+        l_end,
+    ], output=output)
+    assert output.getvalue() == '3\n2\n1\n'
@@ -0,0 +1,68 @@
+from compiler import ir
+from compiler.cfg import build_cfg, linearize
+from compiler.licm import hoist_loop_invariants
+from tests.helpers import make_ir, run
+
+
+def licm(instructions: list[ir.Instruction]) -> list[ir.Instruction]:
+    cfg = build_cfg(instructions)
+    hoist_loop_invariants(cfg)
+    return linearize(cfg)
+
+def loop_calls(instructions: list[ir.Instruction]) -> list[str]:
+    """Returns the calls between the first label and the last jump back to it."""
+    start = next(i for i, insn in enumerate(instructions) if isinstance(insn, ir.Label))
+    label = instructions[start]
+    end = max(i for i, insn in enumerate(instructions) if isinstance(insn, ir.Jump) and insn.label == label)
+    return [insn.fun.name for insn in instructions[start:end] if isinstance(insn, ir.Call)]
+
+def test_hoist_invariants() -> None:
+    instructions = make_ir('''
+        var n = read_int(); var i = 0; var s = 0;
+        while i < n * 2 do { s = s + (n + 1) * 3; i = i + 1; }
+        print_int(s);
+    ''')
+    optimized = licm(instructions)
+    # 'n * 2' and '(n + 1) * 3' are computed once, before the loop.
+    assert loop_calls(optimized) == ['<', '+', '+']
+    for input in ['4\n', '0\n', '-3\n']:
+        assert run(optimized, input) == run(instructions, input)
+
+def test_hoist_zero_trip_loop() -> None:
+    # 'a' is also written after the loop, so a computation writing it cannot run before the loop.
+    instructions = make_ir('var n = read_int(); var a = 5; while n > 0 do { a = n * 3; n = n - 1; } print_int(a);')
+    optimized = licm(instructions)
+    assert run(optimized, '0\n') == run(instructions, '0\n') == '5\n'
+    assert run(optimized, '2\n') == run(instructions, '2\n') == '3\n'
+
+def test_hoist_division() -> None:
+    source = 'var n = read_int(); var d = read_int(); var i = 0; var s = 0; while i < n do { s = s + n / {}; i = i + 1; } print_int(s);'
+    # Dividing by the constant 4 cannot trap, so it is hoisted.
+    assert loop_calls(licm(make_ir(source.replace('{}', '4')))) == ['<', '+', '+']
+    # The loop below never runs with d = 0, so hoisting 'n / d' would stop the program.
+    instructions = make_ir(source.replace('{}', 'd'))
+    optimized = licm(instructions)
+    assert '/' in loop_calls(optimized)
+    assert run(optimized, '0\n0\n') == run(instructions, '0\n0\n') == '0\n'
+    failed = False
+    try:
+        run(optimized, '1\n0\n')
+    except Exception:
+        failed = True
+    assert failed
+
+def test_hoist_out_of_nested_loops() -> None:
+    instructions = make_ir('''
+        var n = read_int(); var k = read_int(); var i = 0; var s = 0;
+        while i < n do {
+            var j = 0;
+            while j < n do { s = s + k * k + i * 2; j = j + 1; }
+            i = i + 1;
+        }
+        print_int(s);
+    ''')
+    optimized = licm(instructions)
+    calls = loop_calls(optimized)
+    # 'k * k' leaves both loops, 'i * 2' only the inner one.
+    assert calls.count('*') == 1
+    assert run(optimized, '3\n5\n') == run(instructions, '3\n5\n')
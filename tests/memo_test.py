@@ -0,0 +1,78 @@
+from compiler import ast
+from compiler.interpreter import interpret
+from compiler.memo import Memoizer
+from compiler.parser1 import parse
+from compiler.purity import pure_functions
+from compiler.resolver import resolve
+from compiler.tokenizer import tokenize
+
+
+def pure_names(source_code: str) -> set[str]:
+    node = parse(tokenize(source_code))
+    resolve(node)
+    pure = pure_functions(node)
+    names: set[str] = set()
+
+    def visit(node: ast.Expression) -> None:
+        if isinstance(node, ast.Function) and node.body is not None:
+            if id(node) in pure:
+                names.add(node.name)
+            visit(node.body)
+        elif isinstance(node, ast.Block):
+            for expression in node.expressions:
+                visit(expression)
+    visit(node)
+    return names
+
+def test_purity() -> None:
+    program = '''
+    var total = 0;
+    fun square(x: Int): Int { x * x }
+    fun fib(n: Int): Int { if n < 2 then n else fib(n - 1) + fib(n - 2) }
+    fun even(n: Int): Bool { if n == 0 then true else odd(n - 1) }
+    fun odd(n: Int): Bool { if n == 0 then false else even(n - 1) }
+    fun sum_squares(n: Int): Int { var s = 0; while n > 0 do { s = s + square(n); n = n - 1; } s }
+    fun show(x: Int): Int { print_int(x); x }
+    fun input(x: Int): Int { read_int() + x }
+    fun add(x: Int): Int { total = total + x; total }
+    fun peek(x: Int): Int { total + x }
+    fun shows_square(x: Int): Int { show(square(x)) }
+    fun outer(x: Int): Int { fun inner(y: Int): Int { y * 2 } inner(x) + 1 }
+    fun captures(x: Int): Int { fun add_x(y: Int): Int { x + y } add_x(1) }
+    0
+    '''
+    assert pure_names(program) == {'square', 'fib', 'even', 'odd', 'sum_squares', 'outer', 'inner'}
+
+def test_memoized_results() -> None:
+    programs = [
+        'fun fib(n: Int): Int { if n < 2 then n else fib(n - 1) + fib(n - 2) } fib(18)',
+        'var t = 0; fun add(x: Int): Int { t = t + x; t } add(1) + add(1) + add(1)',
+        'var t = 1; fun peek(x: Int): Int { t + x } var a = peek(1); t = 10; a + peek(1)',
+        'fun f(n: Int): Int { var i = 0; while true do { i = i + 1; if i > n then { return i; } } 0 } f(3) + f(3)',
+    ]
+    for program in programs:
+        assert interpret(parse(tokenize(program)), engine='closure', memo=Memoizer()) == interpret(parse(tokenize(program)))
+
+def test_memo_counters() -> None:
+    memo = Memoizer()
+    program = 'fun fib(n: Int): Int { if n < 2 then n else fib(n - 1) + fib(n - 2) } fib(80)'
+    assert interpret(parse(tokenize(program)), engine='closure', memo=memo) == 23416728348467685
+    table, = memo.tables
+    assert (table.name, table.hits, table.misses, table.evictions) == ('fib', 78, 81, 0)
+    assert 'fib at 1:4' in memo.report()
+
+def test_memo_evictions() -> None:
+    memo = Memoizer(max_entries=2)
+    program = 'fun sq(x: Int): Int { x * x } sq(1) + sq(2) + sq(1) + sq(3) + sq(2)'
+    assert interpret(parse(tokenize(program)), engine='closure', memo=memo) == 19
+    table, = memo.tables
+    assert (table.hits, table.misses, table.evictions) == (1, 4, 2)
+    assert list(table.entries) == [(3,), (2,)]
+
+def test_memo_needs_closure_engine() -> None:
+    failed = False
+    try:
+        interpret(parse(tokenize('1')), engine='tree', memo=Memoizer())
+    except Exception:
+        failed = True
+    assert failed
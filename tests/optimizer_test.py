@@ -0,0 +1,22 @@
+from compiler import ir
+from compiler.optimizer import PassRun, default_passes, optimize
+from tests.helpers import get_cases, make_ir, run
+
+
+def test_optimized_test_programs() -> None:
+    # Each pass on its own and all of them together keep the output of the test programs.
+    for case in get_cases():
+        instructions = make_ir(case.code)
+        inputs = ''.join(input + '\n' for input in case.inputs)
+        for pass_names in [[name] for name in default_passes] + [default_passes]:
+            assert run(optimize(instructions, pass_names), inputs) == f'{case.expect[0]}\n', (case, pass_names)
+
+def test_pass_runs() -> None:
+    instructions = make_ir('var a = 2; var b = a + 3; if b > 4 then print_int(b) else print_int(a);')
+    runs: list[PassRun] = []
+    optimized = optimize(instructions, ['sccp', 'dce'], runs)
+    assert [pass_run.name for pass_run in runs] == ['sccp', 'dce']
+    assert runs[0].before == len([insn for insn in instructions if not isinstance(insn, ir.Label)])
+    assert runs[0].after == runs[1].before and runs[1].removed > 0
+    assert runs[1].after == len(optimized)
+    assert run(optimized) == run(instructions) == '5\n'
@@ -1,8 +1,10 @@
 
 
+import io
+from typing import cast
 from compiler.ast import AddressOf, BinaryOp, Block, Bool, Dereference, IfExpression, Int, Literal, Identifier, Function, PointerType, UnaryOp, Unit, VariableDeclaration, WhileExpression, Return
 from compiler.parser1 import parse
-from compiler.tokenizer import tokenize
+from compiler.tokenizer import tokenize, tokenize_compact, tokenize_iter
 
 
 def test_parser() -> None:
@@ -399,3 +401,63 @@ def test_parser_parse_function_declaration() -> None:
 
 
 
+
+def test_parser_token_stream() -> None:
+    source_code = 'var a = 1; while a < 10 do { a = a + 1; } a'
+    assert parse(tokenize_iter(io.StringIO(source_code), 4)) == parse(tokenize(source_code))
+
+def test_parser_token_buffer() -> None:
+    source_code = 'var a = 1; while a < 10 do { a = a + 1; } a'
+    assert parse(tokenize_compact(source_code)) == parse(tokenize(source_code))
+
+def test_parser_long_and_chain() -> None:
+    expression = parse(tokenize(' and '.join(['a'] * 100_000)))
+    depth = 0
+    while isinstance(expression, BinaryOp):
+        assert expression.left == Identifier('a') and expression.operation == 'and'
+        expression = expression.right
+        depth += 1
+    assert depth == 99_999 and expression == Identifier('a')
+
+def test_parser_deep_nesting() -> None:
+    expression = parse(tokenize('(' * 50_000 + '- { 1 }' + ')' * 50_000))
+    assert isinstance(expression, UnaryOp) and expression.right == Block([Literal(1)])
+    expression = parse(tokenize('{ ' * 50_000 + '1' + ' }' * 50_000))
+    depth = 0
+    while isinstance(expression, Block):
+        expression = expression.expressions[0]
+        depth += 1
+    assert depth == 50_000 and expression == Literal(1)
+
+def test_parser_full_program() -> None:
+    source_code = '''
+    fun square(x: Int): Int { return x * x; }
+    var a: Int = 1 + 2 * 3 - 4 / 2;
+    while a < 10 and not false or a == 3 do { if a % 2 == 0 then a += 1 else a -= -1; }
+    var p: Int* = &a;
+    *p = square(a);
+    '''
+    a = Identifier('a')
+    # The parser gives blocks that end in ';' the value Literal(None), and calls are Functions without a body.
+    unit = Literal(cast(int, None))
+    call = Function('square', cast(list[VariableDeclaration], [a]))
+    assert parse(tokenize(source_code)) == Block([
+        Function('square', [VariableDeclaration('x', variable_type=Int)], Int,
+                 Block([Return(BinaryOp(Identifier('x'), '*', Identifier('x'))), unit])),
+        VariableDeclaration('a', BinaryOp(
+            BinaryOp(Literal(1), '+', BinaryOp(Literal(2), '*', Literal(3))),
+            '-',
+            BinaryOp(Literal(4), '/', Literal(2))), Int),
+        WhileExpression(
+            BinaryOp(BinaryOp(a, '<', Literal(10)), 'and',
+                     UnaryOp('not', BinaryOp(Literal(False), 'or', BinaryOp(a, '==', Literal(3))))),
+            Block([
+                IfExpression(BinaryOp(BinaryOp(a, '%', Literal(2)), '==', Literal(0)),
+                             BinaryOp(a, '+=', Literal(1)),
+                             BinaryOp(a, '-=', UnaryOp('-', Literal(1)))),
+                unit,
+            ])),
+        VariableDeclaration('p', AddressOf(a), PointerType(Int)),
+        Dereference(BinaryOp(Identifier('p'), '=', call)),
+        unit,
+    ])
@@ -0,0 +1,74 @@
+import io
+from compiler.interpreter import interpret
+from compiler.parser1 import parse
+from compiler.profiler import Profile
+from compiler.tokenizer import tokenize
+
+
+program = '''
+fun square(x: Int): Int { return x * x; }
+fun fact(n: Int): Int { if n <= 1 then 1 else n * fact(n - 1) }
+var i = 0;
+var total = 0;
+while i < 10 do {
+    total = total + square(i);
+    i = i + 1;
+}
+fact(5) + total
+'''
+
+def profiled(source_code: str) -> Profile:
+    profile = Profile()
+    assert interpret(parse(tokenize(source_code)), engine='closure', profile=profile) == 405
+    return profile
+
+def test_profile_counts_nodes() -> None:
+    profile = profiled(program)
+    counts = {(node.label, node.location.line if node.location else None): node.count for node in profile.nodes}
+    assert counts[('while', 6)] == 1
+    assert counts[('total =', 7)] == 10
+    assert counts[('call square', 7)] == 10
+    assert counts[('return', 2)] == 10
+    assert counts[('if', 3)] == 5
+    assert counts[('call fact', 3)] == 4
+    assert counts[('call fact', 10)] == 1
+    assert counts[('var i', 4)] == 1
+    assert all(node.time >= 0 and node.active == 0 for node in profile.nodes)
+    assert profile.total_time > 0
+
+def test_profile_counts_functions() -> None:
+    profile = profiled(program)
+    calls = {function.name: function.calls for function in profile.functions}
+    assert calls == {'square': 10, 'fact': 5}
+    for function in profile.functions:
+        assert 0 <= function.self_time <= function.time <= profile.total_time
+
+def test_profile_collapsed_stacks() -> None:
+    profile = profiled(program)
+    assert set(profile.stacks) == {
+        ('<main>',), ('<main>', 'square'),
+        ('<main>', 'fact'), ('<main>', 'fact', 'fact'), ('<main>', 'fact', 'fact', 'fact'),
+        ('<main>', 'fact', 'fact', 'fact', 'fact'), ('<main>', 'fact', 'fact', 'fact', 'fact', 'fact'),
+    }
+    output = io.StringIO()
+    profile.write_collapsed_stacks(output)
+    for line in output.getvalue().splitlines():
+        stack, microseconds = line.rsplit(' ', 1)
+        assert stack.startswith('<main>') and int(microseconds) > 0
+
+def test_profile_report() -> None:
+    profile = profiled(program)
+    lines = profile.report(limit=3).splitlines()
+    assert lines[0].startswith('Total time:')
+    assert len([line for line in lines if ' at ' in line]) == 3 + 2
+    lines = profile.report().splitlines()
+    assert any(line.endswith('while at 6:1') for line in lines)
+    assert any(line.endswith('fact at 3:4') for line in lines)
+
+def test_profile_needs_closure_engine() -> None:
+    failed = False
+    try:
+        interpret(parse(tokenize(program)), engine='tree', profile=Profile())
+    except Exception:
+        failed = True
+    assert failed
@@ -0,0 +1,64 @@
+import io
+import pytest
+from compiler.interpreter import interpret
+from compiler.parser1 import parse
+from compiler.pyexec import compile_python, compile_source, run, transpile
+from compiler.tokenizer import tokenize
+
+
+def pyexec(source_code: str) -> object:
+    return run(compile_python(transpile(parse(tokenize(source_code)))))
+
+def test_pyexec_matches_tree_engine() -> None:
+    programs = [
+        '(1 + 2) * 3',
+        'if 2>1 then 2*(2+3) else 3*3',
+        'not 1',
+        'not -1',
+        '7 / 2 * 2 + 7 % 2',
+        'var a=1;{var b=2; var a = 3;}   a+4',
+        'var a=1; {var a=2; a=a+1;} a',
+        'var a = 1; var b = { a = 2; 3 }; a + b',
+        'var a = 1; a + (if true then { a = 10; 1 } else 0)',
+        '1!=1 or 1<2 ',
+        'var a = -1; while a<2 do a=a+1; a',
+        'var x = 0; while (x < 10) do { x = x + 1; if (x == 5) then break; } x',
+        'var x = 0; var y = 0; while (x < 5) do { x = x + 1; if (x == 3) then continue; y = y + 1; } y',
+        'var i = 0; while true do { i = i + 1; while { if i > 3 then { break; } false } do 0; } i',
+        'fun square(x:Int):Int{return x*x}; fun plus(x,y){return square(x)+y}; return plus(2,3)',
+        'fun fib(n: Int): Int { if n < 2 then n else fib(n - 1) + fib(n - 2) } fib(15)',
+        'var x = 1; fun f(x: Int): Int { x = x + 10; return x; } var y = f(5); x + y',
+        'fun f(c: Bool): Int { var y = { if c then { return 5; } 2 }; return y + 100; } f(true) * 1000 + f(false)',
+        'fun f(c: Bool): Int { 1 + (if c then { return 5; } else 2) } f(true) * 1000 + f(false)',
+        'fun f(c: Bool): Bool { c and { return false; } } f(true)',
+        'var n = 0; fun inc(k: Int): Int { n = n + k; fun twice(m: Int): Int { n = n * m; n } twice(2) } inc(1); inc(2); n',
+    ]
+    for program in programs:
+        assert pyexec(program) == interpret(parse(tokenize(program))), program
+
+def test_pyexec_library_functions(capsys: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr('sys.stdin', io.StringIO('4\n5\n'))
+    pyexec('var a = read_int(); print_int(a * read_int()); print_bool(a > 3);')
+    assert capsys.readouterr().out == '20\nTrue\n'
+
+def test_pyexec_long_expressions() -> None:
+    assert pyexec('var a = 1; ' + ' + '.join(['a'] * 250)) == 250
+    assert pyexec('var a = true; ' + ' and '.join(['a'] * 250)) == True
+    counter = 'var a = 0; fun bump(n: Int): Bool { a = a + n; a > 100 } '
+    assert pyexec(counter + ' or '.join(['bump(1)'] * 250) + '; a') == 101
+
+def test_pyexec_caches_code_objects() -> None:
+    program = 'var a = 3; while a < 6 do { a = a + 1; } a'
+    code = compile_source(program)
+    assert compile_source(program) is code
+    assert compile_source(program + ' ') is not code
+    assert run(code) == run(code) == 6
+
+def test_pyexec_errors() -> None:
+    for program in ['{var a=1}  a', 'break', 'fun f(x: Int): Int { x } f(1, 2)']:
+        failed = False
+        try:
+            pyexec(program)
+        except Exception:
+            failed = True
+        assert failed
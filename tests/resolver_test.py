@@ -0,0 +1,56 @@
+from compiler import ast
+from compiler.parser1 import parse
+from compiler.resolver import resolve
+from compiler.tokenizer import tokenize
+
+
+def resolve_errors(source_code: str) -> str:
+    try:
+        resolve(parse(tokenize(source_code)))
+    except Exception as e:
+        return str(e)
+    return ''
+
+def test_resolver_slots() -> None:
+    node = parse(tokenize('var a = 1; { var a = 2; a = a + 1; } a'))
+    assert resolve(node) == 3
+    assert isinstance(node, ast.Block)
+    outer, block, result = node.expressions
+    assert isinstance(outer, ast.VariableDeclaration) and isinstance(block, ast.Block)
+    inner, assignment, _ = block.expressions
+    assert isinstance(inner, ast.VariableDeclaration) and isinstance(assignment, ast.BinaryOp)
+    assert (outer.slot, inner.slot) == (1, 2)
+    assert isinstance(assignment.left, ast.Identifier) and assignment.left.slot == 2
+    assert isinstance(result, ast.Identifier) and (result.scope_depth, result.slot) == (0, 1)
+
+def test_resolver_functions() -> None:
+    node = parse(tokenize('var a = 2; fun f(x: Int): Int { var y = x; return y * a; } f(a);'))
+    frame_size = resolve(node)
+    assert isinstance(node, ast.Block)
+    declaration, definition, call, _ = node.expressions
+    assert isinstance(definition, ast.Function) and isinstance(call, ast.Function)
+    # Function names are declared before the other names of their block.
+    assert definition.slot == call.slot == 1 and isinstance(declaration, ast.VariableDeclaration) and declaration.slot == 2
+    assert frame_size == 3
+    assert definition.frame_size == 3 and definition.args[0].slot == 1
+    body = definition.body
+    assert body is not None and isinstance(body.expressions[1], ast.Return)
+    product = body.expressions[1].value
+    assert isinstance(product, ast.BinaryOp)
+    assert isinstance(product.left, ast.Identifier) and (product.left.scope_depth, product.left.slot) == (0, 2)
+    assert isinstance(product.right, ast.Identifier) and (product.right.scope_depth, product.right.slot) == (1, 2)
+
+def test_resolver_calls_before_definition() -> None:
+    assert resolve_errors('fun f(x: Int): Int { return g(x); } fun g(x: Int): Int { return x; } f(1)') == ''
+
+def test_resolver_library_functions() -> None:
+    node = parse(tokenize('print_int(1)'))
+    resolve(node)
+    assert isinstance(node, ast.Function) and node.slot is None
+
+def test_resolver_reports_all_errors() -> None:
+    errors = resolve_errors('var a = b; { var c = 1; var c = 2; } c').split('\n')
+    assert len(errors) == 3
+    assert errors[0].endswith('b is not defined')
+    assert errors[1].endswith('The variable c has already been declared')
+    assert errors[2].startswith('Location: Line 1') and errors[2].endswith('c is not defined')
@@ -0,0 +1,94 @@
+from compiler import ir
+from compiler.cfg import build_cfg, linearize
+from compiler.sccp import fold, propagate_constants, sccp
+from compiler.ssa import Phi, from_ssa, to_ssa
+from tests.helpers import make_ir, run
+
+
+loop = 'var i = 0; var s = 0; while i < read_int() do { if i % 2 == 0 then s = s + i; i = i + 1; } print_int(s);'
+
+def test_ssa_form() -> None:
+    instructions = make_ir(loop)
+    cfg = build_cfg(instructions)
+    origin = to_ssa(cfg)
+    written = [var for block in cfg.blocks for insn in block.instructions for var in insn.defs()]
+    assert len(written) == len(set(written))
+    header = cfg.blocks[1]
+    phis = [insn for insn in header.instructions if isinstance(insn, Phi)]
+    # i and s are the only variables that are live around the loop.
+    assert sorted(origin[phi.dest].name for phi in phis) == ['x2', 'x4']
+    assert all(len(phi.args) == len(header.preds) == 2 for phi in phis)
+    # The join after the 'if' merges the two versions of s.
+    join = [block for block in cfg.blocks if block.label is not None and block.label.name == 'L5'][0]
+    assert [origin[insn.dest].name for insn in join.instructions if isinstance(insn, Phi)] == ['x4']
+    from_ssa(cfg, origin)
+    assert linearize(cfg) == instructions
+
+def test_ssa_reads_before_writes() -> None:
+    # 'b' is read before it is written on the first iteration, so the phi keeps the original variable.
+    x, b, one = ir.IRVar('x1'), ir.IRVar('x2'), ir.IRVar('x3')
+    l_loop, l_end = ir.Label('L1'), ir.Label('L2')
+    instructions: list[ir.Instruction] = [
+        ir.LoadIntConst(1, one),
+        l_loop,
+        ir.Call(ir.IRVar('+'), [b, one], x),
+        ir.Copy(x, b),
+        ir.Call(ir.IRVar('<'), [b, one], x),
+        ir.CondJump(x, l_loop, l_end),
+        l_end,
+        ir.Call(ir.IRVar('print_int'), [b], x),
+    ]
+    cfg = build_cfg(instructions)
+    origin = to_ssa(cfg)
+    phi = cfg.blocks[1].instructions[0]
+    assert isinstance(phi, Phi) and phi.args[0] is b and origin[phi.args[1]] is b
+    propagate_constants(cfg)
+    from_ssa(cfg, origin)
+    assert run(linearize(cfg)) == run(instructions) == '1\n'
+
+def test_fold() -> None:
+    assert fold('+', [9223372036854775807, 1]) == -9223372036854775808
+    assert fold('/', [-7, 2]) == -3 and fold('%', [-7, 2]) == -1
+    assert fold('/', [1, 0]) is None and fold('%', [1, 0]) is None
+    assert fold('<', [1, 2]) is True and fold('unary_not', [True]) is False
+    assert fold('print_int', [1]) is None
+
+def test_sccp_removes_dead_branches() -> None:
+    instructions = make_ir('''
+        var a = 3;
+        var b = a * 4;
+        if b > 10 then print_int(b) else print_int(0);
+        while a > 5 do { print_int(a); a = a + 1; }
+        print_bool(a == 3 and b != 12);
+    ''')
+    cfg = build_cfg(instructions)
+    sccp(cfg)
+    optimized = linearize(cfg)
+    assert run(optimized) == run(instructions) == '12\nfalse\n'
+    calls = [insn.fun.name for insn in optimized if isinstance(insn, ir.Call)]
+    # Only the output is left of the branches and the loop.
+    assert calls == ['print_int', 'print_bool']
+    assert not any(isinstance(insn, ir.CondJump) for insn in optimized)
+
+def test_sccp_through_loops() -> None:
+    # 'c' stays true on every iteration, but 'n' changes.
+    instructions = make_ir('var c = true; var n = 0; var k = 2; while n < read_int() do { n = n + k; if not c then k = 5; } print_int(n * k);')
+    cfg = build_cfg(instructions)
+    sccp(cfg)
+    optimized = linearize(cfg)
+    assert run(optimized, '7\n' * 5) == run(instructions, '7\n' * 5) == '16\n'
+    assert not any(isinstance(insn, ir.LoadIntConst) and insn.value == 5 for insn in optimized)
+    assert sum(isinstance(insn, ir.CondJump) for insn in optimized) == 1
+
+def test_sccp_keeps_division_by_zero() -> None:
+    instructions = make_ir('var a = 1; var b = 0; print_int(a / b);')
+    cfg = build_cfg(instructions)
+    sccp(cfg)
+    optimized = linearize(cfg)
+    assert any(isinstance(insn, ir.Call) and insn.fun.name == '/' for insn in optimized)
+    failed = False
+    try:
+        run(optimized)
+    except Exception:
+        failed = True
+    assert failed
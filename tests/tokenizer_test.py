@@ -1,4 +1,9 @@
-from compiler.tokenizer import Location, Token, tokenize
+import io
+import mmap
+import tempfile
+from typing import Iterable
+
+from compiler.tokenizer import Location, Token, TokenBuffer, TokenStream, retokenize, tokenize, tokenize_compact, tokenize_iter
 
 
 def test_tokenizer() -> None:
@@ -100,3 +105,102 @@ def test_tokenizer_comments() -> None:
      Token(type='int_literal', text='5', location=Location(line=3, pos=6)), 
      Token(type='punctuation', text=';', location=Location(line=3, pos=7))]
 
+
+
+chunked_source_code = """var total = 0; // running total
+/* a comment that is
+   long enough to cross several chunks */
+while total <= 100 do { total += 17; }
+if total != 119 then print_int(total) else print_bool(true)
+# trailing comment
+"""
+
+def _tokens_with_locations(tokens: Iterable[Token]) -> list[tuple[str, str, int, int]]:
+    return [(t.type, t.text, t.location.line, t.location.pos) for t in tokens]
+
+def test_tokenizer_iter_matches_tokenize_for_every_chunk_size() -> None:
+    expected = _tokens_with_locations(tokenize(chunked_source_code))
+    for chunk_size in range(1, len(chunked_source_code) + 2):
+        assert _tokens_with_locations(tokenize_iter(io.StringIO(chunked_source_code), chunk_size)) == expected
+
+def test_tokenizer_iter_binary_input() -> None:
+    source_code = "// ünïcödé comment\nvar x = 10;\nx"
+    expected = _tokens_with_locations(tokenize(source_code))
+    for chunk_size in range(1, 8):
+        assert _tokens_with_locations(tokenize_iter(io.BytesIO(source_code.encode()), chunk_size)) == expected
+
+def test_tokenizer_iter_mmap() -> None:
+    with tempfile.TemporaryFile() as f:
+        f.write(chunked_source_code.encode())
+        f.flush()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            assert _tokens_with_locations(tokenize_iter(m, 16)) == _tokens_with_locations(tokenize(chunked_source_code))
+
+def test_tokenizer_iter_error_across_chunks() -> None:
+    try:
+        list(tokenize_iter(io.StringIO("var a = 1 ! 2 + 3 + 4 + 5"), 11))
+        assert False
+    except Exception as e:
+        assert str(e) == "Tokenization failed near '! 2 + 3 + '..."
+
+def test_token_stream_lookahead() -> None:
+    stream = TokenStream(tokenize_iter("a + 1"))
+    assert stream.peek().text == 'a'
+    assert stream.peek(2).text == '1'
+    assert stream.peek(3).type == 'end'
+    assert stream.advance().text == 'a'
+    assert stream.advance().text == '+'
+    assert stream.advance().text == '1'
+    assert stream.at_end()
+    assert stream.consumed == 3
+
+def test_token_stream_empty() -> None:
+    stream = TokenStream(tokenize_iter("// only a comment"))
+    assert stream.at_end()
+    assert (stream.peek().location.line, stream.peek().location.pos) == (1, 1)
+
+def test_token_buffer_matches_tokenize() -> None:
+    buffer = tokenize_compact(chunked_source_code)
+    expected = tokenize(chunked_source_code)
+    assert len(buffer) == len(expected)
+    assert _tokens_with_locations(buffer) == _tokens_with_locations(expected)
+    assert _tokens_with_locations([buffer[i] for i in range(len(buffer))]) == _tokens_with_locations(expected)
+    assert buffer.type_at(0) == 'identifier' and buffer.text_at(0) == 'var'
+    assert buffer.nbytes() < 32 * len(buffer)
+
+def _buffer_columns(buffer: TokenBuffer) -> list[tuple[str, str, int, int]]:
+    return [(buffer.type_at(i), buffer.text_at(i), buffer.line_at(i), buffer.positions[i]) for i in range(len(buffer))]
+
+def test_retokenize_matches_full_tokenize() -> None:
+    edits = [
+        (0, 0, 'var y = 2;\n'),           # insert a line at the start
+        (4, 5, 'counter'),                # rename an identifier
+        (chunked_source_code.index('while'), 0, '\n\n'),  # shift later lines
+        (chunked_source_code.index('<='), 2, '<'),        # shorten an operator
+        (chunked_source_code.index('/*'), 2, ''),         # break a comment open
+        (len(chunked_source_code), 0, ' x'),              # append at the end
+    ]
+    for offset, deleted, inserted in edits:
+        edited = chunked_source_code[:offset] + inserted + chunked_source_code[offset + deleted:]
+        try:
+            expected = _buffer_columns(tokenize_compact(edited))
+        except Exception:
+            continue
+        assert _buffer_columns(retokenize(tokenize_compact(chunked_source_code), offset, deleted, inserted)) == expected
+
+def test_retokenize_closes_unterminated_comment() -> None:
+    source_code = 'a / * b\nc /* d\ne'
+    buffer = tokenize_compact(source_code)
+    edited = retokenize(buffer, len(source_code), 0, ' */ f')
+    assert _buffer_columns(edited) == _buffer_columns(tokenize_compact(source_code + ' */ f'))
+    assert [edited.text_at(i) for i in range(len(edited))] == ['a', '/', '*', 'b', 'c', 'f']
+
+def test_retokenize_repeated_edits() -> None:
+    source_code = chunked_source_code
+    buffer = tokenize_compact(source_code)
+    for i in range(40):
+        offset = max(source_code.rfind(' ', 0, (i * 37) % len(source_code)), 0)
+        source_code = source_code[:offset] + ' \n' + source_code[offset:]
+        buffer = retokenize(buffer, offset, 0, ' \n')
+        assert _buffer_columns(buffer) == _buffer_columns(tokenize_compact(source_code))
+    assert list(buffer.starts) == list(tokenize_compact(source_code).starts)